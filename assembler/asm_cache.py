@@ -0,0 +1,254 @@
+# asm_cache.py
+
+# cache of assembled programs, so unchanged sources aren't assembled again
+
+# Entry is a file "<key>.mixa" in cache directory, key is sha1 of source lines and of the assembler
+# (its source files), so changed assembler doesn't use old entries. Only programs without errors are kept.
+# When size of all entries is more than max_size, the least recently used ones are removed
+# (modification time of entry is updated when it's used).
+
+# Format of entry (zlib compressed, little-endian):
+#   header        - "MIXA", version (byte), start address, end address (4 bytes, -1 for None)
+#   memory        - 4000 packed words (4 bytes each, bit 30 is sign)
+#   labels        - count (2 bytes), for every label: name (byte length and utf-8), value (4 bytes)
+#   local labels  - count (2 bytes), for every one: name, count of definitions (2 bytes)
+#                   and (address, line number) (4 bytes each) of every definition
+#   literals      - count (2 bytes), (value (4 bytes), sign (byte)) of every literal
+#   lines         - count (2 bytes), (line number, address) (4 bytes each) of every assembled line (for listing)
+
+import os, struct, zlib, hashlib, json, tempfile
+
+from parse_line import parse_lines, Line
+from assemble import Assembler
+from symbol_table import SymbolTable
+from listing import Listing
+from memory import Memory, MEMORY_SIZE
+
+MAGIC = b"MIXA"
+VERSION = 1
+
+SUFFIX = ".mixa"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+# cache is used by main.py, gui and profiler if this environment variable is set to directory
+CACHE_ENV = "MIX_ASM_CACHE"
+CACHE_SIZE_ENV = "MIX_ASM_CACHE_SIZE"
+
+HEADER = struct.Struct("<4sBii")
+COUNT = struct.Struct("<H")
+VALUE = struct.Struct("<i")
+LITERAL = struct.Struct("<Ib")
+PAIR = struct.Struct("<ii")
+
+SIGN_BIT = 1 << 30
+
+_assembler_version = None
+
+def assembler_version():
+  """Hash of source files of assembler"""
+  global _assembler_version
+  if _assembler_version is None:
+    digest = hashlib.sha1()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(os.listdir(base)) + [os.path.join('..', 'common', 'charset.py')]:
+      if path.endswith((".py", ".dat")):
+        with open(os.path.join(base, path), "rb") as f:
+          digest.update(f.read())
+    _assembler_version = digest.hexdigest()
+  return _assembler_version
+
+class Assembled:
+  """Program assembled without errors, it's got from Assembler or from cache"""
+  def __init__(self, memory, start_address, end_address, symtable, addresses):
+    self.memory = memory              # list of words ([sign, byte1, ..., byte5])
+    self.start_address = start_address
+    self.end_address = end_address
+    self.symtable = symtable
+    self.addresses = addresses        # list of (line number, address) of assembled lines
+
+  @staticmethod
+  def from_assembler(asm, lines):
+    return Assembled(asm.memory.memory, asm.start_address, asm.end_address, asm.symtable,
+                     [(line.line_number, line.asm_address) for line in lines if line.asm_address is not None])
+
+  def listing(self, src_lines):
+    lines = [Line(None, None, None, line_number, address) for line_number, address in self.addresses]
+    return Listing(src_lines, lines, self.memory, self.symtable.literals, self.end_address)
+
+  def dumps(self):
+    """Returns bytes of entry"""
+    def name(s):
+      s = s.encode("utf-8")
+      return struct.pack("<B", len(s)) + s
+
+    optional = lambda x: -1 if x is None else x
+    parts = [HEADER.pack(MAGIC, VERSION, optional(self.start_address), optional(self.end_address)),
+             struct.pack("<%iI" % MEMORY_SIZE, *[(SIGN_BIT if word[0] < 0 else 0) | (Memory.mix2dec([+1] + word[1:]))
+                                                  for word in self.memory])]
+    parts.append(COUNT.pack(len(self.symtable.labels)))
+    for label, value in self.symtable.labels.items():
+      parts += [name(label), VALUE.pack(value)]
+    parts.append(COUNT.pack(len(self.symtable.local_labels)))
+    for label, definitions in self.symtable.local_labels.items():
+      parts += [name(label), COUNT.pack(len(definitions))] + [PAIR.pack(*x) for x in definitions]
+    parts.append(COUNT.pack(len(self.symtable.literals)))
+    parts += [LITERAL.pack(*literal) for literal in self.symtable.literals]
+    parts.append(COUNT.pack(len(self.addresses)))
+    parts += [PAIR.pack(*x) for x in self.addresses]
+    return zlib.compress(b"".join(parts))
+
+  @staticmethod
+  def loads(data):
+    """Returns Assembled from bytes of entry (raises ValueError if it's broken)"""
+    try:
+      data = zlib.decompress(data)
+      magic, version, start_address, end_address = HEADER.unpack_from(data, 0)
+      if magic != MAGIC or version != VERSION:
+        raise ValueError("incompatible entry")
+      offset = HEADER.size
+      cells = struct.unpack_from("<%iI" % MEMORY_SIZE, data, offset)
+      offset += 4 * MEMORY_SIZE
+
+      def count():
+        nonlocal offset
+        n, = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        return n
+
+      def name():
+        nonlocal offset
+        length = data[offset]
+        offset += 1 + length
+        return data[offset - length : offset].decode("utf-8")
+
+      def items(item_struct, n):
+        nonlocal offset
+        result = [item_struct.unpack_from(data, offset + i * item_struct.size) for i in range(n)]
+        offset += n * item_struct.size
+        return result
+
+      labels = {}
+      for _ in range(count()):
+        label = name()
+        labels[label] = items(VALUE, 1)[0][0]
+      local_labels = {}
+      for _ in range(count()):
+        label = name()
+        local_labels[label] = items(PAIR, count())
+      literals = items(LITERAL, count())
+      addresses = items(PAIR, count())
+    except (struct.error, zlib.error, IndexError, UnicodeDecodeError) as e:
+      raise ValueError("broken entry: %s" % e)
+    if offset != len(data):
+      raise ValueError("broken entry: %i extra bytes" % (len(data) - offset))
+
+    memory = [[-1 if cell & SIGN_BIT else +1] + Memory.dec2mix(cell & (SIGN_BIT - 1))[1:] for cell in cells]
+    symtable = SymbolTable(labels, local_labels, literals)
+    return Assembled(memory, None if start_address == -1 else start_address,
+                     None if end_address == -1 else end_address, symtable, addresses)
+
+
+class AsmCache:
+  def __init__(self, directory, max_size = DEFAULT_MAX_SIZE):
+    self.directory = directory
+    self.max_size = max_size
+
+  @staticmethod
+  def key(src_lines):
+    digest = hashlib.sha1(assembler_version().encode("ascii"))
+    digest.update(json.dumps(list(src_lines)).encode("utf-8"))
+    return digest.hexdigest()
+
+  def path(self, key):
+    return os.path.join(self.directory, key + SUFFIX)
+
+  def get(self, src_lines):
+    """Returns Assembled or None"""
+    path = self.path(self.key(src_lines))
+    try:
+      with open(path, "rb") as f:
+        assembled = Assembled.loads(f.read())
+    except (IOError, OSError):
+      return None
+    except ValueError:
+      self.remove(path)
+      return None
+    try:
+      os.utime(path) # it's used recently
+    except OSError:
+      pass # read-only cache is still used
+    return assembled
+
+  def put(self, src_lines, assembled):
+    try:
+      data = assembled.dumps()
+    except struct.error:
+      return # too many labels for format
+    tmp_path = None
+    try:
+      os.makedirs(self.directory, exist_ok = True)
+      # write to temporary file first, so other processes don't read half of entry
+      fd, tmp_path = tempfile.mkstemp(suffix = ".tmp", dir = self.directory)
+      with os.fdopen(fd, "wb") as f:
+        f.write(data)
+      os.replace(tmp_path, self.path(self.key(src_lines)))
+    except (IOError, OSError):
+      if tmp_path is not None:
+        self.remove(tmp_path) # evict() doesn't see temporary files
+      return # cache is optional
+    self.evict()
+
+  def evict(self):
+    """Removes the least recently used entries while cache is too big"""
+    entries = []
+    for fn in os.listdir(self.directory):
+      if fn.endswith(SUFFIX):
+        try:
+          stat = os.stat(os.path.join(self.directory, fn))
+        except OSError:
+          continue
+        entries.append((stat.st_mtime, stat.st_size, fn))
+    entries.sort()
+    size = sum(entry[1] for entry in entries)
+    for mtime, entry_size, fn in entries:
+      if size <= self.max_size:
+        break
+      self.remove(os.path.join(self.directory, fn))
+      size -= entry_size
+
+  @staticmethod
+  def remove(path):
+    try:
+      os.remove(path)
+    except OSError:
+      pass
+
+def default_cache():
+  """AsmCache from environment (CACHE_ENV, CACHE_SIZE_ENV) or None"""
+  directory = os.environ.get(CACHE_ENV)
+  if not directory:
+    return None
+  try:
+    max_size = int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_MAX_SIZE))
+  except ValueError:
+    max_size = DEFAULT_MAX_SIZE
+  return AsmCache(directory, max_size)
+
+def assemble(src_lines, cache = None):
+  """Returns (syntax errors, assembler errors, Assembled or None if there are errors)"""
+  if cache is not None:
+    assembled = cache.get(src_lines)
+    if assembled is not None:
+      return ([], [], assembled)
+
+  lines, errors = parse_lines(src_lines)
+  if len(errors) > 0:
+    return (errors, [], None)
+  asm = Assembler()
+  asm.run(lines)
+  if len(asm.errors) > 0:
+    return ([], asm.errors, None)
+
+  assembled = Assembled.from_assembler(asm, lines)
+  if cache is not None:
+    cache.put(src_lines, assembled)
+  return ([], [], assembled)
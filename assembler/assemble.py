@@ -4,7 +4,7 @@
 
 import operations
 from errors import *
-from parse_argument import parse_argument
+from parse_argument import parse_argument, compile_argument
 from memory import Memory
 from symbol_table import SymbolTable
 
@@ -21,40 +21,46 @@ class Assembler:
     self.error_set = set()
 
     if only != 2:
-      self.ca, self.npass = 0, 1
-      self._do_pass()
+      self.first_pass()
 
     if only != 1:
-      self.ca, self.npass = 0, 2
-      self.symtable.literal_address = self.end_address
-      self.occupied_cells = []
-      self._do_pass()
+      self.second_pass()
+
+  def first_pass(self):
+    self.ca, self.npass = 0, 1
+    self._do_pass()
+
+  def second_pass(self):
+    self.ca, self.npass = 0, 2
+    self.symtable.literal_address = self.end_address
+    self.cell_lines = {} # address -> number of line which is assembled to this cell
+    self._do_pass()
 
   def _do_pass(self):
     for line in self.lines:
-      try:
-        if self.npass == 1 and line.operation != "EQU": 
-          self._add_label(line)
+      self._do_line(line)
 
-        if operations.is_instruction(line.operation):
-          self._do_instruction(line)
-        else:
-          Assembler.__dict__["_do_" + line.operation.lower()](self, line)
+  def _do_line(self, line):
+    try:
+      if self.npass == 1 and line.operation != "EQU": 
+        self._add_label(line)
 
-      except AssemblyError as err:
-        self._add_error(line, err)
+      if operations.is_instruction(line.operation):
+        self._do_instruction(line)
+      else:
+        Assembler.__dict__["_do_" + line.operation.lower()](self, line)
+
+    except AssemblyError as err:
+      self._add_error(line, err)
 
   def _do_instruction(self, line):
     self._check_address(line)
         
     if self.npass == 1:
-      # first pass
-      try:
-        self._parse_arg(line)
-      except AssemblyError:
-        # errors in parsing argument are checked on the 2nd pass
-        pass
-      
+      # first pass: argument is only parsed to tree,
+      # its value and errors are got on the 2nd pass
+      compile_argument(line)
+
       self.ca += 1
     else:
       # second pass
@@ -62,7 +68,7 @@ class Assembler:
       
       c_code = operations.get_codes(line.operation)[0]
       line.asm_address = self.ca
-      self._write_word( value | c_code, sign )
+      self._write_word(line, value | c_code, sign)
 
   def _do_equ(self, line):
     if self.npass == 1:
@@ -78,7 +84,7 @@ class Assembler:
     if self.npass == 2:
       value, sign = self._parse_arg(line)
       line.asm_address = self.ca
-      self._write_word(value, sign)
+      self._write_word(line, value, sign)
     else:
       self.ca += 1
 
@@ -97,20 +103,20 @@ class Assembler:
 
         #raise "TODO"
         #line.asm_address = self.ca
-        self._write_word(value, sign)
+        self._write_word(line, value, sign)
 
   def _parse_arg(self, line):
     return parse_argument(line, self.symtable, self.ca, self.npass)
 
-  def _write_word(self, value, sign = None):
+  def _write_word(self, line, value, sign = None):
     if sign is not None:
       real_sign = sign
     else:
       real_sign = +1 if value >= 0 else -1
-    if self.ca in self.occupied_cells:
-      raise RepeatedCellError(self.ca)
+    if self.ca in self.cell_lines:
+      raise RepeatedCellError( (self.ca, self.cell_lines[self.ca]) )
     else:
-      self.occupied_cells.append(self.ca)
+      self.cell_lines[self.ca] = line.line_number
       self.memory[self.ca] = value
       self.memory.set_sign(self.ca, real_sign)
       self.ca += 1
@@ -97,4 +97,4 @@ class FieldFixedError(AssemblyError):
   """Field part for this instruction is fixed (%s), can't be changed"""
 
 class RepeatedCellError(AssemblyError):
-  """Can't assemble to one memory cell twice (%s)"""
+  """Can't assemble to one memory cell twice (%s), it's used by line %s"""
@@ -46,13 +46,17 @@ class Listing:
 
   def init_copy(self, listing):
     self.lines = listing.lines
+    self.addr2num = listing.addr2num
 
   def create_listing(self):
+    self.addr2num = {} # address -> index of listing line
     for asm_line in self.asm_lines:
       if asm_line.asm_address is not None:
         self.lines[asm_line.line_number-1].addr = asm_line.asm_address
         self.lines[asm_line.line_number-1].word = self.memory[asm_line.asm_address]
+        self.addr2num[asm_line.asm_address] = asm_line.line_number-1
     for literal in self.literals:
       sign = "-" if literal[1] == -1 else ""
+      self.addr2num[self.literals_address] = len(self.lines)
       self.lines.append(ListingLine(self.literals_address,  self.memory[self.literals_address], "\tCON\t%s%i" % (sign, literal[0])))
       self.literals_address += 1
@@ -15,6 +15,7 @@ from parse_line import *
 from assemble import *
 from memory import Memory
 from listing import *
+from asm_cache import assemble, default_cache
 
 DEFAULT_OUT_NAME = "out.ma"
 
@@ -53,40 +54,36 @@ def main():
     return ERR_INVALID_OUTPUT_FILE[0]
 
   src_lines = file_in.readlines()
-
-  lines, errors = parse_lines(src_lines)
   file_in.close()
-  if len(errors) > 0: # we have errors
+
+  # unchanged sources are taken from cache (if it's set in environment, see asm_cache.py)
+  syntax_errors, errors, assembled = assemble(src_lines, default_cache())
+  if len(syntax_errors) > 0: # we have errors
     print("Syntax errors:")
-    print_errors(errors)
+    print_errors(syntax_errors)
     file_out.close()
     return ERR_SYNTAX[0]
 
-  asm = Assembler()
-  asm.run(lines)
-
-  memory_table = asm.memory
-  start_address = asm.start_address
-  errors = asm.errors
-
-
   if len(errors) > 0: # we have errors
     print("Assemble errors:")
     print_errors(errors)
     file_out.close()
     return ERR_ASSEMBLE[0]
 
+  memory = assembled.memory
+  start_address = assembled.start_address
+
   if start_address is not None:
     print("Start address: %04i" % start_address)
-  if memory_table is not None:
+  if memory is not None:
     print("Memory:")
-    write_memory(sys.stdout, memory_table.memory)
+    write_memory(sys.stdout, memory)
 
-  write_asm_file(file_out, start_address, memory_table.memory)
+  write_asm_file(file_out, start_address, memory)
   file_out.close()
 
   # create listing
-  listing = Listing(src_lines, lines, memory_table.memory, asm.symtable.literals, asm.end_address)
+  listing = assembled.listing(src_lines)
   print(listing)
         
 # if we executing module
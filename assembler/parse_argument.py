@@ -22,25 +22,37 @@
 # +                      W_EXP |        # if operation in("EQU", "ORIG", "CON", "END")
 # +                      ALF_WORD       # if operation == "ALF"
 
+# Argument is tokenized and parsed once to tree (Argument), it's kept in line.compiled,
+# so passes only find symbols and compute expressions. Tree is computed in the same order as
+# argument is parsed, so errors are the same as if it was computed while parsing:
+#   - syntax error is kept in tree where parsing stopped and raised when computing gets there,
+#   - symbol which isn't defined raises error of the place where it's used at first.
+
 from math import *
 from operations import *
 from errors import *
 from memory import Memory
 
-import sys, os
+import sys, os, re
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
 import charset
 
 def parse_argument(line, symbol_table, cur_addr, npass = 1):
-  return ArgumentParser(line, symbol_table, cur_addr, npass).parse()
+  return compile_argument(line).evaluate(line, symbol_table, cur_addr, npass)
+
+def compile_argument(line):
+  """Returns Argument of line, it's made once for operation and argument"""
+  compiled = line.compiled
+  if compiled is None or compiled.source != (line.operation, line.argument):
+    compiled = line.compiled = ArgumentParser(line).parse()
+  return compiled
+
+# ", + - * / // : ( ) =", inverted string ("..." or "... till the end), newlines, other chars
+_TOKENS = re.compile(r'(")([^"]*)("?)|(//|[,+\-*/:()=])|[\n\r]+|([^,+\-*/:()="\n\r]+)')
+_SIGNS = set(", + - * / // : ( ) = \"".split(" "))
 
 class ArgumentParser:
-  unary_ops = "+ -".split(" ")
-  unary_func = {
-    "+":  lambda x : x,
-    "-":  lambda x : -x
-  }
-  binary_ops = "+ - * / // :".split(" ")
+  """Makes tree of argument (Argument), symbols are found and expressions are computed by Argument.evaluate()"""
   binary_func = {
     "+":  lambda x,y : x + y,
     "-":  lambda x,y : x - y,
@@ -50,13 +62,13 @@ class ArgumentParser:
     ":":  lambda x,y : 8*x + y
   }
 
-  def __init__(self, line, symbol_table, cur_addr, npass = 1):
+  def __init__(self, line):
     self.line = line
-    self.symbol_table = symbol_table
-    self.cur_addr = cur_addr
-    self.npass = npass
-    
+    self.symbols = {} # symbol -> error if it isn't defined (of the first place where it's used)
+    self.uses_cur_addr = False
+
     self.split() # create self.tokens and ct=0 (current token)
+    self.padded = self.tokens + [None, None] # so get() and look() are None in the end
 
   def split(self):
     """Create tokens"""
@@ -68,81 +80,31 @@ class ArgumentParser:
     if s is None:
       return
 
-    splitters = ", + - * / : ( ) = \" \n \r".split(" ")
-
-    cur_token = ""
-    i = 0
-    while i < len(s):
-      if s[i] in splitters:
-
-        # append cur_token
-        self.tokens.append(cur_token)
-        cur_token = ''
-
-        # some variants
-        if s[i] == '"':
-          # inverted string
-          end = s.find('"', i + 1)
-          if end == -1:
-            self.tokens += ['"', s[i+1:]]
-            i = len(s) - 1
-          else:
-            self.tokens += ['"', s[i+1:end], '"']
-            i = end
-
-        elif s[i] == '/' and (i + 1 < len(s) and s[i + 1] == '/'): # <=> s[i:i+2] == '//'
-          # special division
-          self.tokens.append('//')
-          i += 1
-
-        elif s[i] not in ('\n', '\r'):
-          # basic sign ( , + - * / : ( ) = )
-          self.tokens.append(s[i])
-
-      else:
-        cur_token += s[i]
-      i += 1
-
-    # add accumulated cur_token
-    self.tokens.append(cur_token)
-    # remove all ''
-    try:
-      while True:
-        self.tokens.remove('')
-    except ValueError:
-      pass
+    # empty tokens (inverted "" and newlines) are skipped
+    for quote, inverted, closed, sign, word in _TOKENS.findall(s):
+      if word:
+        self.tokens.append(word)
+      elif sign:
+        self.tokens.append(sign)
+      elif quote:
+        self.tokens += [t for t in (quote, inverted, closed) if t]
 
 
   def parse(self):
     """Main parse function"""
-    res = self.try_argument()
-    if res == 0:
-      try:
-        if self.line.argument[0] == '-':
-          return (0, -1)
-        else:
-          return (0, +1)
-      except:
-        return (0, +1)
-    else:
-      sign = +1 if res > 0 else -1
-      return (abs(res), sign)
+    kind, tree = self.try_argument()
+    return Argument(self.line, kind, tree, self.symbols, self.uses_cur_addr)
 
 # moving in tokens
   def get(self):
-    try:
-      return self.tokens[self.ct]
-    except:
-      return None
+    return self.padded[self.ct]
 
   def next(self):
-    self.ct += 1
+    if self.ct < len(self.tokens):
+      self.ct += 1
 
   def look(self):
-    try:
-      return self.tokens[self.ct + 1]
-    except:
-      return None
+    return self.padded[self.ct + 1]
 
   def get_all_before_this(self):
     return "".join(self.tokens[:self.ct])
@@ -155,40 +117,33 @@ class ArgumentParser:
 # moving in tokens
 
 
-  @staticmethod
-  def try_any(seq):
-    """Try all functions in seq and return not None result of one of them or None"""
-    for f in (seq):
-      res = f()
-      if res is not None:
-        return res
-    return None
+# errors which are raised if there is no expression here
+  def expected_s_exp(self):
+    return ExpectedSExpError(self.get_all_before_this())
 
+  def expected_exp(self):
+    return ExpectedExpError(self.get_all_before_this())
 
-# all try_*() returns number or None if fails
-# and can raise exceptions
-
-  def try_symbol(self):
-    if self.get() is not None:
-      return self.symbol_table.find(self.get(), self.line.line_number)
-    else:
-      return None
+  def expected_w_exp(self):
+    return ExpectedWExpError(self.line.argument)
 
+  def invalid_addr(self):
+    return InvalidAddrError(self.get_all_forward_from_this())
 
-  def try_number(self):
-    if self.get() is not None and 1 <= len(self.get()) <= 10 and self.get().isdigit():
-      return int(self.get())
-    else:
-      return None
+  def fail(self, error, exp = None):
+    """Syntax error: the rest of argument isn't parsed, returns expression which raises error
+    after exp (if it's given) is computed"""
+    self.ct = len(self.tokens)
+    if exp is None:
+      return (False, [error], [])
+    elif exp.__class__ is int:
+      return (False, [exp, error], [None])
+    neg, atoms, ops = exp
+    return (neg, atoms + [error], ops + [None])
 
 
-  def try_defined_symbol(self):   # Program algorithm is so that difference of symbols destroied.
-    return self.try_symbol()      # Init of symbol table - there parsed arguments of directives
-                                  # which use only DEFINED_SYMBOLS with symbol table that created
-                                  # from defined labels (see algorithm).
-  def try_future_symbol(self):    # Assemble - there parsed arguments of instructions
-    return self.try_symbol()      # which use any symbols with full symbol table.
-
+# all try_*() returns tree or None if fails
+# expression is number or (negative, atoms, binary functions), atom is number, symbol, "*" or error
 
   def try_alf_word(self):
     if self.get() == '"':
@@ -199,73 +154,76 @@ class ArgumentParser:
       else:
         s = self.get()
         if self.look() != '"':
-          raise UnquotedStringError(self.line.argument)
+          return self.fail(UnquotedStringError(self.line.argument))
         self.next()
     else:
       # less than six mix-chars not in inverted
-      s = self.line.argument.rstrip('\n\r')
+      s = self.line.argument.rstrip('\n\r') if self.line.argument is not None else ""
       self.ct = len(self.tokens)-1
-      if s is None:
-        s = ""
 
     s = s[:5]
     while len(s) < 5:
       s += " "
     # now s - string with len = 5
 
-    word = Memory.positive_zero()
-    for i in range(1,6):
-      word[i] = charset.ord(s[i-1])
-      if word[i] is None:
-        raise InvalidCharError(s[i-1])
-    return Memory.mix2dec(word)
+    try:
+      codes = charset.encode(s)
+    except charset.CharsetError as e:
+      return self.fail(InvalidCharError(e.value))
+    return Memory.mix2dec([+1] + list(codes))
 
 
-  def try_cur_addr(self):
-    if self.get() == "*":
-      return self.cur_addr
-    else:
+  def try_s_exp(self, token, missing):
+    """token is self.get(), missing() returns error which is raised if symbol isn't defined"""
+    if token is None:
       return None
-
-
-  def try_s_exp(self):
-    return self.try_any(
-      (self.try_number, self.try_defined_symbol, self.try_cur_addr)
-    )
-
-
-  def try_exp(self):
-    result = 0
-
-    has_unary = False
-    if self.get() in self.unary_ops:
-      unary_str = self.get()
-      unary = self.unary_func[unary_str]
-      has_unary = True
-      self.next()
-    else:
-      unary = lambda x : x # identical function
-
-    s_exp = self.try_s_exp()
-    if s_exp is None:
+    elif token.isdigit() and len(token) <= 10:
+      return int(token) # number
+    elif token == "*":
+      self.uses_cur_addr = True
+      return token # cur_addr
+    elif token in _SIGNS:
+      return None
+    # symbol
+    if token not in self.symbols:
+      self.symbols[token] = missing()
+    return token
+
+
+  def try_exp(self, missing):
+    """missing() returns error which is raised if the first symbol isn't defined"""
+    tokens = self.padded # the same as self.get() and self.look(), but faster
+    token = tokens[self.ct]
+    neg = token == "-"
+    has_unary = neg or token == "+"
+    if has_unary:
+      self.ct += 1
+      token = tokens[self.ct]
+      missing = self.expected_s_exp
+
+    atom = self.try_s_exp(token, missing)
+    if atom is None:
       if has_unary:
-        raise ExpectedSExpError(self.get_all_before_this())
+        return self.fail(self.expected_s_exp())
       else:
         return None
-    result = unary(s_exp)
-
-    while True:
-      if self.look() not in self.binary_ops:
-        break
-      self.next()
-      binary = self.binary_func[self.get()]
-      self.next()
-      s_exp = self.try_s_exp()
-      if s_exp is None:
-        raise ExpectedSExpError(self.get_all_before_this())
-      result = binary(result, s_exp)
-
-    return result
+    binary = self.binary_func.get(tokens[self.ct + 1])
+    if binary is None:
+      # the most frequent case
+      if atom.__class__ is int:
+        return -atom if neg else atom
+      return (neg, [atom], [])
+
+    atoms, ops = [atom], []
+    while binary is not None:
+      self.ct += 2 # binary operation and the next s_exp
+      atom = self.try_s_exp(tokens[self.ct], self.expected_s_exp)
+      if atom is None:
+        return self.fail(self.expected_s_exp(), (neg, atoms, ops))
+      atoms.append(atom)
+      ops.append(binary)
+      binary = self.binary_func.get(tokens[self.ct + 1])
+    return _fold(neg, atoms, ops)
 
 
   def try_ind_part(self):
@@ -274,9 +232,9 @@ class ArgumentParser:
       return 0
     else:
       self.next()
-      exp = self.try_exp()
+      exp = self.try_exp(self.expected_exp)
       if exp is None:
-        raise ExpectedExpError(self.get_all_before_this())
+        return self.fail(self.expected_exp())
       else:
         self.next()
         return exp
@@ -288,102 +246,85 @@ class ArgumentParser:
       return get_codes(self.line.operation)[1]
     else:
       self.next()
-      exp = self.try_exp()
+      exp = self.try_exp(self.expected_exp)
       if exp is None:
-        raise ExpectedExpError(self.get_all_before_this())
+        return self.fail(self.expected_exp())
       else:
         self.next()
         if self.get() != ")":
-          raise NoClosedBracketError(self.get_all_before_this())
+          return self.fail(NoClosedBracketError(self.get_all_before_this()), exp)
         else:
           self.next()
           return exp
 
  
   def try_w_exp(self):
-    """This function DO SELF.NEXT()"""
-    word = Memory.positive_zero()
-    value = self.try_exp()
+    """This function DO SELF.NEXT(), returns list of (exp, field)"""
+    value = self.try_exp(self.expected_w_exp)
     if value is None:
       return None
 
-    if self.look() == "(":
-      self.next()
-      field = self.try_f_part()
-    else:
-      field = 5 # it's property of w-exp that empty f-part means not default value but 0:5
-      self.next()
-
-    if Memory.apply_to_word(value, word, field) is None:
-      raise InvalidFieldSpecError(field)
-
+    parts = []
+    field = 5 # it's property of w-exp that empty f-part means not default value but 0:5
     while True:
-      if self.get() != ",":
-        break
-
-      self.next()
-
-      value = self.try_exp()
-      if value is None:
-        raise ExpectedExpError(self.get_all_before_this())
-
       if self.look() == "(":
         self.next()
         field = self.try_f_part()
       else:
-        field = get_codes(self.line.operation)[1]
         self.next()
+      parts.append((value, field))
 
-      if Memory.apply_to_word(value, word, field) is None:
-        raise InvalidFieldSpecError(field)
-    return Memory.mix2dec(word)
+      if self.get() != ",":
+        break
+
+      self.next()
+
+      value = self.try_exp(self.expected_exp)
+      if value is None:
+        parts.append((self.fail(self.expected_exp()), None))
+        break
+      field = get_codes(self.line.operation)[1]
+    return parts
 
 
   def try_literal(self):
+    """Returns (w_exp, sign of zero)"""
     if self.get() != "=":
       return None
-    
+
     self.next()
     res = self.try_w_exp()
     if res is None:
-      raise ExpectedWExpError(self.line.argument)
+      res = [(self.fail(self.expected_w_exp()), None)]
+    elif self.get() != "=":
+      res.append((self.fail(NoEqualSignError(self.get_all_before_this())), None))
     else:
-      if self.get() != "=":
-        raise NoEqualSignError(self.get_all_before_this())
-      else:
-        # line of expression must be less than 10 digits
-        length = self.line.argument.find("=", 1) - 1
-        if length >= 10:
-          raise TooLongLiteralError(self.line.argument[1 : length + 1])
-
-        if self.npass == 1:
-          return 0
-
-        if res == 0:
-          try:
-            if self.line.argument[1] == '-': # (self.line.argument[0] = "=")!!
-              return_tuple = (0, -1)
-            else:
-              return_tuple = (0, +1)
-          except:
-            return_tuple = (0, +1)
-        else:
-          return_tuple = (abs(res), 1 if res >= 0 else -1)
-        return self.symbol_table.add_literal(return_tuple)
+      # line of expression must be less than 10 digits
+      length = self.line.argument.find("=", 1) - 1
+      if length >= 10:
+        res.append((self.fail(TooLongLiteralError(self.line.argument[1 : length + 1])), None))
+
+    try:
+      zero_sign = -1 if self.line.argument[1] == '-' else +1 # (self.line.argument[0] = "=")!!
+    except:
+      zero_sign = +1
+    return (res, zero_sign)
 
   def try_addr_part(self):
-    """This function DO SELF.NEXT()"""
-    res = self.try_any(
-      (self.try_exp, self.try_future_symbol, self.try_literal)
-    )
-    if res is None:
-      return 0
-    else:
+    """This function DO SELF.NEXT(), returns ("exp", exp), ("literal", literal) or None"""
+    exp = self.try_exp(self.invalid_addr)
+    if exp is not None:
+      self.next()
+      return ("exp", exp)
+    literal = self.try_literal()
+    if literal is not None:
       self.next()
-      return res
+      return ("literal", literal)
+    return None
 
 
   def try_argument(self):
+    """Returns (kind, tree)"""
     if is_instruction(self.line.operation):
       addr_part = self.try_addr_part()
       # done self.next() !!!
@@ -394,33 +335,129 @@ class ArgumentParser:
       if self.get() is not None:
         if self.get_all_before_this() == "":
           # this is invalid address: wrong label or something else
-          raise InvalidAddrError(self.get_all_forward_from_this())
-        raise UnexpectedStrInTheEndError(self.get_all_forward_from_this())
-
-      if not (abs(addr_part < 4000)):
-        raise InvalidAddrError(addr_part)
-
-      if not (0 <= f_part <= 63):
-        raise InvalidFieldSpecError(f_part)
-      # check if field fixed for this instruction and f_part is different from default
-      if is_field_fixed(self.line.operation) and f_part != get_codes(self.line.operation)[1]:
-        raise FieldFixedError(self.line.operation)
-
-      if not (0 <= ind_part <= 6):
-        raise InvalidIndError(ind_part)
-
-      return Memory.sign(addr_part) * (abs(addr_part) * 64**3 + ind_part * 64**2 + f_part * 64)
+          f_part = self.fail(InvalidAddrError(self.get_all_forward_from_this()), f_part)
+        else:
+          f_part = self.fail(UnexpectedStrInTheEndError(self.get_all_forward_from_this()), f_part)
+      return ("instruction", (addr_part, ind_part, f_part))
     elif self.line.operation in ("EQU", "ORIG", "CON", "END"):
       res = self.try_w_exp()
       # done self.next() !!!
-      if res is not None:
-        if self.get() is not None:
-          raise UnexpectedStrInTheEndError(self.get_all_forward_from_this())
-        return res
-      else:
-        raise ExpectedWExpError(self.line.argument)
+      if res is None:
+        res = [(self.fail(self.expected_w_exp()), None)]
+      elif self.get() is not None:
+        res.append((self.fail(UnexpectedStrInTheEndError(self.get_all_forward_from_this())), None))
+      return ("w_exp", res)
     else: # self.line.instruction = "ALF"
       res = self.try_alf_word()
       if self.look() is not None:
-        raise UnexpectedStrInTheEndError(self.get_all_after_this())
-      return res
+        res = self.fail(UnexpectedStrInTheEndError(self.get_all_after_this()), res)
+      return ("w_exp", [(res, 5)])
+
+
+def _fold(neg, atoms, ops):
+  """Expression which has only numbers is computed"""
+  if all(atom.__class__ is int for atom in atoms):
+    try:
+      return Argument.exp_value((neg, atoms, ops), None)
+    except ArithmeticError:
+      pass # it's raised when line is assembled
+  return (neg, atoms, ops)
+
+
+class Argument:
+  """Tree of argument, it's made by ArgumentParser"""
+  __slots__ = ("source", "kind", "tree", "symbols", "zero_sign")
+
+  def __init__(self, line, kind, tree, symbols, uses_cur_addr = True):
+    self.source = (line.operation, line.argument)
+    self.kind = kind        # "instruction", "w_exp" or "const" (computed argument)
+    self.tree = tree
+    self.symbols = symbols  # symbol -> error if it isn't defined
+    try:
+      self.zero_sign = -1 if line.argument[0] == '-' else +1
+    except:
+      self.zero_sign = +1
+
+    if kind == "w_exp" and not symbols and not uses_cur_addr:
+      # constant, it's kept as tree if it has errors
+      try:
+        self.kind, self.tree = "const", self.result(self.w_exp_value(tree, None))
+      except (AssemblyError, ArithmeticError):
+        pass
+
+  @staticmethod
+  def exp_value(exp, context):
+    """context is (symbol table, line number, cur_addr) or None if exp has only numbers"""
+    if exp.__class__ is int:
+      return exp
+    neg, atoms, ops = exp
+    atom = atoms[0]
+    result = atom if atom.__class__ is int else Argument.atom_value(atom, context)
+    if neg:
+      result = -result
+    for i in range(len(ops)):
+      atom = atoms[i + 1]
+      result = ops[i](result, atom if atom.__class__ is int else Argument.atom_value(atom, context))
+    return result
+
+  @staticmethod
+  def atom_value(atom, context):
+    if atom.__class__ is str:
+      symbol_table, line_number, cur_addr, symbols = context
+      if atom == "*":
+        return cur_addr
+      value = symbol_table.find(atom, line_number)
+      if value is not None:
+        return value
+      atom = symbols[atom]
+    raise atom.__class__(atom.info) # error kept in tree
+
+  @staticmethod
+  def w_exp_value(w_exp, context):
+    word = Memory.positive_zero()
+    for value, field in w_exp:
+      value = Argument.exp_value(value, context)
+      field = Argument.exp_value(field, context)
+      if Memory.apply_to_word(value, word, field) is None:
+        raise InvalidFieldSpecError(field)
+    return Memory.mix2dec(word)
+
+  def result(self, res):
+    if res == 0:
+      return (0, self.zero_sign)
+    return (abs(res), +1 if res > 0 else -1)
+
+  def evaluate(self, line, symbol_table, cur_addr, npass = 1):
+    """Returns (abs(value), sign) of argument"""
+    if self.kind == "const":
+      return self.tree
+
+    context = (symbol_table, line.line_number, cur_addr, self.symbols)
+    if self.kind == "w_exp":
+      return self.result(self.w_exp_value(self.tree, context))
+
+    addr_part, ind_part, f_part = self.tree
+    if addr_part is None:
+      addr = 0
+    elif addr_part[0] == "exp":
+      addr = self.exp_value(addr_part[1], context)
+    else:
+      w_exp, zero_sign = addr_part[1]
+      res = self.w_exp_value(w_exp, context)
+      if npass == 1:
+        addr = 0
+      else:
+        addr = symbol_table.add_literal((abs(res), 1 if res > 0 else (-1 if res < 0 else zero_sign)))
+    ind = self.exp_value(ind_part, context)
+    f = self.exp_value(f_part, context)
+
+    if not (abs(addr < 4000)):
+      raise InvalidAddrError(addr)
+    if not (0 <= f <= 63):
+      raise InvalidFieldSpecError(f)
+    # check if field fixed for this instruction and f_part is different from default
+    if is_field_fixed(line.operation) and f != get_codes(line.operation)[1]:
+      raise FieldFixedError(line.operation)
+    if not (0 <= ind <= 6):
+      raise InvalidIndError(ind)
+    return self.result(Memory.sign(addr) * (abs(addr) * 64**3 + ind * 64**2 + f * 64))
@@ -10,6 +10,7 @@ class Line:
   def __init__(self, label, operation, argument, line_number = 0, asm_address = None):
     self.label, self.operation, self.argument, self.line_number = label, operation, argument, line_number
     self.asm_address = asm_address
+    self.compiled = None # tree of argument, see parse_argument.compile_argument()
 
   def __str__(self):
     return "%3i: (%10s) %4s %s" % (self.line_number, self.label, self.operation, self.argument)
@@ -95,14 +96,15 @@ def parse_line(text_line):
 
   return Line(label, operation, argument)
 
-def parse_lines(lines):
+def parse_lines(lines, parse = parse_line):
+  """parse - function like parse_line()"""
   errors = []           # array for (line_numbers, error_messages)
   result = []
 
   has_end = False
   for i in range(len(lines)):
     try:
-      line = parse_line(lines[i])
+      line = parse(lines[i])
     except AssemblyError as error:
       errors.append( (i + 1, error) )
     else:
@@ -0,0 +1,146 @@
+# session.py
+
+# incremental assembling of source which is edited (used by gui)
+
+# Session keeps results of the last assembling:
+#   - parsed lines by their text, so only new or edited lines are parsed (trees of arguments are kept too)
+#   - state after the 1st pass, it's used again if labels and lines which change addresses
+#     (EQU, ORIG, END, numbers of lines) are the same
+#   - state after the 2nd pass with address of every line, so if only arguments or operations of
+#     instructions, CON and ALF are edited, only their words are assembled again.
+# In other cases (literals, errors, words at other addresses) the 2nd pass is done for all lines.
+
+from errors import *
+from parse_line import parse_line, parse_lines, Line
+from assemble import Assembler
+from symbol_table import SymbolTable
+from asm_cache import Assembled
+
+# lines which change addresses and labels on the 1st pass (other ones take one cell)
+PASS1_OPERATIONS = ("EQU", "ORIG", "END")
+
+class _SessionAssembler(Assembler):
+  def _do_pass(self):
+    """The 2nd pass also keeps (cell before line, cell after line, literals or errors added) for every line"""
+    if self.npass == 1:
+      return Assembler._do_pass(self)
+    self.records = []
+    for line in self.lines:
+      ca, literals, errors = self.ca, len(self.symtable.literals), len(self.errors)
+      self._do_line(line)
+      self.records.append((ca, self.ca, len(self.symtable.literals) != literals or len(self.errors) != errors))
+
+class AsmSession:
+  def __init__(self):
+    self.parsed = {}    # text of line -> Line (without number), None (comment) or AssemblyError
+    self.pass1 = None   # (signature, Assembler) after the 1st pass
+    self.pass2 = None   # (lines, _SessionAssembler) after the 2nd pass
+    self.stats = {"parsed" : 0, "pass1" : 0, "pass2" : 0, "patched" : 0}
+
+  def _parse_line(self, text):
+    """parse_line() for text which wasn't parsed before, returns new Line"""
+    try:
+      result = self.parsed[text]
+    except KeyError:
+      self.stats["parsed"] += 1
+      try:
+        result = parse_line(text)
+      except AssemblyError as err:
+        result = err
+      self.parsed[text] = result
+    if isinstance(result, AssemblyError):
+      raise result
+    if result is None:
+      return None
+    line = Line(result.label, result.operation, result.argument)
+    line.parsed = result
+    line.compiled = result.compiled
+    return line
+
+  @staticmethod
+  def _signature(lines):
+    """All that the 1st pass depends on"""
+    return [(line.line_number, line.label) + ((line.operation, line.argument) if line.operation in PASS1_OPERATIONS else ())
+            for line in lines]
+
+  def assemble(self, src_lines):
+    """Returns (syntax errors, assembler errors, Assembled or None if there are errors) like asm_cache.assemble()"""
+    lines, errors = parse_lines(src_lines, self._parse_line)
+    # forget lines which were deleted
+    if len(self.parsed) > 2 * len(src_lines) + 100:
+      texts = set(src_lines)
+      self.parsed = dict((text, result) for text, result in self.parsed.items() if text in texts)
+    if len(errors) > 0:
+      return (errors, [], None)
+
+    signature = self._signature(lines)
+    if self.pass1 is None or self.pass1[0] != signature:
+      self.stats["pass1"] += 1
+      asm = Assembler()
+      asm.run(lines, 1)
+      self.pass1 = (signature, asm)
+      self.pass2 = None
+
+    asm = self._patch(lines) if self.pass2 is not None else None
+    if asm is None:
+      self.stats["pass2"] += 1
+      asm = self._second_pass(lines)
+    else:
+      self.stats["patched"] += 1
+    self.pass2 = (lines, asm)
+
+    # trees of arguments are kept for next assemblings
+    for line in lines:
+      if line.parsed.compiled is None:
+        line.parsed.compiled = line.compiled
+
+    if len(asm.errors) > 0:
+      return ([], asm.errors, None)
+    return ([], [], Assembled.from_assembler(asm, lines))
+
+  def _second_pass(self, lines):
+    pass1 = self.pass1[1]
+    asm = _SessionAssembler(SymbolTable(pass1.symtable.labels, pass1.symtable.local_labels))
+    asm.lines = lines
+    asm.start_address = None
+    asm.end_address = pass1.end_address
+    asm.errors = pass1.errors[:]
+    asm.error_set = set(pass1.error_set)
+    asm.second_pass()
+    return asm
+
+  def _patch(self, lines):
+    """Assembles only edited lines (the 1st pass is the same), returns None if it can't be done"""
+    old_lines, old = self.pass2
+    if len(old.errors) > 0:
+      return None
+
+    changed = []
+    for i in range(len(lines)):
+      line, old_line = lines[i], old_lines[i]
+      if line.parsed is old_line.parsed:
+        line.asm_address = old_line.asm_address
+      else:
+        ca, next_ca, other = old.records[i]
+        if other or next_ca != ca + 1:
+          return None
+        changed.append(i)
+
+    asm = _SessionAssembler(SymbolTable(old.symtable.labels, old.symtable.local_labels, old.symtable.literals[:]))
+    asm.lines = lines
+    asm.memory.memory = [word[:] for word in old.memory.memory]
+    asm.start_address, asm.end_address = old.start_address, old.end_address
+    asm.errors, asm.error_set = [], set()
+    asm.cell_lines = dict(old.cell_lines)
+    asm.symtable.literal_address = old.symtable.literal_address
+    asm.records = old.records
+    asm.npass = 2
+    for i in changed:
+      ca, next_ca, other = old.records[i]
+      asm.ca = ca
+      del asm.cell_lines[ca]
+      asm._do_line(lines[i])
+      # words at other addresses, new literals and errors change other lines
+      if asm.ca != next_ca or len(asm.errors) > 0 or len(asm.symtable.literals) != len(old.symtable.literals):
+        return None
+    return asm
@@ -6,6 +6,8 @@ from parse_argument import *
 from operations import *
 from errors import *
 
+from bisect import bisect_left, bisect_right, insort
+
 def is_local_label(label):
   return len(label) == 2 and label[0].isdigit() and label[1] in ('H', 'h')
 
@@ -21,6 +23,7 @@ class SymbolTable:
     self.literals = []     if literals     is None else literals
     self.labels = {}       if labels       is None else labels
     self.local_labels = {} if local_labels is None else local_labels
+    self.local_index = {}  # local label -> (line numbers, addresses in order of lines, sorted addresses)
 
   def set_label(self, label, address, lineno): 
     if label is None:
@@ -28,6 +31,12 @@ class SymbolTable:
 
     if is_local_label(label):
       self.local_labels.setdefault(label, []).append( (address, lineno) )
+      if label in self.local_index:
+        lines, by_line, addresses = self.local_index[label]
+        i = bisect_right(lines, lineno)
+        lines.insert(i, lineno)
+        by_line.insert(i, address)
+        insort(addresses, address)
     else:
       if label in self.labels:
         raise RepeatedLabelError(label)
@@ -45,43 +54,46 @@ class SymbolTable:
     if label in self.labels:
       return self.labels[label]
 
-    # find in local_labels
+    # find in local_labels: the nearest definition before or after line
     if is_local_label_reference(label):
       local_label = label[0] + 'H'
       if local_label in self.local_labels:
-        b_label, f_label = None, None
-        for x in self.local_labels[local_label]:
-          if x[1] < line_number:
-            b_label = x
-          if x[1] > line_number:
-            f_label = x
-            break
-
-        if label[1] == 'B' and b_label is not None:
-          return b_label[0]
-        elif label[1] == 'F' and f_label is not None:
-          return f_label[0]
+        lines, by_line, addresses = self._local_index(local_label)
+        if label[1] == 'B':
+          i = bisect_left(lines, line_number)
+          if i > 0:
+            return by_line[i - 1]
+        elif label[1] == 'F':
+          i = bisect_right(lines, line_number)
+          if i < len(lines):
+            return by_line[i]
 
       raise InvalidLocalLabelError(label)
 
     return None
 
   def find_local_by_address(self, label, addr):
-    """Used by disassembler"""
+    """Used by disassembler, returns the nearest address before or after addr"""
     if is_local_label_reference(label):
       local_label = label[0] + 'H'
       if local_label in self.local_labels:
-        b_label, f_label = None, None
-        for x in self.local_labels[local_label]:
-          if x[0] < addr:
-            b_label = x
-          if x[0] > addr:
-            f_label = x
-            break
-
-        if label[1] == 'B' and b_label is not None:
-          return b_label[0]
-        elif label[1] == 'F' and f_label is not None:
-          return f_label[0]
-
-    return None
\ No newline at end of file
+        lines, by_line, addresses = self._local_index(local_label)
+        if label[1] == 'B':
+          i = bisect_left(addresses, addr)
+          if i > 0:
+            return addresses[i - 1]
+        elif label[1] == 'F':
+          i = bisect_right(addresses, addr)
+          if i < len(addresses):
+            return addresses[i]
+
+    return None
+
+  def _local_index(self, local_label):
+    """Sorted definitions of local label for bisect, they are made once (set_label() keeps them)"""
+    index = self.local_index.get(local_label)
+    if index is None:
+      definitions = sorted(self.local_labels[local_label], key = lambda x: x[1])
+      index = ([x[1] for x in definitions], [x[0] for x in definitions], sorted(x[0] for x in definitions))
+      self.local_index[local_label] = index
+    return index
\ No newline at end of file
@@ -0,0 +1,239 @@
+# bench.py
+
+# Benchmarks of virtual machine, words, assembler and disassembler.
+# Runs programs from test/assembler/mix_programs and synthetic kernels (kernels.py),
+# prints results and can save them to JSON file for comparing with other runs:
+#   bench.py -o new.json
+#   bench.py --compare old.json new.json
+
+import sys, os, io, json, time, tracemalloc, subprocess
+from optparse import OptionParser
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'vm'))
+sys.path.append(os.path.join(ROOT, 'assembler'))
+sys.path.append(os.path.join(ROOT, 'common'))
+
+from virt_machine import VMachine
+from vm_errors import VMError
+from device import FileDevice
+from word import Word
+from parse_line import parse_lines
+from assemble import Assembler
+from disasm import Disasm
+from kernels import KERNELS
+
+PROGRAMS_DIR = os.path.join(ROOT, 'test', 'assembler', 'mix_programs')
+
+DEFAULT_MAX_CYCLES = 500000
+
+class BenchError(Exception):
+  pass
+
+def read_programs():
+  """Returns list of (name, source lines, must halt) of all programs and kernels"""
+  programs = []
+  for fn in sorted(os.listdir(PROGRAMS_DIR)):
+    if fn.endswith(".mix"):
+      with open(os.path.join(PROGRAMS_DIR, fn), "r") as f:
+        programs.append((fn[:-4], f.read().splitlines(), False))
+  # test programs can stop with error or loop, but kernels measure exactly what they are written for
+  for name in sorted(KERNELS):
+    programs.append((name, KERNELS[name].splitlines(), True))
+  return programs
+
+def assemble(src_lines):
+  """Returns assembler or None if program has errors"""
+  lines, errors = parse_lines(src_lines)
+  if len(errors) > 0:
+    return None
+  asm = Assembler()
+  asm.run(lines)
+  return asm if len(asm.errors) == 0 else None
+
+def make_vm(asm, engine):
+  vm = VMachine(asm.memory.memory, asm.start_address)
+  vm.set_engine(engine)
+  vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = io.StringIO()))
+  vm.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = io.StringIO("HELLO\n" * 100)))
+  return vm
+
+def measure(func, repeat):
+  """Returns (best time, result of func, peak of allocated memory in bytes)"""
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  # memory is measured in separate run, because tracing is slow
+  tracemalloc.start()
+  func()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return best, result, peak
+
+def bench_vm(name, asm, max_cycles, repeat, must_halt = False):
+  """Runs program by step() and by run() with every engine until halt, error or max_cycles,
+     raises BenchError if must_halt and program doesn't halt"""
+  def steps():
+    vm = make_vm(asm, VMachine.INTERPRETER)
+    instructions = 0
+    try:
+      while not vm.halted and vm.cycles < max_cycles:
+        vm.step()
+        instructions += 1
+    except VMError:
+      pass
+    return instructions, vm.cycles, vm.halted
+
+  def run(engine):
+    def func():
+      vm = make_vm(asm, engine)
+      try:
+        vm.run(max_cycles)
+      except VMError:
+        pass
+      return vm.cycles, vm.halted
+    return func
+
+  results = {}
+  elapsed, (instructions, cycles, halted), peak = measure(steps, repeat)
+  # all ways of execution do the same instructions
+  for mode, func in (("step", steps), ("run", run(VMachine.INTERPRETER)), ("fusion", run(VMachine.FUSION)),
+                     ("translator", run(VMachine.TRANSLATOR))):
+    if mode != "step":
+      elapsed, (_, halted), peak = measure(func, repeat)
+    if must_halt and not halted:
+      raise BenchError("%s didn't halt in %i cycles (%s)" % (name, max_cycles, mode))
+    results["vm_%s/%s" % (mode, name)] = {
+      "instructions": instructions,
+      "cycles": cycles,
+      "time": elapsed,
+      "instructions_per_sec": instructions / elapsed,
+      "cycles_per_sec": cycles / elapsed,
+      "peak_memory": peak
+    }
+  return results
+
+def bench_asm(name, src_lines, repeat):
+  def func():
+    return assemble(src_lines)
+  elapsed, _, peak = measure(func, repeat)
+  return {"asm/" + name: {
+    "lines": len(src_lines),
+    "time": elapsed,
+    "lines_per_sec": len(src_lines) / elapsed,
+    "peak_memory": peak
+  }}
+
+def bench_disasm(name, asm, repeat):
+  words = [Word(word) for word in asm.memory.memory]
+  def func():
+    disasm = Disasm()
+    for addr, word in enumerate(words):
+      disasm.disasm2str(word, addr, asm.symtable, asm.end_address, "\t")
+  elapsed, _, peak = measure(func, repeat)
+  return {"disasm/" + name: {
+    "words": len(words),
+    "time": elapsed,
+    "words_per_sec": len(words) / elapsed,
+    "peak_memory": peak
+  }}
+
+def bench_word(repeat, count = 20000):
+  """Word arithmetic and slicing"""
+  numbers = [(i * 7919) % (64**5) - 64**5 // 2 for i in range(count)]
+  def func():
+    total = 0
+    for num in numbers:
+      word = Word(num)
+      total += int(word) + int(word[1:3])
+      word[4:5] = num
+    return total
+  elapsed, _, peak = measure(func, repeat)
+  return {"word/arithmetic": {
+    "operations": 4 * count,
+    "time": elapsed,
+    "operations_per_sec": 4 * count / elapsed,
+    "peak_memory": peak
+  }}
+
+def run_benchmarks(name_filter, max_cycles, repeat):
+  results = {}
+  results.update(bench_word(repeat))
+  for name, src_lines, must_halt in read_programs():
+    if name_filter is not None and name_filter not in name:
+      continue
+    asm = assemble(src_lines)
+    if asm is None:
+      if must_halt:
+        raise BenchError("%s can't be assembled" % name)
+      # can't be assembled (bad labels)
+      continue
+    results.update(bench_asm(name, src_lines, repeat))
+    results.update(bench_disasm(name, asm, repeat))
+    results.update(bench_vm(name, asm, max_cycles, repeat, must_halt))
+  return results
+
+def git_commit():
+  try:
+    return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd = ROOT, stderr = subprocess.DEVNULL).decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+SPEED_KEYS = ("instructions_per_sec", "cycles_per_sec", "lines_per_sec", "words_per_sec", "operations_per_sec")
+
+def print_results(results):
+  for name in sorted(results):
+    result = results[name]
+    speeds = ", ".join("%s: %.0f" % (key, result[key]) for key in SPEED_KEYS if key in result)
+    print("%-40s %8.4fs  %s, peak_memory: %i" % (name, result["time"], speeds, result["peak_memory"]))
+
+def compare(old, new):
+  """Prints ratio new/old of speeds and memory for benchmarks from both runs"""
+  print("old: %s\nnew: %s" % (old.get("commit"), new.get("commit")))
+  for name in sorted(set(old["results"]) & set(new["results"])):
+    a, b = old["results"][name], new["results"][name]
+    ratios = ["%s x%.2f" % (key, b[key] / a[key]) for key in SPEED_KEYS if key in a and key in b and a[key] > 0]
+    if a["peak_memory"] > 0:
+      ratios.append("peak_memory x%.2f" % (b["peak_memory"] / a["peak_memory"]))
+    print("%-40s %s" % (name, ", ".join(ratios)))
+
+def main():
+  parser = OptionParser()
+  parser.set_usage("bench.py [OPTIONS]\n       bench.py --compare OLD.json NEW.json")
+  parser.add_option("-o", "--output", dest = "output", default = None, help = "save results to JSON file")
+  parser.add_option("-r", "--repeat", dest = "repeat", type = "int", default = 3,
+      help = "number of runs, the best time is used (default 3)")
+  parser.add_option("-c", "--cycles", dest = "max_cycles", type = "int", default = DEFAULT_MAX_CYCLES,
+      help = "cycle limit for every program (default %i)" % DEFAULT_MAX_CYCLES)
+  parser.add_option("-f", "--filter", dest = "name_filter", default = None,
+      help = "run only programs which names contain this string")
+  parser.add_option("--compare", dest = "compare", default = False, action = "store_true",
+      help = "compare two saved results")
+  (options, args) = parser.parse_args()
+
+  if options.compare:
+    if len(args) != 2:
+      parser.print_usage()
+      return 1
+    with open(args[0], "r") as old_file, open(args[1], "r") as new_file:
+      compare(json.load(old_file), json.load(new_file))
+    return 0
+
+  try:
+    results = run_benchmarks(options.name_filter, options.max_cycles, options.repeat)
+  except BenchError as e:
+    sys.stderr.write("bench.py: %s\n" % e)
+    return 1
+  print_results(results)
+  if options.output is not None:
+    with open(options.output, "w") as f:
+      json.dump({"commit": git_commit(), "python": sys.version.split()[0], "max_cycles": options.max_cycles,
+                 "results": results}, f, indent = 1, sort_keys = True)
+  return 0
+
+# if we executing module
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,47 @@
+# synthetic mix programs for benchmarks, every kernel must halt within default cycle limit of bench.py
+
+KERNELS = {}
+
+# tight loop of ADD, INC, CMP and jump, repeated by outer loop (INC keeps only 2 bytes, so N < 4096)
+KERNELS["add_loop"] = """
+        ORIG 1000
+START   ENT2 8
+        ENTA 0
+OUTER   ENT1 0
+LOOP    ADD  ONE
+        INC1 1
+        CMP1 N
+        JL   LOOP
+        DEC2 1
+        J2P  OUTER
+        HLT
+ONE     CON  1
+N       CON  4000
+        END  START
+"""
+
+# copying of 63 words by MOVE many times
+KERNELS["move_copy"] = """
+        ORIG 1000
+START   ENT2 2000
+LOOP    ENT1 2000
+        MOVE 0(63)
+        DEC2 1
+        J2P  LOOP
+        HLT
+        END  START
+"""
+
+# printing of one line many times, most of time is spent for waiting the printer
+KERNELS["out_loop"] = """
+PRINTER EQU  18
+        ORIG 0
+BUF     ALF  HELLO
+        ORIG 1000
+START   ENT1 500
+LOOP    OUT  BUF(PRINTER)
+        DEC1 1
+        J1P  LOOP
+        HLT
+        END  START
+"""
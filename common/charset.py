@@ -26,3 +26,44 @@ def ord(char, default = None):
 def chr(num, default = None):
   """Int -> Char"""
   return chr_table[num] if 0 <= num < charset_len else default
+
+# Bulk conversion: tables for bytes.translate (char in latin-1 -> code and code -> char),
+# chars and codes out of charset are translated to INVALID
+INVALID = 0xFF
+_encode_table = bytearray([INVALID]) * 256
+for _char, _code in ord_table.items():
+  _encode_table[_char.encode("latin-1")[0]] = _code
+_encode_table = bytes(_encode_table)
+_decode_table = bytearray([INVALID]) * 256
+_decode_table[:charset_len] = "".join(chr_table).encode("latin-1")
+_decode_table = bytes(_decode_table)
+
+class CharsetError(ValueError):
+  """Char (or code) out of charset, position is its index in converted string"""
+  def __init__(self, position, value):
+    ValueError.__init__(self, "%r at position %i is out of charset" % (value, position))
+    self.position = position
+    self.value = value
+
+def encode(text, default = None):
+  """Str -> bytes of codes, chars out of charset are replaced by default code (CharsetError if it's None)"""
+  codes = text.encode("latin-1", "replace").translate(_encode_table) # every char gives one byte
+  if default != INVALID and INVALID in codes:
+    if default is None:
+      position = codes.index(INVALID)
+      raise CharsetError(position, text[position])
+    codes = codes.replace(bytes([INVALID]), bytes([default]))
+  return codes
+
+def decode(codes, default = None):
+  """Bytes (or list) of codes -> str, codes out of charset are replaced by default char (CharsetError if it's None)"""
+  try:
+    data = bytes(codes).translate(_decode_table)
+  except ValueError: # code isn't in 0..255
+    data = bytes(code if 0 <= code < 256 else INVALID for code in codes).translate(_decode_table)
+  if INVALID in data:
+    if default is None:
+      position = data.index(INVALID)
+      raise CharsetError(position, codes[position])
+    return data.decode("latin-1").replace("\xff", default)
+  return data.decode("latin-1")
@@ -4,7 +4,7 @@ class Disasm:
     """Returns (instruction_name, address, index, field)"""
     c = word[5]
     f = word[4]
-    instruction_name = codes.get(c, codes.get((c,f), None))
+    instruction_name = codes.get((c,f), codes.get(c, None)) # (c, f) first: FADD is ADD with f = 6
     return (instruction_name, int(word[0:2]), word[3], word[4])
 
   @staticmethod
@@ -50,7 +50,7 @@ class Disasm:
 
     # -------------TWO_CASES-------------
     if instr is None:
-      return self.returnCon(label[0], word, separator)
+      return self.returnCon(label, word, separator)
     if int(word) == 0:
       return self.returnNop(label, separator)
 
@@ -121,12 +121,18 @@ instructions_with_field_spec = ( # such as (3:4)
 codes = {
   ( 0   ) : "nop",
   ( 1   ) : "add",
+  ( 1, 6) : "fadd",
   ( 2   ) : "sub",
+  ( 2, 6) : "fsub",
   ( 3   ) : "mul",
+  ( 3, 6) : "fmul",
   ( 4   ) : "div",
+  ( 4, 6) : "fdiv",
   ( 5, 0) : "num",
   ( 5, 1) : "char",
   ( 5, 2) : "hlt",
+  ( 5, 6) : "flot",
+  ( 5, 7) : "fix",
   ( 6, 0) : "sla",
   ( 6, 1) : "sra",
   ( 6, 2) : "slax",
@@ -256,6 +262,7 @@ codes = {
   (55, 2) : "entx",
   (55, 3) : "ennx",
   (56   ) : "cmpa",
+  (56, 6) : "fcmp",
   (57   ) : "cmp1",
   (58   ) : "cmp2",
   (59   ) : "cmp3",
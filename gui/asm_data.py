@@ -4,6 +4,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'assembler'))
 from parse_line import *
 from assemble import *
 from listing import *
+from asm_cache import assemble, default_cache
+from session import AsmSession
 #from errors import *
 
 # types of returning value
@@ -19,23 +21,30 @@ class AsmData:
     self.symtable = symtable
     self.end_address = end_address
 
-def asm(text):
+def asm(text, session = None):
+  """session - AsmSession of edited source (only changes are assembled) or None"""
   src_lines = text.splitlines()
 
-  lines, errors = parse_lines(src_lines)
-  if len(errors) > 0: # we have errors
-    return (ASM_SYNTAX_ERRORS, errors)
-
-  asm = Assembler()
-  asm.run(lines)
-
-  memory_list = asm.memory.memory
-  start_address = asm.start_address
-  errors = asm.errors
+  if session is not None:
+    syntax_errors, errors, assembled = session.assemble(src_lines)
+  else:
+    # unchanged sources are taken from cache (if it's set in environment, see asm_cache.py)
+    syntax_errors, errors, assembled = assemble(src_lines, default_cache())
+  if len(syntax_errors) > 0: # we have errors
+    return (ASM_SYNTAX_ERRORS, syntax_errors)
 
   if len(errors) > 0: # we have errors
     return (ASM_ASSEMBLER_ERRORS, errors)
 
-  listing = Listing(src_lines, lines, memory_list, asm.symtable.literals, asm.end_address)
+  listing = assembled.listing(src_lines)
 
-  return (ASM_NO_ERRORS, AsmData(memory_list, start_address, listing, asm.symtable, asm.end_address))
\ No newline at end of file
+  return (ASM_NO_ERRORS, AsmData(assembled.memory, assembled.start_address, listing, assembled.symtable, assembled.end_address))
+
+def check(text, session):
+  """Returns type and list of errors of source (for checking while it's edited)"""
+  syntax_errors, errors, assembled = session.assemble(text.splitlines())
+  if len(syntax_errors) > 0:
+    return (ASM_SYNTAX_ERRORS, syntax_errors)
+  if len(errors) > 0:
+    return (ASM_ASSEMBLER_ERRORS, errors)
+  return (ASM_NO_ERRORS, [])
@@ -7,6 +7,9 @@ from devices_ui import Ui_Form
 import sys, os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'vm'))
 from device import Device
+from vm_errors import InvalidCharError, InvaliCharCodeError
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+import charset
 
 class DevDockWidget(QDockWidget, Ui_Form):
   def __init__(self, parent = None):
@@ -33,7 +36,10 @@ class QTextEditOutputDevice(Device):
   def write(self, bytes, limits):
     """Write <block_size> chars"""
     Device.write(self, bytes, limits)
-    self._addLine( "".join(map(Device._chr, bytes)) )
+    try:
+      self._addLine(charset.decode(bytes))
+    except charset.CharsetError as e:
+      raise InvaliCharCodeError(e.value)
 
   def control(self):
     """Jump to newline"""
@@ -43,6 +49,16 @@ class QTextEditOutputDevice(Device):
   def reset(self):
     self.edit.setPlainText("")
 
+  def get_state(self):
+    return Device.get_state(self) + [len(self.edit.toPlainText().splitlines())]
+
+  def set_state(self, state):
+    """Lines written after state was saved are removed"""
+    Device.set_state(self, state)
+    lines = self.edit.toPlainText().splitlines()
+    if len(lines) > state[5]:
+      self.edit.setPlainText("".join(line + "\n" for line in lines[:state[5]]))
+
 class QTextEditInputDevice(Device):
   """Device that can read from QTextEdit widget"""
   def __init__(self, mode, block_size, lock_time, text_edit):
@@ -69,8 +85,10 @@ class QTextEditInputDevice(Device):
       line += " " * (self.block_size - len(line))
     else:
       line = line[:self.block_size]
-    bytes = list(map(Device._ord, line))
-    return bytes
+    try:
+      return list(charset.encode(line))
+    except charset.CharsetError as e:
+      raise InvalidCharError(e.value)
 
   def control(self):
     """Jump to newline"""
@@ -86,3 +104,14 @@ class QTextEditInputDevice(Device):
         text += "\n"
       text += self.edit.toPlainText()
     self.edit.setPlainText(text)
+
+  def get_state(self):
+    return Device.get_state(self) + [len(self.read_lines)]
+
+  def set_state(self, state):
+    """Lines read after state was saved are returned to TextEdit"""
+    Device.set_state(self, state)
+    if len(self.read_lines) > state[5]:
+      lines = self.read_lines[state[5]:] + str(self.edit.toPlainText()).splitlines()
+      del self.read_lines[state[5]:]
+      self.edit.setPlainText("\n".join(lines))
@@ -43,7 +43,7 @@ class ListingModel(QAbstractTableModel):
       self.words = vm_data.vm.memory
       self.is_readable = vm_data.is_readable
       self.is_locked = lambda x: not (vm_data.is_readable(x) and vm_data.is_writeable(x))
-      self.create_addr2num_data() # creates data for addr2num(...)
+      self.addr2num_data = vm_data.listing.addr2num # data for addr2num(...)
       self.current_line = self.addr2num(vm_data.ca())
       self.inited = True
     else:
@@ -182,11 +182,5 @@ class ListingModel(QAbstractTableModel):
     # else any cpu hook but cur_addr
 
 
-  def create_addr2num_data(self):
-    self.addr2num_data = dict([
-        (self.lines[i].addr, i)
-        for i in range(len(self.lines)) if self.lines[i].addr is not None
-    ])
-
   def addr2num(self, addr):
     return self.addr2num_data.get(addr)
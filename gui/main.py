@@ -20,6 +20,8 @@ from asm_data import *
 from vm_data import VMData
 
 PROGRAM_NAME = "Mix Machine"
+RUN_PORTION_CYCLES = 10000 # how many cycles are run between processing of GUI events
+CHECK_DELAY = 300 # ms after last edit of source before it's checked for errors
 
 class MainWindow(QMainWindow, Ui_MainWindow):
 
@@ -66,6 +68,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     self.action_Quit.triggered.connect(qApp.closeAllWindows)
     self.txt_source.textChanged.connect(lambda: self.setWindowModified(True))
 
+    # source is assembled while it's edited (only changed lines, see AsmSession) to show errors
+    self.asm_session = AsmSession()
+    self.check_timer = QTimer(self)
+    self.check_timer.setSingleShot(True)
+    self.check_timer.setInterval(CHECK_DELAY)
+    self.check_timer.timeout.connect(self.slot_Check)
+    self.txt_source.textChanged.connect(self.check_timer.start)
+
     self.action_Open.triggered.connect(self.slot_File_Open)
     self.action_New.triggered.connect(self.slot_File_New)
     self.action_Save.triggered.connect(self.slot_File_Save)
@@ -73,6 +83,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     self.action_Assemble.triggered.connect(self.slot_Assemble)
     self.action_Step.triggered.connect(self.slot_Step)
+    self.action_Step_back.triggered.connect(self.slot_StepBack)
     self.action_Trace.triggered.connect(self.slot_Trace)
     self.action_Run.triggered.connect(self.slot_Run)
     self.action_Break.triggered.connect(self.slot_Break)
@@ -240,8 +251,23 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     self.listing_view.hook(mode, old, new)
     self.disasm_view.hook(mode, old, new)
 
+  def slot_Check(self):
+    text = self.txt_source.toPlainText()
+    if text.strip() == "":
+      self.errors_list.hide()
+      return
+    try:
+      ret_type, errors = check(text, self.asm_session)
+    except ArithmeticError:
+      return # unfinished expression (like "1/0") can break assembler, it's shown by slot_Assemble
+    if ret_type == ASM_NO_ERRORS:
+      self.errors_list.hide()
+    else:
+      self.errors_list.setErrors(ret_type, [ "%i: %s" % err for err in errors ])
+
   def slot_Assemble(self):
-    ret_type, content = asm(self.txt_source.toPlainText())
+    self.check_timer.stop()
+    ret_type, content = asm(self.txt_source.toPlainText(), self.asm_session)
     if ret_type == ASM_NO_ERRORS:
       self.asm_data = content # mem, start_addr, listing
       self.vm_data = VMData(self.asm_data) # vm, listing
@@ -301,6 +327,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     self.doAction(self.vm_data.step)
     self.afterTrace.emit()
 
+  def slot_StepBack(self):
+    self.beforeTrace.emit()
+    if not self.vm_data.stepBack():
+      QMessageBox.information(self, self.tr("Mix machine"), self.tr("There are no more saved steps."))
+    self.afterTrace.emit()
+
   def trace_vm(self):
     while not self.vm_data.halted() and self.running:
       self.cpu_dock.resetHighlight() # it's necessary
@@ -311,7 +343,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
   def run_vm(self):
     while not self.vm_data.halted() and self.running:
-      self.vm_data.step()
+      # run by portions to process events (progress dialog and break button)
+      self.vm_data.run(self.vm_data.cycles() + RUN_PORTION_CYCLES, self.breaks)
       QCoreApplication.processEvents()
       if self.vm_data.ca() in self.breaks:
         break
@@ -366,6 +399,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     self.menu_Options.setEnabled(     True)
     self.action_Assemble.setEnabled(  True)
     self.action_Step.setEnabled(      False)
+    self.action_Step_back.setEnabled( False)
     self.action_Trace.setEnabled(     False)
     self.action_Run.setEnabled(       False)
     self.action_Break.setEnabled(     False)
@@ -374,6 +408,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     self.menu_Options.setEnabled(     True)
     self.action_Assemble.setEnabled(  True)
     self.action_Step.setEnabled(      True)
+    self.action_Step_back.setEnabled( True)
     self.action_Trace.setEnabled(     True)
     self.action_Run.setEnabled(       True)
     self.action_Break.setEnabled(     False)
@@ -382,6 +417,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     self.menu_Options.setEnabled(     False)
     self.action_Assemble.setEnabled(  False)
     self.action_Step.setEnabled(      False)
+    self.action_Step_back.setEnabled( False)
     self.action_Trace.setEnabled(     False)
     self.action_Run.setEnabled(       False)
     self.action_Break.setEnabled(     True)
@@ -6,12 +6,14 @@ import sys, os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'vm'))
 
 from virt_machine import *
+from journal import Journal
 import vm_errors
 
 class VMData:
   def __init__(self, asm_data):
     self.vm = VMachine(asm_data.mem_list, asm_data.start_addr)
     self.listing = asm_data.listing
+    self.vm.set_journal(Journal()) # for step back
 
     err_dict = vm_errors.__dict__
     self.vm_errors = list(map(
@@ -37,6 +39,12 @@ class VMData:
   def step(self):
     self.vm.step()
 
+  def stepBack(self):
+    return self.vm.step_back() == 1
+
+  def run(self, max_cycles = None, breakpoints = None):
+    self.vm.run(max_cycles, breakpoints)
+
   def is_readable(self, addr):
     return self.vm.is_readable(addr)
 
@@ -51,8 +51,7 @@ def word2str(word, type = WORD, content_type = BASIC):
     line += str(int(word[1 if content_type == BASIC else 4:5]))
 
   elif type == STR:
-    for byte in range(1 if content_type == BASIC else 4, 6):
-      line += charset.chr(word[byte], "?")
+    line += charset.decode([word[byte] for byte in range(1 if content_type == BASIC else 4, 6)], "?")
   return line
 
 def str2word(line, type, content_type, allow_mesgBox = False):
@@ -92,9 +91,8 @@ def str2word(line, type, content_type, allow_mesgBox = False):
     else:
       # 2) rI or rJ: 3 spaces added to the start and some spaces added to the end
       line = "   " + line + " " * (2 - len(line)) # set len(line) to 5
-    for byte in range(1, 6):
-      assert( line[byte - 1] != '?')
-      word[byte] = charset.ord(line[byte - 1])
+    assert('?' not in line)
+    word[1:5] = [+1] + list(charset.encode(line))
   return word
 
 class WordEdit(QDialog, Ui_Dialog):
@@ -12,6 +12,9 @@ from . import test_operations
 from . import test_assemble
 from . import test_complete_programs
 from . import test_listing
+from . import test_asm_cache
+from . import test_session
+from . import test_disasm
 
 def suite():
   return unittest.TestSuite((
@@ -23,7 +26,10 @@ def suite():
     test_parse_argument.suite,
     test_assemble.suite,
     test_complete_programs.suite,
-    test_listing.suite
+    test_listing.suite,
+    test_asm_cache.suite,
+    test_session.suite,
+    test_disasm.suite
   ))
 
 if __name__ == "__main__":
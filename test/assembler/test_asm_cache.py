@@ -0,0 +1,112 @@
+# test_asm_cache.py
+
+import unittest, sys, os, fnmatch, tempfile, shutil, time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+from asm_cache import *
+from errors import *
+
+class AsmCacheTestCase(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp(prefix = "mix_asm_cache_")
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors = True)
+
+  def programs(self):
+    dir = os.path.join(os.path.dirname(__file__), 'mix_programs')
+    for fn in sorted(os.listdir(dir)):
+      if fnmatch.fnmatch(fn, '*.mix'):
+        with open(os.path.join(dir, fn), "r") as f:
+          yield f.readlines()
+
+  def check_same(self, a, b, src_lines):
+    self.assertEqual(a.memory, b.memory)
+    self.assertEqual((a.start_address, a.end_address), (b.start_address, b.end_address))
+    self.assertEqual((a.symtable.labels, a.symtable.local_labels, a.symtable.literals),
+                     (b.symtable.labels, b.symtable.local_labels, b.symtable.literals))
+    self.assertEqual(str(a.listing(src_lines)), str(b.listing(src_lines)))
+
+  def testPrograms(self):
+    cache = AsmCache(self.directory)
+    n = 0
+    for src_lines in self.programs():
+      syntax_errors, errors, assembled = assemble(src_lines, cache)
+      if assembled is None:
+        self.assertEqual(cache.get(src_lines), None) # programs with errors aren't kept
+        continue
+      n += 1
+      self.check_same(Assembled.loads(assembled.dumps()), assembled, src_lines)
+      self.check_same(cache.get(src_lines), assembled, src_lines)
+      self.assertEqual(assemble(src_lines, cache)[2].memory, assembled.memory)
+    self.assertEqual(len(os.listdir(self.directory)), n)
+
+  def testKey(self):
+    self.assertNotEqual(AsmCache.key([" NOP", " END 0"]), AsmCache.key([" NOP\n", " END 0\n"]))
+    self.assertNotEqual(AsmCache.key(["A\n", "B"]), AsmCache.key(["A", "", "B"]))
+    self.assertEqual(AsmCache.key([" NOP", " END 0"]), AsmCache.key((" NOP", " END 0")))
+
+  def testBrokenEntry(self):
+    cache = AsmCache(self.directory)
+    src_lines = ["X EQU 5", "1H LDA =-0=", " ENTA X", " END 1B"]
+    assembled = assemble(src_lines, cache)[2]
+    self.assertEqual(assembled.symtable.literals, [(0, -1)])
+    data = assembled.dumps()
+    for broken in (data[:-3], data[:10] + b"x" + data[11:], b""):
+      self.assertRaises(ValueError, Assembled.loads, broken)
+
+    path = cache.path(cache.key(src_lines))
+    with open(path, "wb") as f:
+      f.write(data[:-3])
+    self.assertEqual(cache.get(src_lines), None)
+    self.assertFalse(os.path.exists(path)) # broken entry is removed
+
+  def testEviction(self):
+    sources = [["X%i CON %i" % (i, i), " END 0"] for i in range(5)]
+    cache = AsmCache(self.directory)
+    assemble(sources[0], cache)
+    size = os.path.getsize(cache.path(cache.key(sources[0])))
+    cache.max_size = 3 * size + size // 2
+
+    # all entries have about the same size, the least recently used ones are removed
+    now = time.time()
+    for i, src_lines in enumerate(sources):
+      assemble(src_lines, cache)
+      os.utime(cache.path(cache.key(src_lines)), (now - 100 + i, now - 100 + i))
+      if i == 2:
+        cache.get(sources[0]) # now it's the newest one
+    self.assertNotEqual(cache.get(sources[0]), None)
+    for i in (1, 2):
+      self.assertEqual(cache.get(sources[i]), None)
+    for i in (3, 4):
+      self.assertNotEqual(cache.get(sources[i]), None)
+
+  def testReadOnly(self):
+    cache = AsmCache(self.directory)
+    src_lines = [" NOP", " END 0"]
+    assembled = assemble(src_lines, cache)[2]
+    utime = os.utime
+    def failed_utime(*args, **kwargs):
+      raise PermissionError("read-only")
+    os.utime = failed_utime
+    try:
+      self.check_same(cache.get(src_lines), assembled, src_lines)
+    finally:
+      os.utime = utime
+
+  def testFailedPut(self):
+    cache = AsmCache(self.directory)
+    src_lines = [" NOP", " END 0"]
+    os.mkdir(cache.path(cache.key(src_lines))) # entry can't replace directory
+    self.assertNotEqual(assemble(src_lines, cache)[2], None)
+    self.assertEqual(os.listdir(self.directory), [os.path.basename(cache.path(cache.key(src_lines)))])
+
+  def testErrors(self):
+    self.assertEqual(assemble([" NOP"], AsmCache(self.directory))[0], [(1, NoEndError())])
+    self.assertEqual(assemble([" LDA X", " END 0"], AsmCache(self.directory))[1][0][0], 1)
+    self.assertEqual(os.listdir(self.directory), [])
+
+suite = unittest.makeSuite(AsmCacheTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
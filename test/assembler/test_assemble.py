@@ -54,7 +54,7 @@ class AssembleTestCase(unittest.TestCase):
         (2, InvalidAddrError("LABEL")),
         (3, UnexpectedStrInTheEndError("LABEL%")),
         (5, ExpectedWExpError("LABEL%")),
-        (7, RepeatedCellError("0")),
+        (7, RepeatedCellError((0, 4))),
         (8, InvalidLocalLabelError("7B"))
       ]
     )
@@ -0,0 +1,29 @@
+# test_disasm.py
+
+# testing of module disasm
+
+import unittest, sys, os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'vm'))
+from symbol_table import SymbolTable
+from disasm import Disasm
+from word import Word
+
+class DisasmTestCase(unittest.TestCase):
+  def test_data_words(self):
+    symtable = SymbolTable({"DATA" : 10}, {"1H" : [(12, 3)]}, [(7, 1)])
+    disasm = Disasm()
+    # (5, 3) isn't an instruction, so word is shown as CON
+    word = Word([-1, 0, 0, 0, 3, 5])
+    self.assertEqual(disasm.disasm2str(word, 11, symtable, 100, " "), " CON -197")
+    self.assertEqual(disasm.disasm2str(word, 10, symtable, 100, " "), "DATA CON -197")
+    self.assertEqual(disasm.disasm2str(word, 12, symtable, 100, " "), "1H CON -197")
+    self.assertEqual(disasm.disasm2str(Word(7), 100, symtable, 100, " "), "LITCON0000 CON 7")
+
+
+suite = unittest.makeSuite(DisasmTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -36,6 +36,7 @@ class ListingTestCase(unittest.TestCase):
       #print(listing.lines[i], result[i])
       #self.assertEqual(listing.lines[i], result[i])
     self.assertEqual(listing.lines, result)
+    self.assertEqual(listing.addr2num, dict((line.addr, i) for i, line in enumerate(result) if line.addr is not None))
 
   def test(self):
     self.check(
@@ -137,6 +138,8 @@ LABEL1 \tStA LABEL1 sample of self modified code
       ListingLine(1001, [-1, 0, 0, 0, 0, 0],      "\tCON\t-0")
     ]
     self.check(src_lines, lines, asm.memory.memory, asm.symtable.literals, asm.end_address, result)
+    # literals are assembled by END
+    self.assertEqual(asm.cell_lines, {0: 1, 1: 2, 1000: 10, 1001: 11})
     
 suite = unittest.makeSuite(ListingTestCase, 'test')
 
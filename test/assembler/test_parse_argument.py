@@ -8,7 +8,7 @@ from parse_line import Line
 
 class ParseArgumentTestCase(unittest.TestCase):
   def check_split(self, line, tokens):
-    parser = ArgumentParser(line, None, 0)
+    parser = ArgumentParser(line)
     self.assertEqual(parser.tokens, tokens)
 
   def test_split(self):
@@ -139,12 +139,50 @@ class ParseArgumentTestCase(unittest.TestCase):
       (135582544, 1))
     self.assertEqual(parse_argument(Line(None, 'ALF', '    *'), self.MockSymbolTable(), 0),
       (46, 1))
+    self.assertEqual(parse_argument(Line(None, 'ALF', None), self.MockSymbolTable(), 0),
+      (0, 1))
 
     self.assertRaises(UnquotedStringError, parse_argument, Line(None, 'ALF', '"FAIL'), self.MockSymbolTable(), 0)
     for s in "^ rh%% hell!".split():
       self.assertRaises(InvalidCharError, parse_argument, Line(None, 'ALF', s), self.MockSymbolTable(), 0)
     self.assertRaises(UnexpectedStrInTheEndError, parse_argument, Line(None, 'ALF', '"TEST"SMTH'), self.MockSymbolTable(), 0)
 
+  def test_compiled(self):
+    # argument is parsed once, then only symbols are found
+    line = Line(None, 'LDA', 'SYM+1,2(1:5)')
+    self.assertEqual(parse_argument(line, self.MockSymbolTable(), 0), (122 * 64**3 + 2 * 64**2 + 13 * 64, -1))
+    compiled = line.compiled
+    self.assertEqual(list(compiled.symbols), ['SYM'])
+    self.assertEqual(parse_argument(line, self.MockSymbolTable(), 0), (122 * 64**3 + 2 * 64**2 + 13 * 64, -1))
+    self.assertTrue(line.compiled is compiled)
+
+    # tree is made again if argument is changed
+    line.argument = '1B'
+    self.assertEqual(parse_argument(line, self.MockSymbolTable(), 0), (789 * 64**3 + 5 * 64, 1))
+    self.assertEqual(list(line.compiled.symbols), ['1B'])
+
+    # constant directives are computed once
+    line = Line(None, 'CON', '1(1:1),2(2:2)')
+    self.assertEqual(parse_argument(line, None, 0), (Memory.mix2dec([+1, 1, 2, 0, 0, 0]), 1))
+    self.assertEqual(line.compiled.kind, "const")
+
+    # errors are raised when tree is computed
+    line = Line(None, 'LDA', 'UNDEF')
+    self.assertRaises(InvalidAddrError, parse_argument, line, self.MockSymbolTable(), 0)
+    self.assertEqual(list(line.compiled.symbols), ['UNDEF'])
+    line = Line(None, 'CON', '1/0')
+    self.assertRaises(ZeroDivisionError, parse_argument, line, self.MockSymbolTable(), 0)
+    self.assertRaises(ZeroDivisionError, parse_argument, line, self.MockSymbolTable(), 0)
+
+    # error of symbol which isn't defined depends on place where it's used at first
+    for argument, error in (('UNDEF+1', InvalidAddrError), ('1+UNDEF,UNDEF', ExpectedSExpError),
+                            ('1,UNDEF', ExpectedExpError), ('=UNDEF=', ExpectedWExpError)):
+      self.assertRaises(error, parse_argument, Line(None, 'LDA', argument), self.MockSymbolTable(), 0)
+    # errors are raised in order of argument
+    for argument, error in (('1(46),', InvalidFieldSpecError), ('1/0+', ZeroDivisionError),
+                            ('1,UNDEF(46)', ExpectedExpError), ('SYM(46)X', InvalidFieldSpecError)):
+      self.assertRaises(error, parse_argument, Line(None, 'CON', argument), self.MockSymbolTable(), 0)
+
 
 suite = unittest.makeSuite(ParseArgumentTestCase, 'test')
 
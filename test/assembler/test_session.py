@@ -0,0 +1,80 @@
+# test_session.py
+
+import unittest, sys, os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+from session import *
+from asm_cache import assemble
+
+class AsmSessionTestCase(unittest.TestCase):
+  SOURCE = """\
+N     EQU  3
+      ORIG 100
+START ENT1 N
+1H    LDA  X,1
+      ADD  =1=
+      STA  X,1
+      DEC1 1
+      J1P  1B
+      HLT
+X     CON  0
+      ALF  "ABCDE"
+      END  START""".splitlines()
+
+  def check(self, session, src_lines, stats):
+    """Result of session must be the same as result of assembling from scratch"""
+    result, expected = session.assemble(src_lines), assemble(src_lines)
+    self.assertEqual(result[:2], expected[:2])
+    if expected[2] is None:
+      self.assertEqual(result[2], None)
+    else:
+      for attr in ("memory", "start_address", "end_address", "addresses"):
+        self.assertEqual(getattr(result[2], attr), getattr(expected[2], attr))
+      self.assertEqual((result[2].symtable.labels, result[2].symtable.literals),
+                       (expected[2].symtable.labels, expected[2].symtable.literals))
+      self.assertEqual(str(result[2].listing(src_lines)), str(expected[2].listing(src_lines)))
+    self.assertEqual(session.stats, stats)
+
+  def testEdits(self):
+    session = AsmSession()
+    src = self.SOURCE[:]
+    self.check(session, src, {"parsed" : 12, "pass1" : 1, "pass2" : 1, "patched" : 0})
+
+    # only words of edited lines are assembled
+    src[3] = "1H    LDA  X+1,1(1:5)"
+    src[9] = "X     CON  5(1:1),7"
+    self.check(session, src, {"parsed" : 14, "pass1" : 1, "pass2" : 1, "patched" : 1})
+
+    # the same source
+    self.check(session, src, {"parsed" : 14, "pass1" : 1, "pass2" : 1, "patched" : 2})
+
+    # new literal changes addresses of other literals
+    src[6] = "      DEC1 =2="
+    self.check(session, src, {"parsed" : 15, "pass1" : 1, "pass2" : 2, "patched" : 2})
+
+    # addresses are changed
+    src[0] = "N     EQU  4"
+    self.check(session, src, {"parsed" : 16, "pass1" : 2, "pass2" : 3, "patched" : 2})
+    src.insert(8, "      NOP")
+    self.check(session, src, {"parsed" : 17, "pass1" : 3, "pass2" : 4, "patched" : 2})
+
+  def testErrors(self):
+    session = AsmSession()
+    src = self.SOURCE[:]
+    src[4] = "      ADD  Y"
+    self.check(session, src, {"parsed" : 12, "pass1" : 1, "pass2" : 1, "patched" : 0})
+    # errors are assembled by full pass
+    src[4] = "      ADD  X"
+    self.check(session, src, {"parsed" : 13, "pass1" : 1, "pass2" : 2, "patched" : 0})
+    src[4] = "      ADD  X("
+    self.check(session, src, {"parsed" : 14, "pass1" : 1, "pass2" : 3, "patched" : 0})
+
+    src[4] = "      ADDD X"
+    self.check(session, src, {"parsed" : 15, "pass1" : 1, "pass2" : 3, "patched" : 0})
+    src[4] = "      ADD  X"
+    self.check(session, src, {"parsed" : 15, "pass1" : 1, "pass2" : 4, "patched" : 0})
+
+suite = unittest.makeSuite(AsmSessionTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -32,7 +32,33 @@ class LabelsTestCase(unittest.TestCase):
       self.assertEqual(is_local_label_reference('%dB' % i), True)
       self.assertEqual(is_local_label_reference('%dH' % i), False)
       self.assertEqual(is_local_label_reference('%dh' % i), False)
-  
+
+  def test_find_local(self):
+    table = SymbolTable()
+    # 1H at addresses 0, 10, ..., 990 on lines 1, 3, ..., 199 and 1H EQU 5000 on line 300
+    for i in range(100):
+      table.set_label('1H', 10 * i, 2 * i + 1)
+    table.set_label('1H', 5000, 300)
+    self.assertEqual(table.find('1B', 2), 0)
+    self.assertEqual(table.find('1F', 2), 10)
+    self.assertEqual(table.find('1B', 3), 0)
+    self.assertEqual(table.find('1F', 3), 20)
+    self.assertEqual(table.find('1F', 200), 5000)
+    self.assertRaises(InvalidLocalLabelError, table.find, '1B', 1)
+    self.assertRaises(InvalidLocalLabelError, table.find, '1F', 300)
+    self.assertRaises(InvalidLocalLabelError, table.find, '2F', 1)
+
+    # definition is added after lookups
+    table.set_label('1H', 995, 250)
+    self.assertEqual(table.find('1F', 200), 995)
+
+    self.assertEqual(table.find_local_by_address('1B', 10), 0)
+    self.assertEqual(table.find_local_by_address('1F', 10), 20)
+    self.assertEqual(table.find_local_by_address('1F', 990), 995)
+    self.assertEqual(table.find_local_by_address('1B', 0), None)
+    self.assertEqual(table.find_local_by_address('1F', 5000), None)
+    self.assertEqual(table.find_local_by_address('2B', 10), None)
+
 suite = unittest.makeSuite(LabelsTestCase, 'test')
 
 if __name__ == "__main__":
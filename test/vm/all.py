@@ -5,6 +5,16 @@ from . import test_execution
 from . import test_word
 from . import test_word_parser
 from . import test_vm_vmtest
+from . import test_packed_memory
+from . import test_translator
+from . import test_fusion
+from . import test_memory_locks
+from . import test_batch
+from . import test_profiler
+from . import test_snapshot
+from . import test_journal
+from . import test_device
+from . import test_charset
 
 def suite():
   return unittest.TestSuite(
@@ -14,7 +24,17 @@ def suite():
       test_execution.suite,
       test_word.suite,
       test_word_parser.suite,
-      test_vm_vmtest.suite
+      test_vm_vmtest.suite,
+      test_packed_memory.suite,
+      test_translator.suite,
+      test_fusion.suite,
+      test_memory_locks.suite,
+      test_batch.suite,
+      test_profiler.suite,
+      test_snapshot.suite,
+      test_journal.suite,
+      test_device.suite,
+      test_charset.suite
     )
   )
 
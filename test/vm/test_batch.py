@@ -0,0 +1,62 @@
+from .helper import *
+from batch import *
+
+import tempfile, shutil, io, json
+
+class BatchTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def write(self, name, text):
+    with open(os.path.join(self.dir, name), "w") as f:
+      f.write(text)
+    return os.path.join(self.dir, name)
+
+  def testReadManifest(self):
+    jobs = read_manifest(["a.ma\n", "# comment\n", "\n", "b.ma deck 100 # limit\n", "c.ma - 5\n"], "dir", 1000)
+    self.assertEqual([(job.number, job.program, job.deck, job.max_cycles) for job in jobs], [
+      (0, os.path.join("dir", "a.ma"), None, 1000),
+      (1, os.path.join("dir", "b.ma"), os.path.join("dir", "deck"), 100),
+      (2, os.path.join("dir", "c.ma"), None, 5)
+    ])
+    self.assertRaises(ValueError, read_manifest, ["a.ma - x"])
+    self.assertRaises(ValueError, read_manifest, ["a.ma - 1 2"])
+
+  def testRunJob(self):
+    # in 0(19); jbus *(19); out 0(18); hlt
+    program = self.write("p.ma", "100\n0100 +1 00 00 00 19 36\n0101 +1 01 37 00 19 34\n" +
+                                 "0102 +1 00 00 00 18 37\n0103 +1 00 00 00 02 05\n")
+    deck = self.write("deck", "HELLO\n")
+    result = run_job(Job(0, program, deck))
+    self.assertTrue(result["halted"])
+    self.assertEqual(result["error"], None)
+    self.assertEqual(result["registers"]["J"], [+1, 0, 0, 0, 1, 38])
+    # printer output is HELLO padded to 24 words
+    self.assertEqual(result["printer"], hashlib.sha1(("HELLO".ljust(24 * 5) + "\n").encode()).hexdigest())
+
+    result = run_job(Job(1, program, deck, 3))
+    self.assertFalse(result["halted"])
+    self.assertEqual(result["cycles"], 3)
+
+    result = run_job(Job(2, os.path.join(self.dir, "missing.ma")))
+    self.assertFalse(result["error"] is None)
+
+  def testRunBatch(self):
+    good = self.write("good.ma", "100\n0100 +1 00 00 00 02 05\n") # hlt
+    with open(os.path.join(self.dir, "bad.ma"), "wb") as f:
+      f.write(b"100\n\xff\xfe\n")
+    out = io.StringIO()
+    run_batch([Job(0, os.path.join(self.dir, "bad.ma")), Job(1, good)], out, 2)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    self.assertEqual([result["job"] for result in results], [0, 1])
+    self.assertTrue(results[0]["error"].startswith("UnicodeDecodeError: "))
+    self.assertFalse(results[0]["halted"])
+    self.assertEqual((results[1]["error"], results[1]["halted"]), (None, True))
+
+suite = unittest.makeSuite(BatchTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,32 @@
+from .helper import *
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
+import charset
+
+class CharsetTestCase(unittest.TestCase):
+  def testEncode(self):
+    self.assertEqual(charset.encode(""), b"")
+    self.assertEqual(list(charset.encode(" A~[#0.'")), [0, 1, 10, 20, 21, 30, 40, 55])
+    self.assertEqual(list(charset.encode("a?Δ", 0)), [0, 0, 0])
+    self.assertEqual(list(charset.encode("AB?", charset.INVALID)), [1, 2, charset.INVALID])
+    for text, position in (("ABa", 2), ("ΔB", 0), ("A\n", 1)):
+      try:
+        charset.encode(text)
+        self.fail()
+      except charset.CharsetError as e:
+        self.assertEqual((e.position, e.value), (position, text[position]))
+
+  def testDecode(self):
+    self.assertEqual(charset.decode(list(range(charset.charset_len))), "".join(charset.chr_table))
+    self.assertEqual(charset.decode(b"\x01\x02"), "AB")
+    self.assertEqual(charset.decode([1, 56, 300, -1], "?"), "A???")
+    for codes, position in (([1, 56], 1), ([300, 1], 0), ([1, 2, -1], 2)):
+      try:
+        charset.decode(codes)
+        self.fail()
+      except charset.CharsetError as e:
+        self.assertEqual((e.position, e.value), (position, codes[position]))
+
+suite = unittest.makeSuite(CharsetTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
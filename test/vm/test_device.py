@@ -0,0 +1,142 @@
+from .helper import *
+from device import FileDevice, TapeDevice, DiskDevice
+from virt_machine import VMachine
+from word import Word
+
+import io, os, tempfile, shutil
+
+class FileDeviceTestCase(unittest.TestCase):
+  def read_lines(self, device, count):
+    lines = []
+    for _ in range(count):
+      lines.append(device.read((0, 0)))
+      device.finish()
+    return lines
+
+  def testRead(self):
+    for chunk_lines in (1, 2, 256):
+      device = FileDevice(mode = "r", block_size = 5, lock_time = 1, file_object = io.StringIO("AB\r\nCDEFGH\n\nXYZ"))
+      device.CHUNK_LINES = chunk_lines
+      self.assertEqual(self.read_lines(device, 5), [
+        [1, 2, 0, 0, 0],
+        [3, 4, 5, 6, 7],
+        [0, 0, 0, 0, 0],
+        [27, 28, 29, 0, 0],
+        [0, 0, 0, 0, 0] # end of file
+      ])
+
+  def testReadErrors(self):
+    device = FileDevice(mode = "r", block_size = 5, lock_time = 1, file_object = io.StringIO("ABΔ\nA\rB\nABCDE!\nC"))
+    self.assertRaises(InvalidCharError, device.read, (0, 0))
+    device.finish()
+    self.assertRaises(InvalidCharError, device.read, (0, 0))
+    device.finish()
+    # chars after block_size aren't checked
+    self.assertEqual(self.read_lines(device, 2), [[1, 2, 3, 4, 5], [3, 0, 0, 0, 0]])
+
+  def testControlAndState(self):
+    device = FileDevice(mode = "r", block_size = 1, lock_time = 1, file_object = io.StringIO("A\nB\nC\nD\n"))
+    device.CHUNK_LINES = 3
+    self.read_lines(device, 1)
+    device.control()
+    device.finish()
+    state = device.get_state()
+    self.assertEqual(self.read_lines(device, 2), [[3], [4]])
+    device.set_state(state)
+    self.assertEqual(self.read_lines(device, 2), [[3], [4]])
+
+  def testWrite(self):
+    out = io.StringIO()
+    device = FileDevice(mode = "w", block_size = 3, lock_time = 1, file_object = out)
+    device.write([1, 2, 0], (0, 0))
+    device.finish()
+    self.assertEqual(out.getvalue(), "") # buffered
+    device.flush()
+    self.assertEqual(out.getvalue(), "AB \n")
+    device.write([3, 3, 3], (0, 0))
+    device.finish()
+    device.control()
+    self.assertEqual(out.getvalue(), "AB \nCCC\n<---------NEW-PAGE--------->\n")
+    device.finish()
+    self.assertRaises(InvaliCharCodeError, device.write, [1, 56, 2], (0, 0))
+
+    device.BUFFER_SIZE = 8
+    out.truncate(0)
+    out.seek(0)
+    device.finish()
+    device.write([1, 1, 1], (0, 0))
+    device.finish()
+    device.write([2, 2, 2], (0, 0))
+    self.assertEqual(out.getvalue(), "AAA\nBBB\n")
+
+class BlockDeviceTestCase(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.devices = []
+
+  def tearDown(self):
+    for device in self.devices:
+      device.close()
+    shutil.rmtree(self.dir)
+
+  def make_vm(self, code, unit, device):
+    memory = dict((addr, Word(word)) for addr, word in enumerate(code))
+    for i in range(100):
+      memory[1000 + i] = Word(-i)
+      memory[1100 + i] = Word(i * 1000)
+    vm = VMachine(memory, 0)
+    self.devices.append(device)
+    vm.set_device(unit, device)
+    return vm
+
+  def testTape(self):
+    file_name = os.path.join(self.dir, "tape")
+    vm = self.make_vm([
+      [+1, 15, 40, 0, 3, 37],   # out 1000(3)
+      [+1, 17, 12, 0, 3, 37],   # out 1100(3)
+      [+1, 0, 0, 0, 3, 35],     # ioc 0(3)
+      [+1, 0, 1, 0, 3, 35],     # ioc 1(3)
+      [+1, 31, 16, 0, 3, 36],   # in 2000(3)
+      [+1, 0, 5, 0, 3, 34],     # jbus *
+      [+1, 0, 0, 0, 2, 5],      # hlt
+    ], 3, TapeDevice(lock_time = 200, seek_time = 50, file_name = file_name))
+    vm.run()
+    self.assertTrue(vm.halted)
+    self.assertEqual([int(vm[2000 + i]) for i in range(100)], [i * 1000 for i in range(100)])
+    # the second out waits 200 cycles, ioc 0 waits 200, rewinding of 2 blocks takes 100,
+    # skipping of 1 block takes 50 and reading takes 200
+    self.assertEqual(vm.cycles, 761)
+    self.assertEqual(os.path.getsize(file_name), 2 * 400)
+
+    tape = TapeDevice(lock_time = 200, seek_time = 50, file_name = file_name)
+    self.devices.append(tape)
+    words = tape.read_words((0, 99), 0)
+    self.assertEqual(words[:2], [0, 1 | (1 << 30)]) # +0, -1
+    self.assertEqual(tape.get_state()[-1], 1)
+
+  def testDisk(self):
+    vm = self.make_vm([
+      [+1, 0, 7, 0, 2, 55],     # entx 7
+      [+1, 15, 40, 0, 9, 37],   # out 1000(9)
+      [+1, 0, 0, 0, 9, 35],     # ioc 0(9) (waits for out, then moves to block 7)
+      [+1, 31, 16, 0, 9, 36],   # in 2000(9)
+      [+1, 0, 4, 0, 9, 34],     # jbus *
+      [+1, 0, 0, 0, 2, 5],      # hlt
+    ], 9, DiskDevice(lock_time = 200, seek_time = 10, file_name = os.path.join(self.dir, "disk"), blocks = 8))
+    vm.run()
+    self.assertEqual([vm[2000 + i].word_list for i in range(100)], [vm[1000 + i].word_list for i in range(100)])
+    # moving to block 7 takes 70 cycles
+    self.assertEqual(vm.cycles, 483)
+
+    for code, error in (([+1, 0, 8, 0, 2, 55], InvalidBlockError), ([+1, 0, 1, 0, 9, 35], UnsupportedDeviceModeError)):
+      vm = self.make_vm([code, [+1, 0, 0, 0, 9, 35]], 9,
+                        DiskDevice(lock_time = 200, seek_time = 10, file_name = os.path.join(self.dir, "disk"), blocks = 8))
+      self.assertRaises(error, vm.run)
+
+suite = unittest.TestSuite([
+  unittest.makeSuite(FileDeviceTestCase, 'test'),
+  unittest.makeSuite(BlockDeviceTestCase, 'test')
+])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,8 +1,62 @@
+import unittest, sys, os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'vm'))
+
+from vm_errors import *
 from .helper import *
 from execution import *
+from virt_machine import *
+from word import *
+import exec_all
 
 class ExecutionTestCase(unittest.TestCase):
-  pass
+  def testInstruction(self):
+    instr = Instruction(Word([-1, 1, 2, 3, 13, 8])) # lda -66,3(1:5)
+    self.assertEqual(instr.proc, exec_all.lda)
+    self.assertEqual(instr.addr, -66)
+    self.assertEqual(instr.ind, 3)
+    self.assertEqual(instr.field, 13)
+    self.assertEqual(instr.field_spec, (1, 5))
+    self.assertEqual(instr.sign, -1)
+
+    self.assertEqual(Instruction(Word([+1, 0, 0, 0, 19, 36])).proc, exec_all.in_)
+    self.assertEqual(Instruction(Word([+1, 0, 0, 0, 44, 8])).field_spec, None) # (5:4)
+    self.assertEqual(Instruction(Word([+1, 0, 0, 0, 6, 5])).proc, exec_all.flot)
+    self.assertEqual(Instruction(Word([+1, 0, 0, 0, 6, 1])).proc, exec_all.fadd) # not add(0:6)
+    self.assertEqual(Instruction(Word([+1, 0, 0, 0, 8, 5])).proc, None)
+
+  def testInstructionCache(self):
+    vm = VMachine({
+      0: Word([+1, 0, 1, 0, 2, 48]),    # enta 1
+      1: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+    }, 0)
+    vm.step()
+    self.assertEqual(int(vm["A"]), 1)
+    self.assertTrue(vm.instr_cache[0] is not None)
+
+    # rewriting of memory must drop decoded instruction
+    vm[0] = Word([+1, 0, 5, 0, 2, 48])  # enta 5
+    self.assertTrue(vm.instr_cache[0] is None)
+    vm["cur_addr"] = 0
+    vm.step()
+    self.assertEqual(int(vm["A"]), 5)
+
+    # and the same for self-modifying code
+    vm = VMachine({
+      0: Word([+1, 0, 3, 0, 5, 24]),    # sta 3
+      1: Word([+1, 0, 3, 0, 5, 39]),    # jmp 3
+      3: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+    }, 0)
+    vm.get_cur_instr()
+    vm["cur_addr"] = 3
+    self.assertEqual(vm.get_cur_instr().proc, exec_all.hlt)
+    vm["cur_addr"] = 0
+    vm["A"] = Word([+1, 0, 0, 0, 0, 0]) # nop
+    vm.step()
+    vm.step()
+    vm.step()
+    self.assertEqual(vm.cur_addr, 4)
+    self.assertFalse(vm.halted)
 
 suite = unittest.makeSuite(ExecutionTestCase, 'test')
 
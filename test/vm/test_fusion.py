@@ -0,0 +1,143 @@
+from .helper import *
+from virt_machine import *
+from word import *
+from device import FileDevice
+from fusion import Fused
+
+import io, fnmatch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+from parse_line import parse_lines
+from assemble import Assembler
+
+class FusionTestCase(unittest.TestCase):
+  def state(self, vm):
+    return (list(vm.cells), list(vm.regs), vm.cf, vm.of, vm.cur_addr, vm.halted, vm.cycles,
+            vm.locked_cells(vm.W_LOCKED))
+
+  def run_vm(self, memory, start, engine, max_cycles = None, breakpoints = None):
+    vm = VMachine(memory, start)
+    vm.set_engine(engine)
+    printer = io.StringIO()
+    vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = printer))
+    vm.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = io.StringIO("HELLO\n" * 10)))
+    events = []
+    vm.set_mem_hook(lambda addr, old, new: events.append((addr, old.word_list, new.word_list)))
+    try:
+      vm.run(max_cycles, breakpoints)
+      error = None
+    except VMError as e:
+      error = repr(e)
+    return self.state(vm), error, printer.getvalue(), events
+
+  def check(self, memory, start, max_cycles = None, breakpoints = None):
+    self.assertEqual(self.run_vm(memory, start, VMachine.INTERPRETER, max_cycles, breakpoints),
+                     self.run_vm(memory, start, VMachine.FUSION, max_cycles, breakpoints))
+
+  def testPrograms(self):
+    dir = os.path.join(os.path.dirname(__file__), '..', 'assembler', 'mix_programs')
+    for fn in sorted(os.listdir(dir)):
+      if not fnmatch.fnmatch(fn, '*.mix'):
+        continue
+      with open(os.path.join(dir, fn), "r") as f:
+        lines, errors = parse_lines(f.readlines())
+      if errors != []:
+        continue
+      asm = Assembler()
+      asm.run(lines)
+      if asm.errors != []:
+        continue
+      for max_cycles in (50000, 1001):
+        self.check(asm.memory.memory, asm.start_address, max_cycles)
+
+  def testSequences(self):
+    memory = {
+      0: Word([+1, 0, 3, 0, 2, 50]),    # ent2 3
+      1: Word([+1, 1, 36, 0, 5, 8]),    # lda 100
+      2: Word([+1, 1, 37, 0, 5, 2]),    # sub 101
+      3: Word([+1, 1, 36, 0, 5, 24]),   # sta 100
+      4: Word([+1, 1, 36, 0, 5, 56]),   # cmpa 100
+      5: Word([+1, 0, 1, 0, 8, 39]),    # jne 1 (never)
+      6: Word([+1, 0, 1, 0, 1, 50]),    # dec2 1
+      7: Word([+1, 0, 1, 0, 2, 42]),    # j2p 1
+      8: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+      100: Word(10),
+      101: Word(3),
+    }
+    self.check(memory, 0)
+    self.check(memory, 0, breakpoints = set([2, 7]))
+    self.check(memory, 2) # jump to the middle of sequence
+
+    vm = VMachine(memory, 0)
+    vm.set_engine(VMachine.FUSION)
+    vm.run()
+    self.assertEqual((int(vm[100]), vm.cycles), (1, 1 + 3 * (6 + 3 + 2) + 10))
+    for addr, cycles in ((1, 6), (4, 3), (6, 2)):
+      self.assertTrue(isinstance(vm.instr_cache[addr].fused, Fused))
+      self.assertEqual(vm.instr_cache[addr].fused.cycles, cycles)
+
+  def testErrors(self):
+    memory = {
+      0: Word([+1, 0, 1, 0, 2, 49]),    # ent1 1
+      1: Word([+1, 0, 10, 0, 5, 8]),    # lda 10
+      2: Word([+1, 0, 10, 0, 5, 1]),    # add 10
+      3: Word([+1, 62, 29, 1, 5, 24]),  # sta 3997,1 - the third one is out of memory
+      4: Word([+1, 0, 1, 0, 0, 49]),    # inc1 1
+      5: Word([+1, 0, 1, 0, 0, 39]),    # jmp 1
+      10: Word(5),
+    }
+    for engine in (VMachine.INTERPRETER, VMachine.FUSION):
+      vm = VMachine(memory, 0)
+      vm.set_engine(engine)
+      self.assertRaises(InvalidMemAddrError, vm.run)
+      self.assertEqual((vm.cur_addr, vm.cycles, int(vm["A"])), (3, 1 + 8 + 8 + 6, 10))
+    self.check(memory, 0)
+
+    # sta to cell which is locked by out
+    memory = {
+      0: Word([+1, 1, 36, 0, 18, 37]),  # out 100(18)
+      1: Word([+1, 0, 10, 0, 5, 8]),    # lda 10
+      2: Word([+1, 0, 10, 0, 5, 1]),    # add 10
+      3: Word([+1, 1, 37, 0, 5, 24]),   # sta 101
+      10: Word(5),
+    }
+    self.check(memory, 0)
+
+    # in reads sequence into cells, which stay locked until it finishes
+    memory = {
+      0: Word([+1, 0, 2, 0, 19, 36]),   # in 2(19)
+      1: Word([+1, 0, 0, 0, 0, 0]),     # nop
+      20: Word([+1, 0, 0, 0, 2, 5]),    # hlt
+    }
+    results = []
+    for engine in (VMachine.INTERPRETER, VMachine.TRANSLATOR, VMachine.FUSION):
+      vm = VMachine(memory, 0)
+      vm.set_engine(engine)
+      # inc1 1; j1p 20
+      vm.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = io.StringIO(" A  $ [ B,\n")))
+      self.assertRaises(MemReadLockedError, vm.run)
+      results.append(self.state(vm))
+    self.assertEqual((results[0][4], results[0][6]), (2, 2))
+    self.assertEqual(results[1], results[0])
+    self.assertEqual(results[2], results[0])
+
+  def testSelfModifying(self):
+    memory = {
+      0: Word([+1, 0, 5, 0, 2, 49]),    # ent1 5
+      1: Word([+1, 0, 1, 0, 1, 49]),    # dec1 1
+      2: Word([+1, 0, 5, 0, 2, 41]),    # j1p 5
+      3: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+      5: Word([+1, 0, 10, 0, 5, 8]),    # lda 10
+      6: Word([+1, 0, 11, 0, 5, 1]),    # add 11
+      7: Word([+1, 0, 2, 0, 5, 24]),    # sta 2 (j1p 5 becomes jan 5)
+      8: Word([+1, 0, 1, 0, 0, 39]),    # jmp 1
+      10: Word([+1, 0, 5, 0, 0, 39]),   # jmp 5
+      11: Word(1),
+    }
+    self.check(memory, 0)
+    self.check(memory, 0, 200)
+
+suite = unittest.makeSuite(FusionTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,95 @@
+from .helper import *
+from virt_machine import *
+from word import *
+from device import FileDevice
+from journal import Journal
+
+import io, fnmatch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+from parse_line import parse_lines
+from assemble import Assembler
+
+class JournalTestCase(unittest.TestCase):
+  def make_vm(self, memory, start):
+    vm = VMachine(memory, start)
+    vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = io.StringIO()))
+    vm.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = io.StringIO("HELLO\n" * 10)))
+    return vm
+
+  def testPrograms(self):
+    dir = os.path.join(os.path.dirname(__file__), '..', 'assembler', 'mix_programs')
+    for fn in sorted(os.listdir(dir)):
+      if not fnmatch.fnmatch(fn, '*.mix'):
+        continue
+      with open(os.path.join(dir, fn), "r") as f:
+        lines, errors = parse_lines(f.readlines())
+      if errors != []:
+        continue
+      asm = Assembler()
+      asm.run(lines)
+      if asm.errors != []:
+        continue
+      vm = self.make_vm(asm.memory.memory, asm.start_address)
+      vm.set_journal(Journal())
+      snapshots = []
+      try:
+        while not vm.halted and len(snapshots) < 2000:
+          snapshots.append(vm.snapshot())
+          vm.step()
+      except VMError:
+        pass
+      # after error the failed instruction is undone too
+      while len(snapshots) > 0:
+        self.assertEqual(vm.step_back(), 1)
+        self.assertEqual(vm.snapshot(), snapshots.pop())
+      self.assertEqual(vm.step_back(), 0)
+
+  def testRun(self):
+    memory = {
+      0: Word([+1, 0, 10, 0, 2, 49]),   # ent1 10
+      1: Word([+1, 0, 5, 0, 2, 48]),    # enta 5
+      2: Word([+1, 0, 1, 0, 1, 49]),    # dec1 1
+      3: Word([+1, 0, 20, 1, 5, 24]),   # sta 20,1
+      4: Word([+1, 0, 2, 0, 2, 41]),    # j1p 2
+      5: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+    }
+    vm = self.make_vm(memory, 0)
+    start = vm.snapshot()
+    vm.set_journal(Journal())
+    vm.run()
+    self.assertTrue(vm.halted)
+    self.assertEqual(len(vm.journal), 33)
+
+    events = []
+    vm.set_mem_hook(lambda addr, old, new: events.append(addr))
+    self.assertEqual(vm.run_back(set([3])), 3)
+    self.assertEqual(vm.cur_addr, 3)
+    self.assertEqual(int(vm["1"]), 0)
+    self.assertEqual(events, [20])
+    self.assertEqual(vm.step_back(100), 30)
+    self.assertEqual(vm.snapshot(), start)
+    self.assertEqual(events, [20 + i for i in range(10)])
+
+  def testLimits(self):
+    memory = {
+      0: Word([+1, 0, 0, 0, 2, 48]),    # enta 0
+      1: Word([+1, 0, 1, 0, 0, 48]),    # inca 1
+      2: Word([+1, 0, 20, 0, 5, 24]),   # sta 20
+      3: Word([+1, 0, 1, 0, 0, 39]),    # jmp 1
+    }
+    vm = self.make_vm(memory, 0)
+    vm.set_journal(Journal(max_steps = 50))
+    vm.run(1000)
+    self.assertEqual(len(vm.journal), 50)
+    self.assertEqual(vm.step_back(100), 50)
+
+    vm.set_journal(Journal(max_cells = 5))
+    vm.run(2000)
+    self.assertEqual(vm.journal.cells_count, 5)
+    self.assertEqual(vm.step_back(100), 15) # 5 stores and instructions between them
+
+suite = unittest.makeSuite(JournalTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,33 @@
+from .helper import *
+from memory_locks import *
+
+class MemoryLocksTestCase(unittest.TestCase):
+  def testLocks(self):
+    locks = MemoryLocks(100)
+    self.assertFalse(locks.any(-10, 200))
+    locks.add(10, 19)
+    locks.add(15, 24)
+    self.assertEqual(locks.count, 15)
+    self.assertEqual(locks.cells(), set(range(10, 25)))
+    self.assertTrue(10 in locks)
+    self.assertFalse(25 in locks)
+    self.assertFalse(-1 in locks)
+    self.assertTrue(locks.any(-5, 10))
+    self.assertTrue(locks.any(24, 150))
+    self.assertFalse(locks.any(0, 9))
+    self.assertFalse(locks.any(25, 150))
+
+    locks.remove(5, 12)
+    self.assertEqual(locks.cells(), set(range(13, 25)))
+    self.assertEqual(locks.count, 12)
+    locks.remove(90, 120)
+    self.assertEqual(locks.count, 12)
+
+    locks.set_cells([1, 2, 99])
+    self.assertEqual(locks.cells(), set([1, 2, 99]))
+    self.assertEqual(locks.count, 3)
+
+suite = unittest.makeSuite(MemoryLocksTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
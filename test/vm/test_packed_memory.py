@@ -0,0 +1,48 @@
+from .helper import *
+from packed_memory import *
+from word import *
+
+class PackedMemoryTestCase(unittest.TestCase):
+  def testPack(self):
+    for word_list in ([+1, 0, 0, 0, 0, 0], [-1, 0, 0, 0, 0, 0], [-1, 3, 63, 2, 8, 9], [+1, 63, 63, 63, 63, 63]):
+      packed = pack(word_list)
+      self.assertEqual(pack(Word(word_list)), packed)
+      self.assertEqual(unpack(packed).word_list, word_list)
+      self.assertEqual(packed_int(packed), int(Word(word_list)))
+      self.assertEqual(packed_sign(packed), word_list[0])
+    for num in (0, 1, -1, -1234567, MAX_BYTE**5 - 1, MAX_BYTE**5 + 5, -MAX_BYTE**5 - 5):
+      self.assertEqual(unpack(pack(num)).word_list, Word(num).word_list)
+    # word lists are checked by the same code as in Word
+    for word_list in ([-1, 0, 1, 64, 5, 7], [+1, 0, 0, 0, 0, -1]):
+      self.assertRaises(InvalidMixWordError, pack, word_list)
+      self.assertRaises(InvalidMixWordError, Word, word_list)
+
+  def testFields(self):
+    word = Word([-1, 1, 2, 3, 4, 5])
+    packed = pack(word)
+    for l in range(6):
+      for r in range(6):
+        self.assertEqual(unpack(get_field(packed, 8*l + r)).word_list, word[l:r].word_list)
+        for value in (-1234567, 0, 7, [-1, 11, 12, 13, 14, 15]):
+          expected = Word(word)
+          expected[l:r] = value
+          self.assertEqual(unpack(set_field(packed, 8*l + r, pack(value))).word_list, expected.word_list)
+
+  def testMemory(self):
+    memory = PackedMemory(10)
+    self.assertEqual(len(memory), 10)
+    self.assertEqual(memory[5], Word())
+    memory[5] = Word([-1, 0, 0, 0, 0, 0])
+    self.assertEqual(memory[5].word_list, [-1, 0, 0, 0, 0, 0])
+    memory[5][0] = +1 # copy
+    self.assertEqual(memory.cells[5], SIGN_BIT)
+    memory.fill([[+1, 1, 2, 3, 4, 5]] * 10)
+    self.assertEqual(memory[9].word_list, [+1, 1, 2, 3, 4, 5])
+    memory.clear()
+    self.assertEqual(memory.cells, [0] * 10)
+    self.assertRaises(IndexError, memory.__getitem__, 10)
+
+suite = unittest.makeSuite(PackedMemoryTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,57 @@
+from .helper import *
+from virt_machine import *
+from profiler import *
+from word import *
+
+class ListingLine:
+  def __init__(self, addr, line):
+    self.addr = addr
+    self.line = line
+
+class Listing:
+  def __init__(self, lines):
+    self.lines = [ListingLine(addr, line) for addr, line in lines]
+
+class ProfilerTestCase(unittest.TestCase):
+  def setUp(self):
+    memory = {
+      0: Word([+1, 0, 3, 0, 2, 49]),    # ent1 3
+      1: Word([+1, 0, 1, 0, 1, 49]),    # dec1 1
+      2: Word([+1, 0, 1, 0, 2, 41]),    # j1p 1
+      3: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+    }
+    self.vm = VMachine(memory, 0)
+    self.profiler = Profiler()
+    self.vm.set_profiler(self.profiler)
+
+  def testCounts(self):
+    self.vm.set_engine(VMachine.TRANSLATOR) # profiler needs interpreter
+    self.vm.run()
+    self.assertEqual(self.profiler.counts[:5], [1, 3, 3, 1, 0])
+    self.assertEqual(self.profiler.cycles[:5], [1, 3, 3, 10, 0])
+    self.assertEqual(self.profiler.total_cycles(), self.vm.cycles)
+    self.assertEqual(self.profiler.top(2), [(3, 1, 10), (1, 3, 3)])
+    self.assertEqual(sorted((name, calls) for name, (calls, seconds) in self.profiler.handlers.items()),
+                     [("dec1", 3), ("ent1", 1), ("hlt", 1), ("j1p", 3)])
+
+  def testStep(self):
+    self.vm.step()
+    self.vm.step()
+    self.assertEqual(self.profiler.counts[:3], [1, 1, 0])
+
+  def testReports(self):
+    self.vm.run()
+    table = self.profiler.frequency_table(Listing([(None, "* loop"), (0, "\tENT1\t3"), (3, "\tHLT"), (10, "X\tCON\t0")]))
+    self.assertEqual(table.splitlines(), [
+      "     |            |            | * loop",
+      "   0 |          1 |          1 | \tENT1\t3",
+      "   3 |          1 |         10 | \tHLT",
+      "  10 |            |            | X\tCON\t0"
+    ])
+    self.assertEqual(len(self.profiler.top_report(3).splitlines()), 4)
+    self.assertEqual(len(self.profiler.handler_report().splitlines()), 5)
+
+suite = unittest.makeSuite(ProfilerTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
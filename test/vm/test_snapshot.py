@@ -0,0 +1,89 @@
+from .helper import *
+from virt_machine import *
+from word import *
+from device import FileDevice
+
+import io, fnmatch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+from parse_line import parse_lines
+from assemble import Assembler
+
+class SnapshotTestCase(unittest.TestCase):
+  def state(self, vm):
+    return (list(vm.cells), [vm[r].word_list for r in "A X 1 2 3 4 5 6 J".split()],
+            vm.cf, vm.of, vm.cur_addr, vm.halted, vm.cycles, vm.locked_cells(vm.W_LOCKED), vm.locked_cells(vm.RW_LOCKED))
+
+  def run_vm(self, vm, max_cycles):
+    try:
+      vm.run(max_cycles)
+      error = None
+    except VMError as e:
+      error = repr(e)
+    return self.state(vm), error, vm.devices[18].file_object.getvalue()
+
+  def testPrograms(self):
+    dir = os.path.join(os.path.dirname(__file__), '..', 'assembler', 'mix_programs')
+    for fn in sorted(os.listdir(dir)):
+      if not fnmatch.fnmatch(fn, '*.mix'):
+        continue
+      with open(os.path.join(dir, fn), "r") as f:
+        lines, errors = parse_lines(f.readlines())
+      if errors != []:
+        continue
+      asm = Assembler()
+      asm.run(lines)
+      if asm.errors != []:
+        continue
+      vm = VMachine(asm.memory.memory, asm.start_address)
+      vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = io.StringIO()))
+      vm.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = io.StringIO("HELLO\n" * 10)))
+      try:
+        vm.run(1001)
+      except VMError:
+        continue
+      data = vm.snapshot()
+      first = self.run_vm(vm, 50000)
+      vm.restore(data)
+      self.assertEqual(vm.snapshot(), data)
+      self.assertEqual(self.run_vm(vm, 50000), first)
+
+  def testLocksAndDevices(self):
+    vm = VMachine({0: Word(7), 3999: Word(-1)}, 5)
+    printer = io.StringIO()
+    vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = printer))
+    vm.lock_cells(vm.W_LOCKED, add = (10, 20))
+    vm.lock_cells(vm.RW_LOCKED, add = (3990, 3999))
+    vm.devices[18].write([0] * 120, (10, 33))
+    vm.device_started(18, 0)
+    vm["A"] = Word([-1, 0, 0, 0, 0, 0])
+    vm.cf = -1
+    data = vm.snapshot()
+
+    other = VMachine({}, 0)
+    other.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = io.StringIO()))
+    other.restore(data)
+    self.assertEqual(other.snapshot(), data)
+    self.assertEqual(other.cells, vm.cells)
+    self.assertEqual(other["A"].word_list, [-1, 0, 0, 0, 0, 0])
+    self.assertEqual(other.cf, -1)
+    self.assertEqual(other.cur_addr, 5)
+    self.assertEqual(other.locked_cells(vm.W_LOCKED), set(range(10, 21)))
+    self.assertEqual(other.locked_cells(vm.RW_LOCKED), set(range(3990, 4000)))
+    self.assertEqual(other.device_deadline, 48)
+    device = other.devices[18]
+    self.assertEqual((device.busy, device.time_left, device.locked_mode, device.locked_range), (True, 48, "w", (10, 33)))
+
+  def testErrors(self):
+    vm = VMachine({}, 0)
+    vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = io.StringIO()))
+    data = vm.snapshot()
+    self.assertRaises(ValueError, VMachine({}, 0).restore, data) # device isn't plugged
+    self.assertRaises(ValueError, vm.restore, data[:-1])
+    self.assertRaises(ValueError, vm.restore, data + b"\0")
+    self.assertRaises(ValueError, vm.restore, b"MIXT" + data[4:])
+
+suite = unittest.makeSuite(SnapshotTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,93 @@
+from .helper import *
+from virt_machine import *
+from word import *
+from device import FileDevice
+
+import io, fnmatch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'assembler'))
+from parse_line import parse_lines
+from assemble import Assembler
+
+class TranslatorTestCase(unittest.TestCase):
+  def state(self, vm):
+    return (list(vm.cells), [vm[r].word_list for r in "A X 1 2 3 4 5 6 J".split()],
+            vm.cf, vm.of, vm.cur_addr, vm.halted, vm.cycles)
+
+  def run_vm(self, memory, start, engine, max_cycles = None):
+    vm = VMachine(memory, start)
+    vm.set_engine(engine)
+    printer = io.StringIO()
+    vm.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = printer))
+    vm.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = io.StringIO("HELLO\n" * 10)))
+    try:
+      vm.run(max_cycles)
+      error = None
+    except VMError as e:
+      error = repr(e)
+    return self.state(vm), error, printer.getvalue()
+
+  def check(self, memory, start, max_cycles = None):
+    self.assertEqual(self.run_vm(memory, start, VMachine.INTERPRETER, max_cycles),
+                     self.run_vm(memory, start, VMachine.TRANSLATOR, max_cycles))
+
+  def testPrograms(self):
+    dir = os.path.join(os.path.dirname(__file__), '..', 'assembler', 'mix_programs')
+    for fn in sorted(os.listdir(dir)):
+      if not fnmatch.fnmatch(fn, '*.mix'):
+        continue
+      with open(os.path.join(dir, fn), "r") as f:
+        lines, errors = parse_lines(f.readlines())
+      if errors != []:
+        continue
+      asm = Assembler()
+      asm.run(lines)
+      if asm.errors != []:
+        continue
+      for max_cycles in (50000, 1001):
+        self.check(asm.memory.memory, asm.start_address, max_cycles)
+
+  def testSelfModifying(self):
+    memory = {
+      0: Word([+1, 1, 36, 0, 2, 49]),   # ent1 100
+      1: Word([+1, 0, 4, 0, 5, 8]),     # lda 4
+      2: Word([+1, 0, 1, 0, 0, 49]),    # inc1 1
+      3: Word([+1, 0, 10, 0, 5, 1]),    # add 10
+      4: Word([+1, 0, 1, 0, 0, 49]),    # inc1 1 (changed by the next instruction)
+      5: Word([+1, 0, 4, 0, 5, 24]),    # sta 4
+      6: Word([+1, 0, 11, 0, 5, 57]),   # cmp1 11
+      7: Word([+1, 0, 1, 0, 4, 39]),    # jl 1
+      8: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+      10: Word(1),
+      11: Word(110),
+    }
+    self.check(memory, 0)
+    self.check(memory, 0, 50)
+
+    vm = VMachine(memory, 0)
+    vm.set_engine(VMachine.TRANSLATOR)
+    vm.run()
+    self.assertTrue(vm.halted)
+    self.assertEqual(int(vm["1"]), 110)
+    self.assertEqual(vm.block_cache.volatile[4], 1)
+
+  def testBailOut(self):
+    memory = {
+      0: Word([+1, 0, 0, 0, 2, 49]),    # ent1 0
+      1: Word([+1, 0, 3, 0, 2, 50]),    # ent2 3
+      2: Word([+1, 0, 1, 0, 1, 50]),    # dec2 1
+      3: Word([+1, 62, 30, 1, 5, 8]),   # lda 3998,1 - the third one is out of memory
+      4: Word([+1, 0, 1, 0, 0, 49]),    # inc1 1
+      5: Word([+1, 0, 2, 0, 2, 42]),    # j2p 2
+    }
+    vm = VMachine(memory, 0)
+    vm.set_engine(VMachine.TRANSLATOR)
+    self.assertRaises(InvalidMemAddrError, vm.run)
+    self.assertEqual(vm.cur_addr, 3)
+    self.assertEqual(int(vm["1"]), 2)
+    self.check(memory, 0)
+
+suite = unittest.makeSuite(TranslatorTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,6 +1,9 @@
 from .helper import *
 from virt_machine import *
 from word import *
+from device import FileDevice
+
+import io
 
 class VMachineTestCase(unittest.TestCase):
   def testCheckMemAddr(self):
@@ -52,6 +55,133 @@ class VMachineTestCase(unittest.TestCase):
     self.assertEqual(vm.rA, Word(666))
     self.assertEqual(vm.rX, Word(777))
 
+  def testRegisterFile(self):
+    vm = VMachine({}, 0)
+    events = []
+    vm.set_cpu_hook(lambda item, old, new: events.append((item, old.word_list, new.word_list)))
+    vm["A"] = Word([-1, 1, 2, 3, 4, 5])
+    vm["3":4:5] = 70
+    vm["X":0:0] = -1
+    vm["X":0:0] = -1 # nothing is changed
+    self.assertEqual(vm.regs[REG_A], pack(Word([-1, 1, 2, 3, 4, 5])))
+    self.assertEqual(vm.regs[REG_INDEX["3"]], 70)
+    self.assertEqual(vm.regs[REG_X], SIGN_BIT)
+    self.assertEqual(vm["A":4:5].word_list, [+1, 0, 0, 0, 4, 5])
+    vm.set_register(REG_J, 1000)
+    self.assertEqual(events, [
+      ("A", [+1, 0, 0, 0, 0, 0], [-1, 1, 2, 3, 4, 5]),
+      ("3", [+1, 0, 0, 0, 0, 0], [+1, 0, 0, 0, 1, 6]),
+      ("X", [+1, 0, 0, 0, 0, 0], [-1, 0, 0, 0, 0, 0]),
+      ("J", [+1, 0, 0, 0, 0, 0], [+1, 0, 0, 0, 15, 40])
+    ])
+    # registers are copied, so changes of returned words don't change them
+    vm["A"][1] = 0
+    vm.rJ[5] = 0
+    self.assertEqual(vm.regs[REG_A], pack(Word([-1, 1, 2, 3, 4, 5])))
+    self.assertEqual(vm.rJ, Word(1000))
+    # including frequent values which are kept as shared words inside
+    vm["X"] = 0
+    for word in (vm["X"], vm["X":1:5], vm.rX, vm.reg("X"), vm[100], vm.memory[100]):
+      word[5] = 1
+      self.assertEqual(word, Word(1))
+    self.assertEqual((vm.regs[REG_X], vm.cells[100]), (0, 0))
+
+  def testRun(self):
+    memory = {
+      0: Word([+1, 0, 1, 0, 2, 49]),    # ent1 1
+      1: Word([+1, 0, 1, 0, 0, 49]),    # inc1 1
+      2: Word([+1, 0, 1, 0, 0, 39]),    # jmp 1
+    }
+    vm = VMachine(memory, 0)
+    vm.run(max_cycles = 10)
+    self.assertEqual(vm.cycles, 10)
+    self.assertEqual(int(vm["1"]), 6)
+
+    vm = VMachine(memory, 0)
+    vm.run(breakpoints = set([2]))
+    self.assertEqual(vm.cur_addr, 2)
+    self.assertEqual(vm.cycles, 2)
+    # breakpoints are checked after step, so we can continue
+    vm.run(breakpoints = set([2]))
+    self.assertEqual(vm.cur_addr, 2)
+    self.assertEqual(int(vm["1"]), 3)
+
+    vm = VMachine({0: Word([+1, 0, 0, 0, 2, 5])}, 0) # hlt
+    vm.run()
+    self.assertTrue(vm.halted)
+    self.assertEqual(vm.cycles, 10)
+
+  def testSetCells(self):
+    vm = VMachine({10: Word(5)}, 0)
+    events = []
+    vm.set_mem_hook(lambda addr, old, new: events.append((addr, int(old), int(new))))
+    vm.set_cells(9, [1, 5, 7])
+    self.assertEqual(events, [(9, 0, 1), (11, 0, 7)])
+    self.assertEqual(int(vm[11]), 7)
+
+    ranges = []
+    vm.set_mem_range_hook(lambda first, old, new: ranges.append((first, list(map(int, old)), list(map(int, new)))))
+    vm.set_cells(10, [6, 7])
+    vm.set_cells(10, [6, 7]) # nothing changed
+    self.assertEqual(ranges, [(10, [5, 7], [6, 7])])
+    self.assertEqual(len(events), 2)
+
+  def testDeviceDeadlines(self):
+    memory = {
+      0: Word([+1, 0, 0, 0, 16, 35]),   # ioc 0(16)
+      1: Word([+1, 1, 36, 0, 18, 37]),  # out 100(18)
+    }
+    for addr in range(2, 20):
+      memory[addr] = Word([+1, 0, 0, 0, 2, 48]) # enta 0
+    vm = VMachine(memory, 0)
+    vm.set_device(16, FileDevice(mode = "w", block_size = 5, lock_time = 3, file_object = io.StringIO()))
+    vm.set_device(18, FileDevice(mode = "w", block_size = 5, lock_time = 10, file_object = io.StringIO()))
+    vm.step()
+    self.assertEqual(vm.device_deadlines, {16: 3})
+    vm.step()
+    self.assertEqual(vm.device_deadlines, {16: 3, 18: 11})
+    self.assertEqual(vm.device_deadline, 3)
+    vm.step()
+    # ioc finished, so the next device isn't refreshed on this step
+    self.assertEqual(vm.device_deadlines, {18: 12})
+    self.assertFalse(vm.devices[16].busy)
+    vm.sync_devices()
+    self.assertEqual(vm.devices[18].time_left, 9)
+    vm.run(11)
+    self.assertTrue(vm.devices[18].busy)
+    self.assertEqual(vm.locked_cells(vm.W_LOCKED), set([100]))
+    vm.step()
+    self.assertFalse(vm.devices[18].busy)
+    self.assertEqual(vm.locked_cells(vm.W_LOCKED), set())
+    self.assertEqual(vm.device_deadline, float("inf"))
+
+  def testSkipWait(self):
+    memory = {
+      0: Word([+1, 1, 36, 0, 18, 37]),  # out 100(18)
+      1: Word([+1, 1, 36, 0, 18, 37]),  # out 100(18) (waits for the first one)
+      2: Word([+1, 0, 2, 0, 18, 34]),   # jbus 2(18)
+      3: Word([+1, 0, 0, 0, 2, 5]),     # hlt
+    }
+    def make_vm():
+      vm = VMachine(memory, 0)
+      vm.set_device(18, FileDevice(mode = "w", block_size = 5, lock_time = 50, file_object = io.StringIO()))
+      return vm
+    slow = make_vm()
+    steps = 0
+    while not slow.halted:
+      slow.step()
+      steps += 1
+    self.assertEqual((steps, slow.cycles), (102, 111)) # hlt takes 10 cycles
+
+    fast = make_vm()
+    fast.run()
+    self.assertEqual((fast.cycles, fast["J"].word_list, fast.devices[18].busy), (slow.cycles, slow["J"].word_list, False))
+    fast = make_vm()
+    fast.run(20)
+    self.assertEqual((fast.cycles, fast.cur_addr), (20, 1))
+    fast.run(70)
+    self.assertEqual((fast.cycles, fast.cur_addr), (70, 2))
+
 suite = unittest.makeSuite(VMachineTestCase, 'test')
 
 if __name__ == "__main__":
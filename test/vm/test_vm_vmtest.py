@@ -1,6 +1,7 @@
 from .helper import *
 from vmtest_realization import *
 from word import *
+import io
 
 class VMTestCase(unittest.TestCase):
   def testLoadAndState(self):
@@ -52,6 +53,28 @@ class VMTestCase(unittest.TestCase):
     for arg in "A X I1 I2 I3 I4 I5 I6 J CA CF OF HLT".split():
       self.assertEqual(mega[arg], new_mega[arg])
 
+  def testReloadBusyDevice(self):
+    vm = VMTesting()
+    # out 100(18), the printer is still busy after it
+    vm.load({0: [+1, 1, 36, 0, 18, 37], 1: [+1, 0, 0, 0, 2, 48], 'HLT': 0}, # enta 0
+            {18: (FILE_DEV, 'w', 24*5, 24*2, io.StringIO())})
+    self.assertEqual(vm.execute(at = 0), 1)
+    self.assertEqual(vm.vm.device_deadlines, {18: 48})
+    self.assertEqual(vm.state()["W_LOCKED"], set(range(100, 124)))
+    # cycles are counted from 0 again, so deadlines are moved
+    self.assertEqual(vm.execute(at = 1), 1)
+    self.assertEqual(vm.vm.device_deadlines, {18: 47})
+
+    # busy printer is unplugged
+    memory = dict((addr, [+1, 0, 0, 0, 0, 0]) for addr in range(60)) # nop
+    memory[60] = [+1, 0, 0, 0, 2, 5] # hlt
+    memory.update({'HLT': 0, 'W_LOCKED': set()})
+    vm.load(memory, {19: (FILE_DEV, 'r', 14*5, 14*2, io.StringIO("HELLO\n"))})
+    self.assertEqual(vm.execute(start = 0), 70)
+    self.assertEqual(vm.vm.device_deadlines, {})
+    self.assertEqual(vm.vm.device_deadline, float("inf"))
+    self.assertEqual(list(vm.vm.devices), [19])
+
 
 suite = unittest.makeSuite(VMTestCase, 'test')
 
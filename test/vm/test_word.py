@@ -56,6 +56,27 @@ class WordTestCase(unittest.TestCase):
 
     self.assertEqual(word[:], Word([+1, 1, 0, 1 ,0 ,0]))
 
+  def testPacked(self):
+    word = Word([-1, 1, 2, 3, 4, 5])
+    self.assertFalse(hasattr(word, "__dict__"))
+    self.assertEqual(word.packed, SIGN_BIT | int(Word([+1, 1, 2, 3, 4, 5])))
+    self.assertEqual(int(word), -int(Word([+1, 1, 2, 3, 4, 5])))
+    word.word_list = [+1, 0, 0, 0, 1, 2]
+    self.assertEqual((int(word), word.word_list), (66, [+1, 0, 0, 0, 1, 2]))
+    self.assertEqual(Word([-1, 0, 0, 0, 0, 0]).word_list, [-1, 0, 0, 0, 0, 0])
+
+  def testSharedWord(self):
+    zero = shared_word(0)
+    self.assertTrue(zero is shared_word(0))
+    self.assertEqual(shared_word(SIGN_BIT).word_list, [-1, 0, 0, 0, 0, 0])
+    self.assertRaises(TypeError, zero.__setitem__, 5, 1)
+    self.assertRaises(TypeError, setattr, zero, "packed", 1)
+    # copy of shared word can be changed
+    word = Word(zero)
+    word[5] = 1
+    self.assertEqual((int(word), int(zero)), (1, 0))
+    self.assertFalse(shared_word(1 << 20) is shared_word(1 << 20))
+
 
 suite = unittest.makeSuite(WordTestCase, 'test')
 
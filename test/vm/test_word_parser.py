@@ -2,6 +2,7 @@ from .helper import *
 from word_parser import *
 from word import *
 from virt_machine import *
+from execution import Instruction
 
 class WordParserTestCase(unittest.TestCase):
   class MockVMachine:
@@ -14,6 +15,7 @@ class WordParserTestCase(unittest.TestCase):
       self.r4 = Word(r4)
       self.r5 = Word(r5)
       self.r6 = Word(r6)
+      self.regs = [0] + [pack(self.reg(r)) for r in "123456"] + [0, 0] # packed rA, rI1..rI6, rX, rJ
       self.of = False
 
     def __getitem__(self, item):
@@ -33,6 +35,9 @@ class WordParserTestCase(unittest.TestCase):
     def get_cur_word(self):
       return self.word
 
+    def get_cur_instr(self):
+      return Instruction(self.word)
+
     @staticmethod
     def check_mem_addr(addr):
       return 0 <= addr < VMachine.MEMORY_SIZE
@@ -84,7 +89,7 @@ class WordParserTestCase(unittest.TestCase):
     for word in ( [1, 62, 32, 0, 0, 0],
                   [1, 60, 45, 5, 0, 0],
                   [-1, 0, 1, 0, 0, 0],
-                  [1, 0, 100, 4, 0, 0]):
+                  [1, 1, 36, 4, 0, 0]):
       vmachine.word = Word(word)
       self.assertRaises(InvalidMemAddrError, WordParser.get_full_addr, vmachine, False, True)
 
@@ -48,7 +48,7 @@ class VMAddrManipTestCase(VMBaseTestCase):
     )
 
     self.check1(
-      regs = { 'I4' : [+1, 0, 0, 0, 0, 66]},
+      regs = { 'I4' : [+1, 0, 0, 0, 1, 2]},
       memory = { 0 : [+1, 63, 63, 4, 2, 55]}, # ent
       diff = {
         'CA' : 1,
@@ -0,0 +1,130 @@
+import unittest
+from basetestcase import *
+
+class VMFloatTestCase(VMBaseTestCase):
+  """FADD, FSUB, FMUL, FDIV, FLOT, FIX, FCMP"""
+  def testFLOTandFIX(self):
+    self.check1(
+      regs = { 'A' : [+1, 0, 0, 0, 0, 1] },
+      memory = { 0 : [+1, 0, 0, 0, 6, 5] }, # flot
+      diff = { 'CA' : 1, 'A' : [+1, 33, 1, 0, 0, 0] },
+      cycles = 3
+    )
+    # 64**4 + 32 and 64**4 + 96 are rounded to the same odd fraction
+    for low_bytes in ([0, 32], [1, 32]):
+      self.check1(
+        regs = { 'A' : [-1, 1, 0, 0] + low_bytes },
+        memory = { 0 : [+1, 0, 0, 0, 6, 5] }, # flot
+        diff = { 'CA' : 1, 'A' : [-1, 37, 1, 0, 0, 1] },
+        cycles = 3,
+        message = "testing rounding"
+      )
+    self.check1(
+      regs = { 'A' : [+1, 34, 1, 32, 0, 0] }, # 96.0
+      memory = { 0 : [+1, 0, 0, 0, 7, 5] }, # fix
+      diff = { 'CA' : 1, 'A' : [+1, 0, 0, 0, 1, 32] },
+      cycles = 3
+    )
+    self.check1(
+      regs = { 'A' : [-1, 33, 2, 32, 0, 0] }, # -2.5
+      memory = { 0 : [+1, 0, 0, 0, 7, 5] }, # fix
+      diff = { 'CA' : 1, 'A' : [-1, 0, 0, 0, 0, 3] },
+      cycles = 3
+    )
+    self.check1(
+      regs = { 'A' : [+1, 42, 1, 0, 0, 0] }, # 64**9
+      memory = { 0 : [+1, 0, 0, 0, 7, 5] }, # fix
+      diff = { 'CA' : 1, 'A' : [+1, 0, 0, 0, 0, 0], 'OF' : 1 },
+      cycles = 3,
+      message = "testing overflow"
+    )
+
+  def testFADDandFSUB(self):
+    self.check1(
+      regs = { 'A' : [+1, 33, 1, 0, 0, 0] }, # 1.0
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 1], # fadd 10
+        10 : [+1, 31, 32, 0, 0, 0] # 1/128
+      },
+      diff = { 'CA' : 1, 'A' : [+1, 33, 1, 0, 32, 0] },
+      cycles = 4
+    )
+    self.check1(
+      regs = { 'A' : [+1, 33, 1, 0, 0, 0] },
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 2], # fsub 10
+        10 : [+1, 33, 1, 0, 0, 0]
+      },
+      diff = { 'CA' : 1, 'A' : [+1, 0, 0, 0, 0, 0] },
+      cycles = 4
+    )
+    self.check1(
+      regs = { 'A' : [+1, 33, 1, 0, 0, 0] },
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 2], # fsub 10
+        10 : [+1, 33, 1, 0, 0, 1]
+      },
+      diff = { 'CA' : 1, 'A' : [-1, 30, 1, 0, 0, 0] },
+      cycles = 4,
+      message = "testing normalization"
+    )
+
+  def testFMULandFDIV(self):
+    self.check1(
+      regs = { 'A' : [+1, 63, 1, 0, 0, 0] },
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 3], # fmul 10
+        10 : [-1, 33, 2, 0, 0, 0] # -2.0
+      },
+      diff = { 'CA' : 1, 'A' : [-1, 63, 2, 0, 0, 0] },
+      cycles = 9
+    )
+    self.check1(
+      regs = { 'A' : [+1, 1, 1, 0, 0, 0] },
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 3], # fmul 10
+        10 : [+1, 1, 1, 0, 0, 0]
+      },
+      diff = { 'CA' : 1, 'A' : [+1, 33, 1, 0, 0, 0], 'OF' : 1 },
+      cycles = 9,
+      message = "testing underflow"
+    )
+    self.check1(
+      regs = { 'A' : [+1, 33, 1, 0, 0, 0] },
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 4], # fdiv 10
+        10 : [+1, 33, 3, 0, 0, 0]
+      },
+      diff = { 'CA' : 1, 'A' : [+1, 32, 21, 21, 21, 21] },
+      cycles = 11
+    )
+    self.check1(
+      regs = { 'A' : [+1, 33, 1, 0, 0, 0] },
+      memory = {
+        0 : [+1, 0, 10, 0, 6, 4], # fdiv 10
+        10 : [-1, 40, 0, 0, 0, 0]
+      },
+      diff = { 'CA' : 1, 'OF' : 1 },
+      cycles = 11,
+      message = "testing division by zero"
+    )
+
+  def testFCMP(self):
+    # 1.0 < 1.0 + 64**-3, but they are equal with epsilon = 64**-4
+    for epsilon, diff in (([+1, 0, 0, 0, 0, 0], { 'CA' : 11, 'CF' : -1 }), ([-1, 29, 1, 0, 0, 0], { 'CA' : 11 })):
+      self.check1(
+        regs = { 'A' : [+1, 33, 1, 0, 0, 0] },
+        memory = {
+          0 : epsilon,
+          10 : [+1, 0, 20, 0, 6, 56], # fcmp 20
+          20 : [+1, 33, 1, 0, 0, 1]
+        },
+        startadr = 10,
+        diff = diff,
+        cycles = 4
+      )
+
+suite = unittest.makeSuite(VMFloatTestCase, 'test')
+
+if __name__ == "__main__":
+  unittest.TextTestRunner().run(suite)
@@ -173,7 +173,7 @@ class VMOthersTestCase(VMBaseTestCase):
     )
     self.assertRaises(InvalidIndex, self.exec1,
       regs = { 'I1' : [+1, 0, 0, 0, 0, 1] },
-      memory = { 0: [-1, 0, 1, 64, 5, 7] }
+      memory = { 0: [-1, 0, 1, 7, 5, 7] }
     )
     self.assertRaises(InvalidMove, self.exec1,
       regs = { 'I1' : [-1, 0, 0, 0, 0, 1] },
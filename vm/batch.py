@@ -0,0 +1,145 @@
+# batch.py
+
+# Runs many assembled programs ("*.ma") in a pool of processes and
+# writes results as JSON lines (one line for every job, in manifest order).
+
+# Manifest is a text file, every non-empty line (except comments starting with "#") is
+#   program.ma [input_deck|-] [cycle_limit]
+# Relative paths are taken from manifest directory, "-" means empty input deck.
+# Every job runs in its own temporary directory with its own
+# "printer.out" and "terminal.in", so device files of jobs never collide.
+
+import sys, os, shutil, tempfile, json, hashlib, multiprocessing
+from optparse import OptionParser
+
+from read_memory import *
+from virt_machine import *
+from vm_errors import *
+from device import *
+
+REGISTERS = "A X 1 2 3 4 5 6 J".split()
+
+def add_devices(vmachine, out_file, in_file):
+  """The same devices as in main.py"""
+  vmachine.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = out_file)) # printer
+  vmachine.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = in_file)) # input terminal
+
+class Job:
+  def __init__(self, number, program, deck = None, max_cycles = None):
+    self.number = number
+    self.program = program
+    self.deck = deck
+    self.max_cycles = max_cycles
+
+def read_manifest(lines, base_dir = "", max_cycles = None):
+  """Returns list of jobs, max_cycles is used for lines without cycle limit (raises ValueError)"""
+  jobs = []
+  for i, line in enumerate(lines):
+    parts = line.split("#", 1)[0].split()
+    if len(parts) == 0:
+      continue
+    if len(parts) > 3:
+      raise ValueError("line %i: too many fields" % (i + 1))
+    program = os.path.join(base_dir, parts[0])
+    deck = os.path.join(base_dir, parts[1]) if len(parts) > 1 and parts[1] != "-" else None
+    try:
+      limit = int(parts[2]) if len(parts) > 2 else max_cycles
+    except ValueError:
+      raise ValueError("line %i: invalid cycle limit '%s'" % (i + 1, parts[2]))
+    jobs.append(Job(len(jobs), program, deck, limit))
+  return jobs
+
+def run_job(job):
+  """Runs one job in temporary directory, returns dict of results (errors of job are in result["error"])"""
+  result = {"job": job.number, "program": job.program, "deck": job.deck, "halted": False, "cycles": 0,
+            "cur_addr": None, "registers": None, "printer": None, "error": None}
+  work_dir = None
+  try:
+    work_dir = tempfile.mkdtemp(prefix = "mix_batch_")
+    _run_job(job, work_dir, result)
+  except Exception as e:
+    # every job is isolated, its error doesn't stop other jobs
+    result["error"] = "%s: %s" % (e.__class__.__name__, e)
+  finally:
+    if work_dir is not None:
+      shutil.rmtree(work_dir, ignore_errors = True)
+  return result
+
+def _run_job(job, work_dir, result):
+  try:
+    with open(job.program, "r") as f:
+      memory, start_address, errors = read_memory(f.readlines())
+    if job.deck is not None:
+      shutil.copyfile(job.deck, os.path.join(work_dir, "terminal.in"))
+    else:
+      open(os.path.join(work_dir, "terminal.in"), "w").close()
+  except IOError as e:
+    result["error"] = "%s: %s" % (ERR_INVALID_INPUT_FILE[1], e)
+    return
+  if len(errors) > 0:
+    result["error"] = "%s: %s" % (ERR_SYNTAX[1], "; ".join("%s: %s" % error for error in errors))
+    return
+
+  vmachine = VMachine(memory, start_address)
+  vmachine.set_engine(VMachine.TRANSLATOR)
+  with open(os.path.join(work_dir, "printer.out"), "w") as out_file:
+    with open(os.path.join(work_dir, "terminal.in"), "r") as in_file:
+      add_devices(vmachine, out_file, in_file)
+      try:
+        vmachine.run(job.max_cycles)
+      except VMError as e:
+        result["error"] = "%s: %s" % (e.__class__.__name__, e)
+  with open(os.path.join(work_dir, "printer.out"), "rb") as out_file:
+    result["printer"] = hashlib.sha1(out_file.read()).hexdigest()
+
+  result["halted"] = vmachine.halted
+  result["cycles"] = vmachine.cycles
+  result["cur_addr"] = vmachine.cur_addr
+  result["registers"] = dict((reg, vmachine[reg].word_list[:]) for reg in REGISTERS)
+
+def run_batch(jobs, out, processes = None):
+  """Runs jobs in pool and writes JSON line for every job to out as soon as it (and all previous) finished"""
+  pool = multiprocessing.Pool(processes)
+  try:
+    for result in pool.imap(run_job, jobs):
+      out.write(json.dumps(result, sort_keys = True) + "\n")
+      out.flush()
+  finally:
+    pool.close()
+    pool.join()
+
+def main():
+  parser = OptionParser()
+  parser.set_usage("batch.py [OPTIONS] MANIFEST")
+  parser.add_option("-j", "--jobs", dest = "processes", type = "int", default = None,
+      help = "number of worker processes (default - number of cpus)")
+  parser.add_option("-c", "--cycles", dest = "max_cycles", type = "int", default = None,
+      help = "cycle limit for jobs without their own limit")
+  parser.add_option("-o", "--output", dest = "output", default = None,
+      help = "file for results (default - stdout)")
+  (options, args) = parser.parse_args()
+
+  if len(args) != 1:
+    parser.print_usage()
+    return ERR_INVALID_ARGS[0]
+
+  try:
+    with open(args[0], "r") as f:
+      jobs = read_manifest(f.readlines(), os.path.dirname(args[0]), options.max_cycles)
+  except IOError as e:
+    print("%s (%s): %s" % (ERR_INVALID_INPUT_FILE[1], args[0], e.strerror))
+    return ERR_INVALID_INPUT_FILE[0]
+  except ValueError as e:
+    print("%s: %s" % (ERR_SYNTAX[1], e))
+    return ERR_SYNTAX[0]
+
+  out = open(options.output, "w") if options.output is not None else sys.stdout
+  try:
+    run_batch(jobs, out, options.processes)
+  finally:
+    if out is not sys.stdout:
+      out.close()
+
+# if we executing module
+if __name__ == '__main__':
+  sys.exit(main())
@@ -1,6 +1,6 @@
 from vm_errors import *
 
-import sys, os
+import sys, os, mmap, struct
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
 import charset
 
@@ -9,12 +9,14 @@ class DeviceBusyException(Exception):
 
 class Device:
   """Abstract class of device"""
+  binary = False # binary devices read and write packed words (see BlockDevice)
+
   def __init__(self, mode, block_size, lock_time):
     self.mode = mode # [rw]
     self.block_size = block_size # number of bytes in one block
     self.lock_time = lock_time # time for blocking device
     self.busy = False
-    self.time_left = 0 # how many cycles device will be busy more
+    self.time_left = 0 # how many cycles device will be busy more (VM updates it only by sync_devices())
 
     # next 2 variables for memory locking
     self.locked_mode = None # "w" or "rw"
@@ -37,87 +39,303 @@ class Device:
     else:
       raise InvaliCharCodeError(num)
 
-  def read(self, limits):
-    """Basics of reading for any device"""
-    if 'r' not in self.mode:
-      raise UnsupportedDeviceModeError("inputting")
+  def _start(self, time, locked_mode, limits):
+    """Makes device busy for <time> cycles, memory in limits is locked in locked_mode"""
     if self.busy:
       raise DeviceBusyException
-    
+
     self.busy = True
-    self.time_left = self.lock_time # add time for new read
+    self.time_left = time
 
-    self.locked_mode = "rw"
+    self.locked_mode = locked_mode
     self.locked_range = limits
 
+  def read(self, limits):
+    """Basics of reading for any device"""
+    if 'r' not in self.mode:
+      raise UnsupportedDeviceModeError("inputting")
+    self._start(self.lock_time, "rw", limits) # add time for new read
+
   def write(self, bytes, limits):
     """Basics of writing for any device"""
     assert(len(bytes) == self.block_size)
     if 'w' not in self.mode:
       raise UnsupportedDeviceModeError("outputting")
-    if self.busy:
-      raise DeviceBusyException
-   
-    self.busy = True
-    self.time_left = self.lock_time # add time for new write
-
-    self.locked_mode = "w"
-    self.locked_range = limits
+    self._start(self.lock_time, "w", limits) # add time for new write
 
   def control(self):
     """Control function, called by IOC instruction"""
-    if self.busy:
-      raise DeviceBusyException
-    
-    self.busy = True
-    self.time_left = self.lock_time # add time for control
+    self._start(self.lock_time, "", None) # add time for control
 
-    self.locked_mode = ""
-    self.locked_range = None
+  def finish(self):
+    """Called by VM when time_left cycles passed since device became busy, returns (mode, limits) of locked memory"""
+    self.busy = False
+    self.time_left = 0
+    return (self.locked_mode, self.locked_range)
 
-  def refresh(self, cycles_passed):
-    """Called every VM step, if device is busy, refresh how many cycles it'll busy more"""
-    if not self.busy:
-      return None
-    self.time_left -= cycles_passed
-    if self.time_left <= 0:
-      self.busy = False
-      self.time_left = 0
-      return (self.locked_mode, self.locked_range)
-    return None
+  def flush(self):
+    """Writes buffered output, VM calls it when run() returns and after every I/O instruction done by step()"""
+    pass
+
+  LOCKED_MODES = (None, "", "w", "rw")
+
+  def get_state(self):
+    """State as list of ints (for snapshots of virtual machine)"""
+    left, right = self.locked_range if self.locked_range is not None else (-1, -1)
+    return [int(self.busy), self.time_left, self.LOCKED_MODES.index(self.locked_mode),
+            -1 if left is None else left, -1 if right is None else right]
+
+  def set_state(self, state):
+    """Restores state returned by get_state()"""
+    busy, self.time_left, mode, left, right = state[:5]
+    self.busy = bool(busy)
+    self.locked_mode = self.LOCKED_MODES[mode]
+    self.locked_range = None if self.locked_mode == "" else (None if left == -1 else left, None if right == -1 else right)
 
 
 class FileDevice(Device):
   """Device that can read(write) from(to) files"""
+  CHUNK_LINES = 256 # input is read and translated by chunks of lines (if file is seekable)
+  BUFFER_SIZE = 1 << 16 # output is written when buffer is bigger or by flush()
+
   def __init__(self, mode, block_size, lock_time, file_object):
     assert( ('r' in mode) ^ ('w' in mode) )
     Device.__init__(self, mode, block_size, lock_time)
     self.file_object = file_object
+    # read lines: text (for error messages) and mix codes of all lines
+    self.chunk_pos = -1 # position of the first line in file (-1 if file isn't seekable)
+    self.lines = []
+    self.offsets = [] # offsets of lines in codes
+    self.codes = b""
+    self.line_index = 0 # next line
+    # lines for writing
+    self.buffer = []
+    self.buffer_size = 0
+
+  def _read_chunk(self):
+    try:
+      seekable = self.file_object.seekable()
+      self.chunk_pos = self.file_object.tell() if seekable else -1
+    except (OSError, ValueError):
+      seekable = False
+      self.chunk_pos = -1
+    # lines are read by readline(), so they are split as before for any newline mode of file
+    lines = []
+    for _ in range(self.CHUNK_LINES if seekable else 1):
+      line = self.file_object.readline()
+      if line == "":
+        break
+      lines.append(line)
+    self.codes = charset.encode("".join(lines), charset.INVALID) # wrong chars are found only in read lines
+    self.offsets = []
+    offset = 0
+    for line in lines:
+      self.offsets.append(offset)
+      offset += len(line)
+    self.lines = [line.rstrip("\n\r") for line in lines]
+    self.line_index = 0
+
+  def _next_line(self):
+    """Returns index of the next line in self.lines or None at the end of file"""
+    if self.line_index == len(self.lines):
+      self._read_chunk()
+      if len(self.lines) == 0:
+        return None
+    self.line_index += 1
+    return self.line_index - 1
 
   def read(self, limits):
     """Read from file minimum from one line or <block_size> chars"""
     Device.read(self, limits)
 
-    line = self.file_object.readline().rstrip("\n\r")
-    if len(line) < self.block_size:
-      line += " " * (self.block_size - len(line))
-    else:
-      line = line[:self.block_size]
-    bytes = list(map(Device._ord, line))
-    return bytes
+    i = self._next_line()
+    if i is None:
+      return [0] * self.block_size # end of file, line of spaces
+    offset = self.offsets[i]
+    codes = self.codes[offset : offset + min(len(self.lines[i]), self.block_size)]
+    if charset.INVALID in codes:
+      raise InvalidCharError(self.lines[i][codes.index(charset.INVALID)])
+    return list(codes) + [0] * (self.block_size - len(codes))
 
   def write(self, bytes, limits):
     """Write <block_size> chars to file"""
     Device.write(self, bytes, limits)
 
-    line = "".join(map(Device._chr, bytes))
-    self.file_object.write(line+"\n")
+    try:
+      line = charset.decode(bytes)
+    except charset.CharsetError as e:
+      raise InvaliCharCodeError(e.value)
+    self.buffer.append(line)
+    self.buffer.append("\n")
+    self.buffer_size += len(line) + 1
+    if self.buffer_size >= self.BUFFER_SIZE:
+      self.flush()
 
   def control(self):
     """Jump to newline in file"""
     Device.control(self)
 
     if 'r' in self.mode:
-      self.file_object.readline() # simply jump newline
+      self._next_line() # simply jump newline
     else: # 'w' in self.mode:
-      self.file_object.write("<---------NEW-PAGE--------->\n") # jump newline
+      self.buffer.append("<---------NEW-PAGE--------->\n") # jump newline
+      self.flush()
+
+  def flush(self):
+    if len(self.buffer) > 0:
+      self.file_object.write("".join(self.buffer))
+      self.buffer = []
+      self.buffer_size = 0
+
+  def get_state(self):
+    """Position in file is saved too (-1 if file isn't seekable)"""
+    if 'w' in self.mode:
+      self.flush()
+      try:
+        position = self.file_object.tell()
+      except (OSError, ValueError):
+        position = -1
+      return Device.get_state(self) + [position, 0]
+    if self.line_index == len(self.lines):
+      # chunk is read, so position of the next line is known
+      self._read_chunk()
+    return Device.get_state(self) + [self.chunk_pos, self.line_index]
+
+  def set_state(self, state):
+    Device.set_state(self, state)
+    position, line_index = state[5:7]
+    if position == -1:
+      return
+    self.file_object.seek(position)
+    if 'w' in self.mode:
+      self.buffer = [] # lines written after snapshot are dropped
+      self.buffer_size = 0
+      self.file_object.truncate()
+    else:
+      self._read_chunk()
+      self.line_index = line_index
+
+
+class BlockDevice(Device):
+  """Device with blocks of 100 words kept in binary file (4 bytes per packed word) accessed through mmap.
+     Words are copied with signs and without any translation, so exec_io calls read_words(), write_words()
+     and control_blocks() of binary devices instead of read(), write() and control().
+     Blocks which weren't written are read as +0 words."""
+  binary = True
+  WORDS = 100
+  BLOCK = struct.Struct("<%iI" % WORDS)
+  MAX_PACKED = (1 << 31) - 1
+
+  def __init__(self, lock_time, seek_time, file_name, blocks = None):
+    Device.__init__(self, "rw", 5 * self.WORDS, lock_time)
+    self.seek_time = seek_time # cycles for moving by one block
+    self.blocks = blocks # number of blocks on device (None - unlimited)
+    self.position = 0 # number of current block
+    self.fd = os.open(file_name, os.O_RDWR | os.O_CREAT, 0o644)
+    self.mapped = None
+    self.size = 0 # mapped blocks
+    self._map(os.fstat(self.fd).st_size // self.BLOCK.size)
+
+  def _map(self, size):
+    """Maps the first <size> blocks of file, file is extended by zeros if it's shorter"""
+    if self.mapped is not None:
+      self.mapped.close()
+      self.mapped = None
+    length = size * self.BLOCK.size
+    if os.fstat(self.fd).st_size < length:
+      os.ftruncate(self.fd, length)
+    if length > 0:
+      self.mapped = mmap.mmap(self.fd, length)
+    self.size = size
+
+  def close(self):
+    if self.mapped is not None:
+      self.mapped.close()
+      self.mapped = None
+    if self.fd is not None:
+      os.close(self.fd)
+      self.fd = None
+
+  def check_block(self, block):
+    if block < 0 or (self.blocks is not None and block >= self.blocks):
+      raise InvalidBlockError(block)
+
+  def read_block(self, block):
+    """Returns list of packed words of block"""
+    if block >= self.size:
+      return [0] * self.WORDS
+    words = list(self.BLOCK.unpack_from(self.mapped, block * self.BLOCK.size))
+    if max(words) > self.MAX_PACKED:
+      raise BrokenBlockError(block)
+    return words
+
+  def write_block(self, block, words):
+    if block >= self.size:
+      # file grows twice to avoid remapping on every new block
+      size = max(block + 1, 2 * self.size)
+      self._map(size if self.blocks is None else min(size, self.blocks))
+    self.BLOCK.pack_into(self.mapped, block * self.BLOCK.size, *words)
+
+  def get_state(self):
+    """Position is saved, but blocks written after snapshot aren't restored"""
+    return Device.get_state(self) + [self.position]
+
+  def set_state(self, state):
+    Device.set_state(self, state)
+    self.position = state[5]
+
+
+class TapeDevice(BlockDevice):
+  """Magnetic tape: blocks are read and written one by one from current position,
+     IOC M skips M blocks (backward if M < 0) or rewinds tape if M = 0"""
+  def read_words(self, limits, x):
+    self.check_block(self.position)
+    words = self.read_block(self.position)
+    self._start(self.lock_time, "rw", limits)
+    self.position += 1
+    return words
+
+  def write_words(self, words, limits, x):
+    self.check_block(self.position)
+    self._start(self.lock_time, "w", limits)
+    self.write_block(self.position, words)
+    self.position += 1
+
+  def control_blocks(self, m, x):
+    position = 0 if m == 0 else max(0, self.position + m)
+    if self.blocks is not None:
+      position = min(position, self.blocks)
+    self._start(self.seek_time * max(abs(position - self.position), 1), "", None)
+    self.position = position
+
+
+class DiskDevice(BlockDevice):
+  """Disk: block number is taken from rX, time of moving to it is added to time of transfer,
+     IOC 0 moves to block rX in advance"""
+  BLOCKS = 4096
+
+  def __init__(self, lock_time, seek_time, file_name, blocks = BLOCKS):
+    BlockDevice.__init__(self, lock_time, seek_time, file_name, blocks)
+
+  def _seek_time(self, block):
+    return self.seek_time * abs(block - self.position)
+
+  def read_words(self, limits, x):
+    self.check_block(x)
+    words = self.read_block(x)
+    self._start(self.lock_time + self._seek_time(x), "rw", limits)
+    self.position = x
+    return words
+
+  def write_words(self, words, limits, x):
+    self.check_block(x)
+    self._start(self.lock_time + self._seek_time(x), "w", limits)
+    self.write_block(x, words)
+    self.position = x
+
+  def control_blocks(self, m, x):
+    if m != 0:
+      raise UnsupportedDeviceModeError("IOC with M != 0")
+    self.check_block(x)
+    self._start(max(self._seek_time(x), 1), "", None)
+    self.position = x
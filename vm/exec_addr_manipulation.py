@@ -3,25 +3,27 @@
 # ALL DONE
 
 from word_parser import *
+from packed_memory import *
 
 def _linear_manipulation(vmachine, reg, sign, inc_action):
   vmachine["cycles"] += 1
 
   """Inc-Action is 1 or 0"""
-  result = inc_action * int(vmachine[reg]) + sign * WordParser.get_full_addr(vmachine, check_overflow = True)
+  index = REG_INDEX[reg]
+  result = inc_action * packed_int(vmachine.regs[index]) + sign * WordParser.get_full_addr(vmachine, check_overflow = True)
   if result == 0:
     if inc_action:
       # if inc/dec sign is from previous register (line in ADD)
-      w_result = Word( [vmachine[reg:0:0][0], 0, 0, 0, 0, 0] )
+      packed = vmachine.regs[index] & SIGN_BIT
     else:
       # if ent/enn sign is from M (line in LD*)
-      w_result = Word( [sign * WordParser.get_sign(vmachine), 0, 0, 0, 0, 0] )
+      packed = SIGN_BIT if sign * WordParser.get_sign(vmachine) < 0 else 0
   else:
     if abs(result) >= MAX_BYTE**2:
       result = Word.norm_2bytes(result)
       vmachine["of"] = True
-    w_result = Word(result)
-  vmachine[reg] = w_result
+    packed = pack(result)
+  vmachine.set_register(index, packed)
 
 #----------------ENT/ENN--------------------
 def _ent(vmachine, reg, sign = 1):
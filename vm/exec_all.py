@@ -4,6 +4,7 @@ from exec_load import *                 # ALL DONE - DONE SIGN WATCHING
 from exec_others import *               # NOP, HLT, NUM, CHAR, MOVE - DONE SIGN WATCHING
 from exec_store import *                # ALL DONE - DONE SIGN WATCHING
 from exec_math import *                 # ALL DONE - DONE SIGN WATCHING
+from exec_float import *                # FADD, FSUB, FMUL, FDIV, FLOT, FIX, FCMP
 from exec_shift import *                # ALL DONE - DONE SIGN WATCHING
 from exec_jump import *                 # ALL DONE - DONE SIGN WATCHING
 from exec_io import *                   # ALL DONE - DONE SIGN WATCHING
@@ -2,6 +2,7 @@
 
 # ALL DONE
 from word_parser import *
+from packed_memory import *
 
 def _cmp(vmachine, reg):
   vmachine["cycles"] += 2
@@ -11,8 +12,8 @@ def _cmp(vmachine, reg):
     raise MemReadLockedError( (addr, addr) )
   left, right = WordParser.get_field_spec(vmachine)
 
-  r = int(vmachine[reg:left:right])
-  a = int(vmachine[addr:left:right])
+  r = packed_int(get_field(vmachine.regs[REG_INDEX[reg]], 8*left + right))
+  a = packed_int(get_field(vmachine.cells[addr], 8*left + right))
   vmachine["cf"] = (r > a) - (r < a)
 
 def cmpa(vmachine):  _cmp(vmachine, "A")
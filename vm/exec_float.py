@@ -0,0 +1,118 @@
+# fadd, fsub, fmul, fdiv (c_codes = 1..4, f = 6), flot, fix (c_code = 5, f = 6, 7), fcmp (c_code = 56, f = 6)
+
+# Floating point word (Knuth, 4.2.1): sign, exponent e (byte 1, excess 32) and fraction f (bytes 2..5),
+# value = +-f * 64**(e - 36) for f as 4-byte integer. Results are normalized (byte 2 isn't zero)
+# and rounded exactly, ties are rounded as in algorithm 4.2.1N: to odd last byte (b/2 = 32 is even).
+# If exponent of result isn't in 0..63, overflow toggle is set and exponent is taken modulo 64.
+
+from word_parser import *
+from packed_memory import *
+
+FRACTION = MAX_BYTE**4
+
+def _parts(packed):
+  """Float packed word -> (negative, exponent, fraction)"""
+  return packed & SIGN_BIT, (packed >> 24) & (MAX_BYTE - 1), packed & (FRACTION - 1)
+
+def _round(num, den):
+  """Nearest integer to num/den"""
+  q, r = divmod(num, den)
+  if 2*r > den or (2*r == den and q % 2 == 0):
+    q += 1
+  return q
+
+def _normalize(vmachine, negative, num, den, e):
+  """Float packed word nearest to num/den * 64**(e - 36)"""
+  if num == 0:
+    return 0
+  while num >= den * FRACTION:
+    den *= MAX_BYTE
+    e += 1
+  while num * MAX_BYTE < den * FRACTION:
+    num *= MAX_BYTE
+    e -= 1
+  f = _round(num, den)
+  if f == FRACTION: # rounding overflow
+    f //= MAX_BYTE
+    e += 1
+  if not 0 <= e < MAX_BYTE:
+    vmachine["of"] = True
+    e %= MAX_BYTE
+  return (SIGN_BIT if negative else 0) | (e << 24) | f
+
+def _operand(vmachine):
+  addr = WordParser.get_full_addr(vmachine, check_mix_addr = True)
+  if not vmachine.is_readable(addr):
+    raise MemReadLockedError( (addr, addr) )
+  return vmachine.cells[addr]
+
+def _fadd(vmachine, sign):
+  vmachine["cycles"] += 4
+
+  u_neg, u_e, u_f = _parts(vmachine.regs[REG_A])
+  v_neg, v_e, v_f = _parts(_operand(vmachine) ^ sign)
+  # exact sum in units of the lowest exponent
+  e = min(u_e, v_e)
+  result = (-u_f if u_neg else u_f) * MAX_BYTE**(u_e - e) + (-v_f if v_neg else v_f) * MAX_BYTE**(v_e - e)
+
+  vmachine.set_register(REG_A, _normalize(vmachine, result < 0, abs(result), 1, e))
+
+def fadd(vmachine): _fadd(vmachine, 0)
+def fsub(vmachine): _fadd(vmachine, SIGN_BIT)
+
+def fmul(vmachine):
+  vmachine["cycles"] += 9
+
+  ra = vmachine.regs[REG_A]
+  src = _operand(vmachine)
+  u_neg, u_e, u_f = _parts(ra)
+  v_neg, v_e, v_f = _parts(src)
+
+  vmachine.set_register(REG_A, _normalize(vmachine, (ra ^ src) & SIGN_BIT, u_f * v_f, 1, u_e + v_e - 36))
+
+def fdiv(vmachine):
+  vmachine["cycles"] += 11
+
+  ra = vmachine.regs[REG_A]
+  src = _operand(vmachine)
+  u_neg, u_e, u_f = _parts(ra)
+  v_neg, v_e, v_f = _parts(src)
+  if v_f == 0: # division by zero
+    vmachine["of"] = True
+    return
+
+  vmachine.set_register(REG_A, _normalize(vmachine, (ra ^ src) & SIGN_BIT, u_f, v_f, u_e - v_e + 36))
+
+def flot(vmachine):
+  vmachine["cycles"] += 3
+
+  ra = vmachine.regs[REG_A]
+  vmachine.set_register(REG_A, _normalize(vmachine, ra & SIGN_BIT, ra & MAGNITUDE, 1, 36))
+
+def fix(vmachine):
+  vmachine["cycles"] += 3
+
+  ra = vmachine.regs[REG_A]
+  negative, e, f = _parts(ra)
+  result = f * MAX_BYTE**(e - 36) if e >= 36 else _round(f, MAX_BYTE**(36 - e))
+  if result > MAGNITUDE:
+    vmachine["of"] = True
+
+  # sign is kept like in add, even if result is zero
+  vmachine.set_register(REG_A, (ra & SIGN_BIT) | (result & MAGNITUDE))
+
+def fcmp(vmachine):
+  vmachine["cycles"] += 4
+
+  u_neg, u_e, u_f = _parts(vmachine.regs[REG_A])
+  v_neg, v_e, v_f = _parts(_operand(vmachine))
+  # epsilon is float in cell 0 (its sign is ignored), Knuth 4.2.2 (21):
+  # u ~ v if |v - u| <= eps * 64**(max(u_e, v_e) - 32)
+  eps_neg, eps_e, eps_f = _parts(vmachine.cells[0])
+  eps_e += max(u_e, v_e) - 32
+  # exact values in units of the lowest exponent
+  e = min(u_e, v_e, eps_e)
+  diff = (-v_f if v_neg else v_f) * MAX_BYTE**(v_e - e) - (-u_f if u_neg else u_f) * MAX_BYTE**(u_e - e)
+  eps = eps_f * MAX_BYTE**(eps_e - e)
+
+  vmachine["cf"] = -1 if diff > eps else (1 if -diff > eps else 0)
@@ -4,6 +4,7 @@
 
 from word_parser import *
 from vm_errors import *
+from packed_memory import *
 
 def _get_device(vmachine):
   """Return device or raise exception"""
@@ -19,6 +20,8 @@ def ioc(vmachine):
   
   if dev.busy:
     vmachine.jump_to = vmachine.cur_addr
+  elif dev.binary:
+    dev.control_blocks(WordParser.get_full_addr(vmachine), packed_int(vmachine.regs[REG_X]))
   else:
     dev.control()
 
@@ -40,16 +43,20 @@ def in_(vmachine):
     return
 
   # check if region is writeable
-  if not vmachine.is_writeable_set(set(  range(addr, addr + words_num)  )):
+  if not vmachine.is_writeable_range(addr, addr + words_num - 1):
     raise MemWriteLockedError( (addr, addr + words_num - 1) )
 
-  # read bytes
-  bytes = dev.read((addr, addr + words_num - 1))
-  # write them to memory
-  for i in range(words_num):
-    vmachine[(addr + i):1:5] = [+1] + bytes[5*i: 5*(i + 1)] # +1 added like a sign to word
+  if dev.binary:
+    # whole words are copied
+    vmachine.set_cells(addr, dev.read_words((addr, addr + words_num - 1), packed_int(vmachine.regs[REG_X])))
+  else:
+    # read bytes
+    bytes = dev.read((addr, addr + words_num - 1))
+    # write them to memory
+    for i in range(words_num):
+      vmachine[(addr + i):1:5] = [+1] + bytes[5*i: 5*(i + 1)] # +1 added like a sign to word
   # and lock memory for any actions
-  vmachine.lock_cells(vmachine.RW_LOCKED, add = set(range( addr, addr + words_num )))
+  vmachine.lock_cells(vmachine.RW_LOCKED, add = (addr, addr + words_num - 1))
 
 def out(vmachine):
   dev, addr, words_num = _in_out(vmachine)
@@ -59,14 +66,17 @@ def out(vmachine):
     return
 
   # check if region is readable
-  if not vmachine.is_readable_set(set(  range(addr, addr + words_num)  )):
+  if not vmachine.is_readable_range(addr, addr + words_num - 1):
     raise MemReadLockedError( (addr, addr + words_num - 1) )
 
-  # get bytes list from memory
-  bytes = []
-  for i in range(words_num):
-    bytes += vmachine[addr + i].word_list[1:6]
-  # write them to file
-  dev.write(bytes, (addr, addr + words_num - 1))
+  if dev.binary:
+    dev.write_words(vmachine.cells[addr : addr + words_num], (addr, addr + words_num - 1), packed_int(vmachine.regs[REG_X]))
+  else:
+    # get bytes list from memory
+    bytes = []
+    for i in range(words_num):
+      bytes += vmachine[addr + i].word_list[1:6]
+    # write them to file
+    dev.write(bytes, (addr, addr + words_num - 1))
   # and lock memory for writing (any instructions can read this memory)
-  vmachine.lock_cells(vmachine.W_LOCKED, add = set(range( addr, addr + words_num )))
+  vmachine.lock_cells(vmachine.W_LOCKED, add = (addr, addr + words_num - 1))
@@ -4,6 +4,7 @@
 
 from exec_io import _get_device
 from word_parser import *
+from packed_memory import *
 
 def _j(vmachine, condition, save_j = True, reset_of = False):
   vmachine["cycles"] += 1
@@ -15,7 +16,7 @@ def _j(vmachine, condition, save_j = True, reset_of = False):
     vmachine["of"] = False
 
   if save_j:
-    vmachine["J":4:5] = vmachine.cur_addr + 1
+    vmachine.set_register(REG_J, set_field(vmachine.regs[REG_J], 8*4 + 5, vmachine.cur_addr + 1))
 
   vmachine.jump_to = WordParser.get_full_addr(vmachine, check_mix_addr = True)
 
@@ -25,67 +26,67 @@ def jred(vmachine): _j(vmachine, lambda vm: _get_device(vmachine).busy == False)
 
 def jmp(vmachine):    _j(vmachine, lambda vm: True)
 def jsj(vmachine):    _j(vmachine, lambda vm: True, save_j = False)
-def jov(vmachine):    _j(vmachine, lambda vm: vm["of"] == True, reset_of = True)
-def jnov(vmachine):   _j(vmachine, lambda vm: vm["of"] == False)
-def jl(vmachine):     _j(vmachine, lambda vm: vm["cf"] < 0)
-def je(vmachine):     _j(vmachine, lambda vm: vm["cf"] == 0)
-def jg(vmachine):     _j(vmachine, lambda vm: vm["cf"] > 0)
-def jge(vmachine):    _j(vmachine, lambda vm: vm["cf"] >= 0)
-def jne(vmachine):    _j(vmachine, lambda vm: vm["cf"] != 0)
-def jle(vmachine):    _j(vmachine, lambda vm: vm["cf"] <= 0)
-
-def jan(vmachine):    _j(vmachine, lambda vm: int(vm["A"]) < 0)
-def jaz(vmachine):    _j(vmachine, lambda vm: int(vm["A"]) == 0)
-def jap(vmachine):    _j(vmachine, lambda vm: int(vm["A"]) > 0)
-def jann(vmachine):   _j(vmachine, lambda vm: int(vm["A"]) >= 0)
-def janz(vmachine):   _j(vmachine, lambda vm: int(vm["A"]) != 0)
-def janp(vmachine):   _j(vmachine, lambda vm: int(vm["A"]) <= 0)
-
-def j1n(vmachine):    _j(vmachine, lambda vm: int(vm["1"]) < 0)
-def j1z(vmachine):    _j(vmachine, lambda vm: int(vm["1"]) == 0)
-def j1p(vmachine):    _j(vmachine, lambda vm: int(vm["1"]) > 0)
-def j1nn(vmachine):   _j(vmachine, lambda vm: int(vm["1"]) >= 0)
-def j1nz(vmachine):   _j(vmachine, lambda vm: int(vm["1"]) != 0)
-def j1np(vmachine):   _j(vmachine, lambda vm: int(vm["1"]) <= 0)
-
-def j2n(vmachine):    _j(vmachine, lambda vm: int(vm["2"]) < 0)
-def j2z(vmachine):    _j(vmachine, lambda vm: int(vm["2"]) == 0)
-def j2p(vmachine):    _j(vmachine, lambda vm: int(vm["2"]) > 0)
-def j2nn(vmachine):   _j(vmachine, lambda vm: int(vm["2"]) >= 0)
-def j2nz(vmachine):   _j(vmachine, lambda vm: int(vm["2"]) != 0)
-def j2np(vmachine):   _j(vmachine, lambda vm: int(vm["2"]) <= 0)
-
-def j3n(vmachine):    _j(vmachine, lambda vm: int(vm["3"]) < 0)
-def j3z(vmachine):    _j(vmachine, lambda vm: int(vm["3"]) == 0)
-def j3p(vmachine):    _j(vmachine, lambda vm: int(vm["3"]) > 0)
-def j3nn(vmachine):   _j(vmachine, lambda vm: int(vm["3"]) >= 0)
-def j3nz(vmachine):   _j(vmachine, lambda vm: int(vm["3"]) != 0)
-def j3np(vmachine):   _j(vmachine, lambda vm: int(vm["3"]) <= 0)
-
-def j4n(vmachine):    _j(vmachine, lambda vm: int(vm["4"]) < 0)
-def j4z(vmachine):    _j(vmachine, lambda vm: int(vm["4"]) == 0)
-def j4p(vmachine):    _j(vmachine, lambda vm: int(vm["4"]) > 0)
-def j4nn(vmachine):   _j(vmachine, lambda vm: int(vm["4"]) >= 0)
-def j4nz(vmachine):   _j(vmachine, lambda vm: int(vm["4"]) != 0)
-def j4np(vmachine):   _j(vmachine, lambda vm: int(vm["4"]) <= 0)
-
-def j5n(vmachine):    _j(vmachine, lambda vm: int(vm["5"]) < 0)
-def j5z(vmachine):    _j(vmachine, lambda vm: int(vm["5"]) == 0)
-def j5p(vmachine):    _j(vmachine, lambda vm: int(vm["5"]) > 0)
-def j5nn(vmachine):   _j(vmachine, lambda vm: int(vm["5"]) >= 0)
-def j5nz(vmachine):   _j(vmachine, lambda vm: int(vm["5"]) != 0)
-def j5np(vmachine):   _j(vmachine, lambda vm: int(vm["5"]) <= 0)
-
-def j6n(vmachine):    _j(vmachine, lambda vm: int(vm["6"]) < 0)
-def j6z(vmachine):    _j(vmachine, lambda vm: int(vm["6"]) == 0)
-def j6p(vmachine):    _j(vmachine, lambda vm: int(vm["6"]) > 0)
-def j6nn(vmachine):   _j(vmachine, lambda vm: int(vm["6"]) >= 0)
-def j6nz(vmachine):   _j(vmachine, lambda vm: int(vm["6"]) != 0)
-def j6np(vmachine):   _j(vmachine, lambda vm: int(vm["6"]) <= 0)
-
-def jxn(vmachine):    _j(vmachine, lambda vm: int(vm["X"]) < 0)
-def jxz(vmachine):    _j(vmachine, lambda vm: int(vm["X"]) == 0)
-def jxp(vmachine):    _j(vmachine, lambda vm: int(vm["X"]) > 0)
-def jxnn(vmachine):   _j(vmachine, lambda vm: int(vm["X"]) >= 0)
-def jxnz(vmachine):   _j(vmachine, lambda vm: int(vm["X"]) != 0)
-def jxnp(vmachine):   _j(vmachine, lambda vm: int(vm["X"]) <= 0)
+def jov(vmachine):    _j(vmachine, lambda vm: vm.of == True, reset_of = True)
+def jnov(vmachine):   _j(vmachine, lambda vm: vm.of == False)
+def jl(vmachine):     _j(vmachine, lambda vm: vm.cf < 0)
+def je(vmachine):     _j(vmachine, lambda vm: vm.cf == 0)
+def jg(vmachine):     _j(vmachine, lambda vm: vm.cf > 0)
+def jge(vmachine):    _j(vmachine, lambda vm: vm.cf >= 0)
+def jne(vmachine):    _j(vmachine, lambda vm: vm.cf != 0)
+def jle(vmachine):    _j(vmachine, lambda vm: vm.cf <= 0)
+
+def jan(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[REG_A]) < 0)
+def jaz(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[REG_A]) == 0)
+def jap(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[REG_A]) > 0)
+def jann(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[REG_A]) >= 0)
+def janz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[REG_A]) != 0)
+def janp(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[REG_A]) <= 0)
+
+def j1n(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[1]) < 0)
+def j1z(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[1]) == 0)
+def j1p(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[1]) > 0)
+def j1nn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[1]) >= 0)
+def j1nz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[1]) != 0)
+def j1np(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[1]) <= 0)
+
+def j2n(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[2]) < 0)
+def j2z(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[2]) == 0)
+def j2p(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[2]) > 0)
+def j2nn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[2]) >= 0)
+def j2nz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[2]) != 0)
+def j2np(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[2]) <= 0)
+
+def j3n(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[3]) < 0)
+def j3z(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[3]) == 0)
+def j3p(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[3]) > 0)
+def j3nn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[3]) >= 0)
+def j3nz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[3]) != 0)
+def j3np(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[3]) <= 0)
+
+def j4n(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[4]) < 0)
+def j4z(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[4]) == 0)
+def j4p(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[4]) > 0)
+def j4nn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[4]) >= 0)
+def j4nz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[4]) != 0)
+def j4np(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[4]) <= 0)
+
+def j5n(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[5]) < 0)
+def j5z(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[5]) == 0)
+def j5p(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[5]) > 0)
+def j5nn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[5]) >= 0)
+def j5nz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[5]) != 0)
+def j5np(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[5]) <= 0)
+
+def j6n(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[6]) < 0)
+def j6z(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[6]) == 0)
+def j6p(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[6]) > 0)
+def j6nn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[6]) >= 0)
+def j6nz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[6]) != 0)
+def j6np(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[6]) <= 0)
+
+def jxn(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[REG_X]) < 0)
+def jxz(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[REG_X]) == 0)
+def jxp(vmachine):    _j(vmachine, lambda vm: packed_int(vm.regs[REG_X]) > 0)
+def jxnn(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[REG_X]) >= 0)
+def jxnz(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[REG_X]) != 0)
+def jxnp(vmachine):   _j(vmachine, lambda vm: packed_int(vm.regs[REG_X]) <= 0)
@@ -3,23 +3,26 @@
 # ALL DONE
 
 from word_parser import *
+from packed_memory import *
 
 def _ld(vmachine, reg, sign = 1):
   vmachine["cycles"] += 2
 
   # src - can be cell with address [-1, 0, 0] =(2dec)= 0
-  src = vmachine[WordParser.get_full_addr(vmachine, check_mix_addr = True)]
+  src = vmachine.cells[WordParser.get_full_addr(vmachine, check_mix_addr = True)]
   # dst - rREG
   left, right = WordParser.get_field_spec(vmachine)
 
   # result will be loaded to reg
-  result = src[max(1, left):right]
-  result[0] = sign * (src[0] if left == 0 else +1)
+  result = get_field(src, 8*max(1, left) + right)
+  if sign * (packed_sign(src) if left == 0 else +1) < 0:
+    result |= SIGN_BIT
 
-  vmachine[reg] = result
-  if vmachine.clear_rI(reg):
-    # overflow, but nothing do (see Knuth)
-    pass
+  index = REG_INDEX[reg]
+  if 1 <= index <= 6:
+    # bytes 1..3 of rI are cleared, it's overflow, but nothing do (see Knuth)
+    result &= SIGN_BIT | (MAX_BYTE**2 - 1)
+  vmachine.set_register(index, result)
 
 def lda(vmachine):  _ld(vmachine, "A")
 def ld1(vmachine):  _ld(vmachine, "1")
@@ -4,6 +4,7 @@
 
 from word import *
 from word_parser import *
+from packed_memory import *
 
 def _add(vmachine, sign = 1):
   vmachine["cycles"] += 2
@@ -11,16 +12,14 @@ def _add(vmachine, sign = 1):
   addr = WordParser.get_full_addr(vmachine, check_mix_addr = True)
   left, right = WordParser.get_field_spec(vmachine)
 
-  result = int(vmachine["A"]) + sign * int(vmachine[addr:left:right])
+  ra = vmachine.regs[REG_A]
+  result = packed_int(ra) + sign * packed_int(get_field(vmachine.cells[addr], 8*left + right))
 
   if abs(result) >= MAX_BYTE**5:
     vmachine["of"] = True
 
   # "if result == 0 than we should save previous sign" - Knuth
-  sign_word = vmachine["A":0:0]
-  vmachine["A"] = result
-  if result == 0:
-    vmachine["A":0:0] = sign_word
+  vmachine.set_register(REG_A, pack(result) if result != 0 else ra & SIGN_BIT)
 
 
 def add(vmachine): _add(vmachine)
@@ -32,13 +31,15 @@ def mul(vmachine):
   addr = WordParser.get_full_addr(vmachine, check_mix_addr = True)
   left, right = WordParser.get_field_spec(vmachine)
 
+  src = vmachine.cells[addr]
+  ra = vmachine.regs[REG_A]
   # multiply unsigned words
-  result = int(vmachine["A":1:5]) * int(vmachine[addr:max(1, left):right])
+  result = (ra & MAGNITUDE) * get_field(src, 8*max(1, left) + right)
   # signs of rA and rX from Knuth
-  vmachine["A":0:0] = vmachine["X":0:0] = vmachine["A"][0] * vmachine[addr][0]
+  sign = (ra ^ src) & SIGN_BIT
 
-  vmachine["A":1:5] = result // MAX_BYTE**5
-  vmachine["X":1:5] = result % MAX_BYTE**5
+  vmachine.set_register(REG_A, sign | (result >> 30))
+  vmachine.set_register(REG_X, sign | (result & MAGNITUDE))
 
 
 def div(vmachine):
@@ -47,14 +48,14 @@ def div(vmachine):
   addr = WordParser.get_full_addr(vmachine, check_mix_addr = True)
   left, right = WordParser.get_field_spec(vmachine)
 
-  u_divisor = int(vmachine[addr:max(1, left):right])
-  divisor_sign = vmachine[addr][0] if left == 0 else 1
-  if u_divisor == 0 or int(vmachine["A":1:5]) >= u_divisor: # from Knuth book
+  src = vmachine.cells[addr]
+  ra = vmachine.regs[REG_A]
+  u_divisor = get_field(src, 8*max(1, left) + right)
+  divisor_sign = src & SIGN_BIT if left == 0 else 0
+  if u_divisor == 0 or ra & MAGNITUDE >= u_divisor: # from Knuth book
     vmachine["of"] = True
     return
-  u_dividend = int(vmachine["A":1:5]) * MAX_BYTE**5 + int(vmachine["X":1:5])
+  u_dividend = ((ra & MAGNITUDE) << 30) | (vmachine.regs[REG_X] & MAGNITUDE)
 
-  vmachine["X":0:0] = vmachine["A":0:0] # sign of rX is previous sign of rA
-  vmachine["A":0:0] = vmachine["A"][0] * divisor_sign # sign of rA - division sign
-  vmachine["X":1:5] = u_dividend % u_divisor
-  vmachine["A":1:5] = u_dividend // u_divisor
+  vmachine.set_register(REG_X, (ra & SIGN_BIT) | (u_dividend % u_divisor)) # sign of rX is previous sign of rA
+  vmachine.set_register(REG_A, ((ra ^ divisor_sign) & SIGN_BIT) | (u_dividend // u_divisor)) # sign of rA - division sign
@@ -1,10 +1,13 @@
 # nop (c_code = 0), hlt, num, char (c_code = 5), move (c_code = 7)
 
 # ALL DONE
-from functools import reduce
-
 from word import *
 from word_parser import *
+from packed_memory import *
+
+import sys, os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+import charset
 
 def nop(vmachine):
   vmachine["cycles"] += 1
@@ -18,22 +21,23 @@ def hlt(vmachine):
 def num(vmachine):
   vmachine["cycles"] += 10
 
-  # vmachine.rA.word_list[1:6] + vmachine.rX.word_list[1:6] - array of all bytes
-  # reduce - create string of all digits
-  # int - convert it to int
-  # % MB**10 - to avoid overflow
-  vmachine["A":1:5] = int(reduce(lambda x, y : x+str(y % 10), vmachine["A"].word_list[1:6] + vmachine["X"].word_list[1:6], "")) % MAX_BYTE**10
+  # all 10 bytes of rA and rX are digits (byte % 10), only 5 bytes of result are saved in rA
+  ra = vmachine.regs[REG_A]
+  ax = ((ra & MAGNITUDE) << 30) | (vmachine.regs[REG_X] & MAGNITUDE)
+  result = 0
+  for shift in range(54, -1, -6):
+    result = result * 10 + ((ax >> shift) & 63) % 10
+  vmachine.set_register(REG_A, (ra & SIGN_BIT) | (result & MAGNITUDE))
 
 def char(vmachine):
   vmachine["cycles"] += 10
 
-  # vmachine.rA[1:5] - num for convert
-  # str(num) - convert to string
-  # map(lambda x : int(x) + 30, s) - get list of mix-chars
-  seq = list(map(lambda x : int(x) + 30, str(int(vmachine["A":1:5]))))
-  seq = [30] * (10 - len(seq)) + seq
-  vmachine["A":1:5] = [+1] + seq[0:5] # +1 added like a sign to word
-  vmachine["X":1:5] = [+1] + seq[5:10] # +1 added like a sign to word
+  # rA[1:5] - num for convert (less than 10 digits)
+  # charset.encode - get codes of all 10 digits, signs aren't changed
+  ra, rx = vmachine.regs[REG_A], vmachine.regs[REG_X]
+  seq = charset.encode("%010i" % (ra & MAGNITUDE))
+  vmachine.set_register(REG_A, (ra & SIGN_BIT) | pack([+1] + list(seq[0:5])))
+  vmachine.set_register(REG_X, (rx & SIGN_BIT) | pack([+1] + list(seq[5:10])))
 
 def move(vmachine):
   # T = 1 + 2*F
@@ -43,23 +47,29 @@ def move(vmachine):
   if num == 0:
     return
   src = WordParser.get_full_addr(vmachine, check_mix_addr = True)
-  dst = int(vmachine["1"])
+  dst = packed_int(vmachine.regs[1])
 
-  if not vmachine.is_readable_set(set(range(  src, src + num  ))):
+  if not vmachine.is_readable_range(src, src + num - 1):
     raise MemReadLockedError( (src, src + num - 1) )
-  if not vmachine.is_writeable_set(set(range(  dst, dst + num  ))):
+  if not vmachine.is_writeable_range(dst, dst + num - 1):
     raise MemReadLockedError( (dst, dst + num - 1) )
 
   if dst < 0 or src < 0:
     raise InvalidMoveError( (num, src, dst) )
   # now all addresses would be greater than dst or src, so they are >= 0
-  try:
-    for i in range(num):
-      vmachine[dst] = vmachine[src+i]
-      dst += 1 # dst - like r1 always contains address of next destination word
-      vmachine["cycles"] += 2
-  except IndexError:
-    vmachine["1"] = dst # it's not written in Knuth book, but it's very logically,
-    raise InvalidMoveError( (num, src, int(vmachine["1"])) )
-  else:
-    vmachine["1"] = dst
+  # words are moved one by one (like in Knuth book) until some address is out of memory
+  cells = vmachine.cells
+  count = max(0, min(num, len(cells) - src, len(cells) - dst))
+  if count > 0:
+    if src < dst < src + count:
+      # dst overlaps end of src, so copied words are repeated with period dst - src
+      words = [cells[src + i % (dst - src)] for i in range(count)]
+    else:
+      words = cells[src : src + count]
+    vmachine.set_cells(dst, words)
+    vmachine["cycles"] += 2 * count
+  dst += count # dst - like r1 always contains address of next destination word
+  vmachine.set_register(1, pack(dst))
+  if count < num:
+    # it's not written in Knuth book, but it's very logically
+    raise InvalidMoveError( (num, src, dst) )
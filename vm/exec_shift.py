@@ -5,44 +5,48 @@
 from vm_errors import *
 from word import *
 from word_parser import *
+from packed_memory import *
 
 LEFT  = 0
 RIGHT = 1
 
-def _s(vmachine, src, dir, cycle = False):
+def _s(vmachine, src, length, dir, cycle = False):
+  """Shifts <length> bytes of unsigned int src by M bytes"""
   vmachine["cycles"] += 2
 
   assert(dir in (LEFT, RIGHT))
-  length = len(src)
   shift = WordParser.get_full_addr(vmachine)
   if shift < 0:
     raise NegativeShiftError(shift)
-  shift = shift % length if cycle else min(shift, length)
+  shift = 6 * (shift % length if cycle else min(shift, length))
+  bits = 6 * length
+  mask = (1 << bits) - 1
 
-  dst = [0] * length
   if dir == LEFT:
-    dst[0 : length-shift] = src[shift : length]
+    dst = (src << shift) & mask
     if cycle:
-      dst[length-shift : length] = src[0 : shift]
+      dst |= src >> (bits - shift)
   else:
-    dst[shift : length] = src[0 : length-shift]
+    dst = src >> shift
     if cycle:
-      dst[0 : shift] = src[length-shift : length]
+      dst |= (src << (bits - shift)) & mask
 
   return dst
 
 
 def _sa(vmachine, dir):
-  vmachine["A":1:5] = [+1] + _s(vmachine, vmachine["A"].word_list[1:6], dir) # +1 added like a sign to word
+  ra = vmachine.regs[REG_A]
+  vmachine.set_register(REG_A, (ra & SIGN_BIT) | _s(vmachine, ra & MAGNITUDE, 5, dir)) # sign isn't changed
 
 def sla(vmachine):    _sa(vmachine, LEFT)
 def sra(vmachine):    _sa(vmachine, RIGHT)
 
 
 def _sax(vmachine, dir, cycle = False):
-  res = _s(vmachine, vmachine["A"].word_list[1:6] + vmachine["X"].word_list[1:6], dir, cycle)
-  vmachine["A":1:5] = [+1] + res[0:5] # +1 added like a sign to word
-  vmachine["X":1:5] = [+1] + res[5:10] # +1 added like a sign to word
+  ra, rx = vmachine.regs[REG_A], vmachine.regs[REG_X]
+  res = _s(vmachine, ((ra & MAGNITUDE) << 30) | (rx & MAGNITUDE), 10, dir, cycle)
+  vmachine.set_register(REG_A, (ra & SIGN_BIT) | (res >> 30)) # signs aren't changed
+  vmachine.set_register(REG_X, (rx & SIGN_BIT) | (res & MAGNITUDE))
 
 def slax(vmachine):   _sax(vmachine, LEFT)
 def srax(vmachine):   _sax(vmachine, RIGHT)
@@ -3,11 +3,12 @@
 # ALL DONE
 
 from word_parser import *
+from packed_memory import *
 
 def _st(vmachine, reg):
   vmachine["cycles"] += 2
 
-  src = Word() if reg == "Z" else vmachine[reg]
+  src = 0 if reg == "Z" else vmachine.regs[REG_INDEX[reg]]
 
   # dst - vmachine[addr]
   addr = WordParser.get_full_addr(vmachine, check_mix_addr = True)
@@ -16,10 +17,8 @@ def _st(vmachine, reg):
  
   left, right = WordParser.get_field_spec(vmachine)
 
-  vmachine[addr:max(1, left):right] = src[1:5]
-
-  if left == 0:
-    vmachine[addr:0:0] = src[0]
+  # bytes max(1, L)..R get lowest bytes of register and sign is stored only if L = 0
+  vmachine.set_cell(addr, set_field(vmachine.cells[addr], 8*left + right, src))
 
 def sta(vmachine):  _st(vmachine, "A")
 def st1(vmachine):  _st(vmachine, "1")
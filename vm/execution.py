@@ -1,4 +1,3 @@
-
 from vm_errors import *
 
 import exec_all
@@ -7,26 +6,41 @@ import sys, os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
 from disasm import Disasm
 
+class Instruction:
+  """Decoded mix-word: handler, address, index, field and field specification"""
+  def __init__(self, word):
+    proc_name, self.addr, self.ind, self.field = Disasm.disasm(word)
+    self.sign = word[0]
+    if proc_name == "in":
+      proc_name = "in_" # it's done, because can't define function with name "in"
+    self.proc = exec_all.__dict__[proc_name] if proc_name is not None else None
+    self.io = proc_name in ("in_", "out", "ioc") # can make device busy
+    self.wait = proc_name in ("jbus", "in_", "out", "ioc") # jumps to itself while device is busy
+    self.fused = None # sequence which starts here (see fusion.py), False if there is no one
+
+    # (L:R) or None if field isn't correct field specification
+    left, right = self.field // 8, self.field % 8
+    self.field_spec = (left, right) if 0 <= left <= right <= 5 else None
+
 def execute(vmachine):
   # some common stuff
   if not vmachine.is_readable(vmachine.cur_addr):
     raise MemReadLockedError( (vmachine.cur_addr, vmachine.cur_addr) )
 
-  proc_name = Disasm.disasm(vmachine.get_cur_word())[0]
-  if proc_name == "in":
-    proc_name = "in_" # it's done, because can't define function with name "in"
+  proc = vmachine.get_cur_instr().proc
 
-  if proc_name is not None:
+  if proc is not None:
     vmachine.jump_to = None
-    before_cycles = vmachine["cycles"]
+    before_cycles = vmachine.cycles
 
-    exec_all.__dict__[proc_name](vmachine)
+    proc(vmachine)
 
-    if vmachine.jump_to is None:
-      vmachine["cur_addr"] += 1
+    next_addr = vmachine.cur_addr + 1 if vmachine.jump_to is None else vmachine.jump_to
+    if vmachine.cpu_hook is None:
+      vmachine.cur_addr = next_addr
     else:
-      vmachine["cur_addr"] = vmachine.jump_to
+      vmachine["cur_addr"] = next_addr
 
-    return vmachine["cycles"] - before_cycles
+    return vmachine.cycles - before_cycles
   else:
     raise UnknownInstructionError(tuple(vmachine.get_cur_word()))
@@ -0,0 +1,197 @@
+# superinstructions: common sequences of instructions executed by one handler (engine VMachine.FUSION)
+
+# Sequences:
+#   LDA x; ADD/SUB y; STA z
+#   INCr/DECr k; Jr[N|Z|P|NN|NZ|NP] label - the same register, jump without index
+#   CMPr x; JL/JE/JG/JGE/JNE/JLE label - jump without index
+# Sequence is searched once, when its first instruction is executed for the first time (Instruction.fused).
+# Handler checks everything that could raise error (addresses out of memory, locked cells, including cells
+# of sequence itself) and that words of sequence aren't changed before doing anything, and returns False if the sequence must be executed
+# by interpreter one by one, so errors are raised by the same instruction after the same changes.
+# Jump to the middle of sequence just executes instructions from there.
+
+# Handlers change only the final state (like translated blocks), so they are used only when cpu hook,
+# journal and profiler aren't set (memory hooks get the same events) and no breakpoint is inside sequence.
+
+import re
+
+from packed_memory import *
+
+_REG_JUMPS = {"n": lambda x: x < 0, "z": lambda x: x == 0, "p": lambda x: x > 0,
+              "nn": lambda x: x >= 0, "nz": lambda x: x != 0, "np": lambda x: x <= 0}
+_CF_JUMPS = {"jl": _REG_JUMPS["n"], "je": _REG_JUMPS["z"], "jg": _REG_JUMPS["p"],
+             "jge": _REG_JUMPS["nn"], "jne": _REG_JUMPS["nz"], "jle": _REG_JUMPS["np"]}
+
+class Fused:
+  """Sequence of instructions from start address"""
+  __slots__ = ("start", "instrs", "cycles", "inner", "func")
+
+  def __init__(self, start, instrs, cycles, func):
+    self.start = start
+    self.instrs = instrs
+    self.cycles = cycles # all instructions
+    self.inner = range(start + 1, start + len(instrs)) # breakpoints here stop fusion
+    self.func = func # func(vmachine) -> False if sequence must be executed by interpreter
+
+
+def _name(instr):
+  return instr.proc.__name__ if instr.proc is not None else ""
+
+def _full_addr(regs, instr):
+  """Like WordParser.get_full_addr() without checks, address can be out of memory"""
+  addr = instr.addr
+  if instr.ind != 0:
+    addr += packed_int(regs[instr.ind])
+  return Word.norm_2bytes(addr) if abs(addr) >= MAX_BYTE**2 else addr
+
+def _changed(vmachine, fused):
+  """Checks that instructions of sequence are the same (the first one is checked by VMachine)"""
+  cache = vmachine.instr_cache
+  for i in range(1, len(fused.instrs)):
+    if cache[fused.start + i] is not fused.instrs[i]:
+      cache[fused.start].fused = None # it will be searched again
+      return True
+  return False
+
+def _locked(vmachine, fused):
+  """Checks that cells of sequence can be read (IN can lock them before they are executed)"""
+  return not vmachine.is_readable_range(fused.start, fused.start + len(fused.instrs) - 1)
+
+def _lda_add_sta(vmachine, start, lda, add, sta):
+  left, right = lda.field_spec
+  lda_field = 8*max(1, left) + right
+  lda_signed = left == 0
+  add_field = 8*add.field_spec[0] + add.field_spec[1]
+  add_sign = 1 if _name(add) == "add" else -1
+  sta_field = 8*sta.field_spec[0] + sta.field_spec[1]
+  size = vmachine.MEMORY_SIZE
+
+  def func(vmachine):
+    if _changed(vmachine, fused) or _locked(vmachine, fused):
+      return False
+    regs = vmachine.regs
+    src = _full_addr(regs, lda)
+    arg = _full_addr(regs, add)
+    dst = _full_addr(regs, sta)
+    if not (0 <= src < size and 0 <= arg < size and 0 <= dst < size and vmachine.is_writeable(dst)):
+      return False
+    cells = vmachine.cells
+
+    # lda
+    ra = get_field(cells[src], lda_field)
+    if lda_signed:
+      ra |= cells[src] & SIGN_BIT
+    # add/sub
+    result = packed_int(ra) + add_sign * packed_int(get_field(cells[arg], add_field))
+    if abs(result) >= MAX_BYTE**5:
+      vmachine.of = True
+    ra = pack(result) if result != 0 else ra & SIGN_BIT
+    vmachine.set_register(REG_A, ra)
+    # sta
+    vmachine.set_cell(dst, set_field(cells[dst], sta_field, ra))
+
+    vmachine.cycles += 6
+    vmachine.cur_addr = start + 3
+    return True
+
+  fused = Fused(start, (lda, add, sta), 6, func)
+  return fused
+
+def _inc_jump(vmachine, start, inc, jump, index, sign, condition):
+  target = jump.addr
+
+  def func(vmachine):
+    if _changed(vmachine, fused) or _locked(vmachine, fused):
+      return False
+    regs = vmachine.regs
+
+    # inc/dec, like _linear_manipulation()
+    addr = inc.addr
+    if inc.ind != 0:
+      addr += packed_int(regs[inc.ind])
+    if abs(addr) >= MAX_BYTE**2:
+      addr = Word.norm_2bytes(addr)
+      vmachine.of = True
+    result = packed_int(regs[index]) + sign * addr
+    if result == 0:
+      packed = regs[index] & SIGN_BIT
+    else:
+      if abs(result) >= MAX_BYTE**2:
+        result = Word.norm_2bytes(result)
+        vmachine.of = True
+      packed = pack(result)
+    vmachine.set_register(index, packed)
+
+    # jump
+    vmachine.cycles += 2
+    if condition(packed_int(packed)):
+      vmachine.set_register(REG_J, set_field(regs[REG_J], 8*4 + 5, start + 2))
+      vmachine.cur_addr = target
+    else:
+      vmachine.cur_addr = start + 2
+    return True
+
+  fused = Fused(start, (inc, jump), 2, func)
+  return fused
+
+def _cmp_jump(vmachine, start, cmp, jump, index, condition):
+  field = 8*cmp.field_spec[0] + cmp.field_spec[1]
+  target = jump.addr
+  size = vmachine.MEMORY_SIZE
+
+  def func(vmachine):
+    if _changed(vmachine, fused) or _locked(vmachine, fused):
+      return False
+    regs = vmachine.regs
+    addr = _full_addr(regs, cmp)
+    if not (0 <= addr < size and vmachine.is_readable(addr)):
+      return False
+
+    # cmp
+    r = packed_int(get_field(regs[index], field))
+    a = packed_int(get_field(vmachine.cells[addr], field))
+    cf = vmachine.cf = (r > a) - (r < a)
+
+    # jump
+    vmachine.cycles += 3
+    if condition(cf):
+      vmachine.set_register(REG_J, set_field(regs[REG_J], 8*4 + 5, start + 2))
+      vmachine.cur_addr = target
+    else:
+      vmachine.cur_addr = start + 2
+    return True
+
+  fused = Fused(start, (cmp, jump), 3, func)
+  return fused
+
+
+def fuse(vmachine, start):
+  """Returns Fused for sequence from start address or False"""
+  size = vmachine.MEMORY_SIZE
+  if start + 1 >= size:
+    return False
+  first = vmachine.get_instr(start)
+  second = vmachine.get_instr(start + 1)
+  first_name, second_name = _name(first), _name(second)
+  if first.ind > 6 or second.ind > 6:
+    return False
+  # jumps of sequences have constant address
+  static_jump = second.ind == 0 and 0 <= second.addr < size
+
+  if first_name == "lda" and second_name in ("add", "sub") and start + 2 < size:
+    third = vmachine.get_instr(start + 2)
+    if _name(third) == "sta" and third.ind <= 6 and \
+       None not in (first.field_spec, second.field_spec, third.field_spec):
+      return _lda_add_sta(vmachine, start, first, second, third)
+
+  match = re.match(r"(inc|dec)([a1-6x])$", first_name)
+  jump = re.match(r"j([a1-6x])(n|z|p|nn|nz|np)$", second_name)
+  if match and jump and match.group(2) == jump.group(1) and static_jump:
+    return _inc_jump(vmachine, start, first, second, REG_INDEX[match.group(2).upper()],
+                     1 if match.group(1) == "inc" else -1, _REG_JUMPS[jump.group(2)])
+
+  match = re.match(r"cmp([a1-6x])$", first_name)
+  if match and second_name in _CF_JUMPS and first.field_spec is not None and static_jump:
+    return _cmp_jump(vmachine, start, first, second, REG_INDEX[match.group(1).upper()], _CF_JUMPS[second_name])
+
+  return False
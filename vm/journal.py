@@ -0,0 +1,103 @@
+# undo journal of virtual machine: old values of everything changed by every executed instruction
+
+# Journal is attached by VMachine.set_journal(), then every step() (and every instruction of run())
+# saves registers and triggers before execution, and set_cell(), set_cells(), lock_cells() and
+# refresh_devices() (and I/O instructions) save old memory cells, locks and device states when they are changed.
+# VMachine.step_back() and VMachine.run_back() undo saved instructions (hooks are called as usual).
+# Journal keeps only the last max_steps instructions and at most max_cells old memory cells,
+# the oldest instructions are forgotten.
+
+from collections import deque
+
+class Entry:
+  """Old values of one instruction"""
+  __slots__ = ("registers", "triggers", "devices", "cells", "locks")
+
+  def __init__(self, registers, triggers):
+    self.registers = registers # copy of vmachine.regs
+    self.triggers = triggers # cf, of, halted, cur_addr, cycles
+    self.devices = None # (deadlines of busy devices, number -> device.get_state())
+    self.cells = None # list of (first address, list of packed words)
+    self.locks = None # list of (mode, first address, bytes of flags)
+
+class Journal:
+  def __init__(self, max_steps = 100000, max_cells = 1000000):
+    self.max_steps = max_steps
+    self.max_cells = max_cells
+    self.entries = deque()
+    self.cells_count = 0 # old memory cells in all entries
+    self.entry = None # entry of executing instruction
+
+  def __len__(self):
+    return len(self.entries)
+
+  def clear(self):
+    self.entries.clear()
+    self.cells_count = 0
+    self.entry = None
+
+  def _forget(self):
+    entry = self.entries.popleft()
+    if entry.cells is not None:
+      self.cells_count -= sum(len(words) for first, words in entry.cells)
+
+  def begin(self, vmachine):
+    """Called before execution of instruction"""
+    if len(self.entries) >= self.max_steps:
+      self._forget()
+    self.entry = Entry(vmachine.regs[:],
+                       (vmachine.cf, vmachine.of, vmachine.halted, vmachine.cur_addr, vmachine.cycles))
+    self.entries.append(self.entry)
+
+  def cells(self, first, words):
+    """Old packed words of memory from first address"""
+    entry = self.entry
+    if entry is None:
+      return
+    if entry.cells is None:
+      entry.cells = []
+    entry.cells.append((first, words))
+    self.cells_count += len(words)
+    while self.cells_count > self.max_cells and len(self.entries) > 1:
+      self._forget()
+
+  def locks(self, mode, first, flags):
+    if self.entry is not None:
+      if self.entry.locks is None:
+        self.entry.locks = []
+      self.entry.locks.append((mode, first, flags))
+
+  def devices(self, vmachine):
+    """States of devices are saved only once, before the first change in instruction"""
+    if self.entry is not None and self.entry.devices is None:
+      self.entry.devices = (dict(vmachine.device_deadlines),
+                            dict((number, device.get_state()) for number, device in vmachine.devices.items()))
+
+  def undo(self, vmachine):
+    """Undoes the last instruction, returns False if journal is empty"""
+    if len(self.entries) == 0:
+      return False
+    entry = self.entries.pop()
+    self.entry = None
+    if entry.cells is not None:
+      for first, words in reversed(entry.cells):
+        vmachine.set_cells(first, words)
+        self.cells_count -= len(words)
+    if entry.locks is not None:
+      for mode, first, flags in reversed(entry.locks):
+        vmachine.set_lock_flags(mode, first, flags)
+    if entry.devices is not None:
+      deadlines, states = entry.devices
+      for number, state in states.items():
+        vmachine.devices[number].set_state(state)
+      vmachine.set_device_deadlines(deadlines)
+    for index, packed in enumerate(entry.registers):
+      if vmachine.regs[index] != packed:
+        vmachine.set_register(index, packed)
+    cf, of, halted, cur_addr, cycles = entry.triggers
+    vmachine["cf"] = cf
+    vmachine["of"] = of
+    vmachine["halted"] = halted
+    vmachine["cur_addr"] = cur_addr
+    vmachine["cycles"] = cycles
+    return True
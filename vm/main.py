@@ -1,4 +1,5 @@
 import sys
+from optparse import OptionParser
 from read_memory import *
 from virt_machine import *
 from vm_errors import *
@@ -11,15 +12,41 @@ def print_errors(errors):
   for error in errors:
     print_error(error[0], error[1])
 
+# units of tapes and disks, lock times (in cycles) of transfer of one block and of moving by one block
+TAPE_UNITS = range(0, 8)
+DISK_UNITS = range(8, 16)
+TAPE_TIMES = (100*2, 50)
+DISK_TIMES = (100*2, 10)
+
+def parse_units(values, units, kind):
+  """List of "UNIT:FILE" -> dict unit -> file name, returns None for invalid values"""
+  result = {}
+  for value in values:
+    unit, sep, file_name = value.partition(":")
+    if not unit.isdigit() or int(unit) not in units or sep == "" or file_name == "":
+      print("Invalid %s %s (UNIT:FILE is required, units %i..%i)" % (kind, value, units[0], units[-1]))
+      return None
+    result[int(unit)] = file_name
+  return result
+
 def main():
-  if len(sys.argv) != 2: # 1st - program name, 2nd - input filename
+  parser = OptionParser()
+  parser.set_usage("main.py [OPTIONS] program")
+  parser.add_option("-t", "--tape", dest = "tapes", action = "append", default = [], metavar = "UNIT:FILE",
+      help = "plug tape unit %i..%i kept in binary file (can be repeated)" % (TAPE_UNITS[0], TAPE_UNITS[-1]))
+  parser.add_option("-d", "--disk", dest = "disks", action = "append", default = [], metavar = "UNIT:FILE",
+      help = "plug disk unit %i..%i kept in binary file (can be repeated)" % (DISK_UNITS[0], DISK_UNITS[-1]))
+  (options, args) = parser.parse_args()
+  tapes = parse_units(options.tapes, TAPE_UNITS, "tape")
+  disks = parse_units(options.disks, DISK_UNITS, "disk")
+  if len(args) != 1 or tapes is None or disks is None:
     print(ERR_INVALID_ARGS[1])
     return ERR_INVALID_ARGS[0]
 
   try:
-    file_in = open(sys.argv[1], "r")
+    file_in = open(args[0], "r")
   except IOError as e:
-    print("%s (%s): %s" % (ERR_INVALID_INPUT_FILE[1], sys.argv[1], e.strerror))
+    print("%s (%s): %s" % (ERR_INVALID_INPUT_FILE[1], args[0], e.strerror))
     return ERR_INVALID_INPUT_FILE[0]
 
 
@@ -31,18 +58,32 @@ def main():
 
 
   vmachine = VMachine(memory, start_address)
+  vmachine.set_engine(VMachine.TRANSLATOR)
   out_file = open("printer.out", "w")
   in_file = open("terminal.in", "r")
   vmachine.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = out_file)) # printer
   vmachine.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = in_file)) # input terminal
+  block_devices = []
+  try:
+    for unit, file_name in sorted(tapes.items()):
+      block_devices.append(TapeDevice(*TAPE_TIMES, file_name = file_name))
+      vmachine.set_device(unit, block_devices[-1])
+    for unit, file_name in sorted(disks.items()):
+      block_devices.append(DiskDevice(*DISK_TIMES, file_name = file_name))
+      vmachine.set_device(unit, block_devices[-1])
+  except OSError as e:
+    print("%s (%s): %s" % (ERR_INVALID_INPUT_FILE[1], e.filename, e.strerror))
+    return ERR_INVALID_INPUT_FILE[0]
 
   try:
-    while not vmachine.halted:
-      vmachine.step()
+    vmachine.run()
   except VMError as error:
     print(ERR_VM_RUN[1])
     print_error(None, error)
     return ERR_VM_RUN[0]
+  finally:
+    for device in block_devices:
+      device.close()
 
   out_file.close()
   in_file.close()
@@ -0,0 +1,56 @@
+# locked memory cells (i/o devices lock memory while they are busy)
+
+class MemoryLocks:
+  """Set of locked addresses stored as bytearray of flags, ranges are inclusive: (first, last)"""
+  def __init__(self, size):
+    self.flags = bytearray(size)
+    self.count = 0 # number of locked cells
+
+  def _clip(self, first, last):
+    return max(first, 0), min(last, len(self.flags) - 1) + 1
+
+  def __contains__(self, addr):
+    return 0 <= addr < len(self.flags) and self.flags[addr] == 1
+
+  def any(self, first, last):
+    """True if at least one address from first..last is locked"""
+    if self.count == 0:
+      return False
+    first, end = self._clip(first, last)
+    return first < end and self.flags.find(1, first, end) != -1
+
+  def _fill(self, first, last, value):
+    first, end = self._clip(first, last)
+    if first < end:
+      old = self.flags[first:end].count(1)
+      self.flags[first:end] = bytes([value]) * (end - first)
+      self.count += value * (end - first) - old
+
+  def add(self, first, last):
+    self._fill(first, last, 1)
+
+  def remove(self, first, last):
+    self._fill(first, last, 0)
+
+  def cells(self):
+    """Returns set of locked addresses"""
+    if self.count == 0:
+      return set()
+    return set(addr for addr, flag in enumerate(self.flags) if flag)
+
+  def set_cells(self, cells):
+    """Replaces locked addresses with addresses from cells"""
+    self.flags[:] = bytearray(len(self.flags))
+    for addr in cells:
+      self.flags[addr] = 1
+    self.count = self.flags.count(1)
+
+  def get_flags(self, first, last):
+    """Returns (first, flags) of first..last addresses (clipped to memory) for set_flags()"""
+    first, end = self._clip(first, last)
+    return first, bytes(self.flags[first:end])
+
+  def set_flags(self, first, flags):
+    old = self.flags[first:first + len(flags)].count(1)
+    self.flags[first:first + len(flags)] = flags
+    self.count += flags.count(1) - old
@@ -0,0 +1,72 @@
+# packed mix-words and memory made of them
+
+# Packed word is one non-negative integer:
+#   bits 0..29 - bytes of word (5th byte is the lowest one)
+#   bit  30    - sign, it's set for negative words (so -0 is kept)
+
+from word import *
+
+# BYTE_BITS, SIGN_BIT, MAGNITUDE and FIELDS (shift and mask of field) are defined in word.py
+
+# registers of VMachine are packed words too, they are kept in list in this order
+# (the same as in codes of LD*, ST*, CMP*: A, I1..I6, X), rJ is the last one
+REG_NAMES = "A 1 2 3 4 5 6 X J".split()
+REG_INDEX = dict((name, index) for index, name in enumerate(REG_NAMES))
+REG_A = 0
+REG_X = 7
+REG_J = 8
+
+def pack(obj):
+  """Word, word list or int -> packed word (int is truncated like in Word)"""
+  if isinstance(obj, int):
+    return ((-obj & MAGNITUDE) | SIGN_BIT) if obj < 0 else (obj & MAGNITUDE)
+  if isinstance(obj, Word):
+    return obj.packed
+  return Word.pack_list(obj)
+
+def unpack(packed):
+  """Packed word -> Word (shared read-only word for frequent values, see word.shared_word),
+     only for internal use and hooks, VMachine and PackedMemory return copies"""
+  return shared_word(packed)
+
+def packed_int(packed):
+  magnitude = packed & MAGNITUDE
+  return -magnitude if packed & SIGN_BIT else magnitude
+
+def packed_sign(packed):
+  return -1 if packed & SIGN_BIT else +1
+
+def get_field(packed, field):
+  """Returns field (8*L + R) of packed word as packed word, like Word[L:R]"""
+  shift, mask = FIELDS[field]
+  result = (packed >> shift) & mask
+  return (result | (packed & SIGN_BIT)) if field < 8 else result
+
+def set_field(packed, field, value):
+  """Puts lowest bytes of packed value (and sign if L = 0) to field (8*L + R) of packed word, like Word[L:R] = value"""
+  shift, mask = FIELDS[field]
+  result = (packed & ~(mask << shift)) | ((value & mask) << shift)
+  return ((result & MAGNITUDE) | (value & SIGN_BIT)) if field < 8 else result
+
+
+class PackedMemory:
+  """Mix memory as list of packed words, works with Word objects for compatibility"""
+  def __init__(self, size):
+    self.cells = [0] * size
+
+  def __len__(self):
+    return len(self.cells)
+
+  def __getitem__(self, addr):
+    """Copy of cell, it can be changed by caller"""
+    return Word.from_packed(self.cells[addr])
+
+  def __setitem__(self, addr, word):
+    self.cells[addr] = pack(word)
+
+  def fill(self, words):
+    """Replaces all memory with words from list (of Word objects or word lists)"""
+    self.cells[:] = [pack(word) for word in words]
+
+  def clear(self):
+    self.cells[:] = [0] * len(self.cells)
@@ -0,0 +1,126 @@
+# profiler.py
+
+# Profiler of mix programs: how many times every address was executed, how many cycles
+# were spent there and how much (python) time was spent in every instruction handler.
+# It's attached by VMachine.set_profiler(), programs are executed by interpreter then.
+
+# As a program:
+#   profiler.py [-n N] program.mix
+# assembles and runs program (devices are the same as in main.py) and prints
+# frequency table (listing with counts and cycles), top N addresses and handlers.
+
+import sys, os, io
+from time import perf_counter
+
+from execution import execute
+from virt_machine import VMachine
+
+class Profiler:
+  def __init__(self, memory_size = VMachine.MEMORY_SIZE):
+    self.counts = [0] * memory_size # executions of every address
+    self.cycles = [0] * memory_size # cycles spent by instructions from every address
+    self.handlers = {} # handler name -> [calls, seconds]
+
+  def execute(self, vmachine):
+    """The same as execution.execute, but counts everything"""
+    addr = vmachine.cur_addr
+    proc = vmachine.get_instr(addr).proc # instruction can change itself
+    start = perf_counter()
+    cycles = execute(vmachine)
+    elapsed = perf_counter() - start
+
+    self.counts[addr] += 1
+    self.cycles[addr] += cycles
+    name = proc.__name__
+    handler = self.handlers.get(name)
+    if handler is None:
+      handler = self.handlers[name] = [0, 0.0]
+    handler[0] += 1
+    handler[1] += elapsed
+    return cycles
+
+  def total_cycles(self):
+    return sum(self.cycles)
+
+  def top(self, n = 10):
+    """Returns list of (address, count, cycles) of n addresses with the most cycles"""
+    used = [(addr, self.counts[addr], self.cycles[addr]) for addr in range(len(self.counts)) if self.counts[addr] > 0]
+    used.sort(key = lambda item: (-item[2], -item[1], item[0]))
+    return used[:n]
+
+  def top_report(self, n = 10):
+    total = max(self.total_cycles(), 1)
+    lines = ["%4s | %10s | %10s | %6s" % ("ADDR", "COUNT", "CYCLES", "%")]
+    for addr, count, cycles in self.top(n):
+      lines.append("%4i | %10i | %10i | %6.2f" % (addr, count, cycles, 100.0 * cycles / total))
+    return "\n".join(lines)
+
+  def frequency_table(self, listing):
+    """Listing (assembler/listing.py) with execution count and cycles of every line (like in Knuth's books)"""
+    lines = []
+    for listing_line in listing.lines:
+      addr = listing_line.addr
+      if addr is not None and 0 <= addr < len(self.counts) and self.counts[addr] > 0:
+        lines.append("%4i | %10i | %10i | %s" % (addr, self.counts[addr], self.cycles[addr], listing_line.line))
+      elif addr is not None:
+        lines.append("%4i | %10s | %10s | %s" % (addr, "", "", listing_line.line))
+      else:
+        lines.append("%4s | %10s | %10s | %s" % ("", "", "", listing_line.line))
+    return "\n".join(lines)
+
+  def handler_report(self):
+    """Python time of every instruction handler, slowest first"""
+    lines = ["%-8s | %10s | %10s | %10s" % ("HANDLER", "CALLS", "SECONDS", "USEC/CALL")]
+    for name, (calls, seconds) in sorted(self.handlers.items(), key = lambda item: -item[1][1]):
+      lines.append("%-8s | %10i | %10.4f | %10.2f" % (name, calls, seconds, 1e6 * seconds / calls))
+    return "\n".join(lines)
+
+
+def main():
+  from optparse import OptionParser
+  from vm_errors import VMError
+  from device import FileDevice
+  sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'assembler'))
+  from asm_cache import assemble, default_cache
+
+  parser = OptionParser()
+  parser.set_usage("profiler.py [OPTIONS] program.mix")
+  parser.add_option("-n", "--top", dest = "top", type = "int", default = 10, help = "number of hot addresses (default 10)")
+  (options, args) = parser.parse_args()
+  if len(args) != 1:
+    parser.print_usage()
+    return 1
+
+  with open(args[0], "r") as f:
+    src_lines = f.readlines()
+  syntax_errors, errors, assembled = assemble(src_lines, default_cache())
+  if len(syntax_errors + errors) > 0:
+    for error in syntax_errors + errors:
+      print("%04i: %s" % (error[0], error[1]))
+    return 1
+  listing = assembled.listing(src_lines)
+
+  vmachine = VMachine(assembled.memory, assembled.start_address)
+  profiler = Profiler()
+  vmachine.set_profiler(profiler)
+  out_file = open("printer.out", "w")
+  in_file = open("terminal.in", "r") if os.path.exists("terminal.in") else io.StringIO()
+  vmachine.set_device(18, FileDevice(mode = "w", block_size = 24 * 5, lock_time = 24*2, file_object = out_file)) # printer
+  vmachine.set_device(19, FileDevice(mode = "r", block_size = 14 * 5, lock_time = 14*2, file_object = in_file)) # input terminal
+  try:
+    vmachine.run()
+  except VMError as error:
+    print("%s: %s\n" % (error.__class__.__name__, error))
+  out_file.close()
+  in_file.close()
+
+  print(profiler.frequency_table(listing))
+  print("\nTotal: %i cycles\n" % vmachine.cycles)
+  print(profiler.top_report(options.top))
+  print("")
+  print(profiler.handler_report())
+  return 0
+
+# if we executing module
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,110 @@
+# snapshot of the whole virtual machine state in compact binary format
+
+# Format (little-endian):
+#   header    - "MIXS", version (byte), memory size (2 bytes)
+#   cpu       - rA, rX, rI1..rI6, rJ as packed words (4 bytes each), cf, of, halted,
+#               cur_addr (4 bytes), cycles (8 bytes)
+#   memory    - packed words (4 bytes each, only 31 bits are used)
+#   locks     - for W_LOCKED and RW_LOCKED: number of ranges (2 bytes) and (first, last) of every range
+#   devices   - number of devices (byte), for every device: its number, length of its state and state
+#               (device.get_state() - list of ints, 8 bytes each)
+# Files of devices aren't saved, only their positions, so the same devices must be plugged before restore.
+
+import struct
+
+from packed_memory import SIGN_BIT, MAGNITUDE, REG_INDEX
+
+MAGIC = b"MIXS"
+VERSION = 2
+
+REGISTERS = "A X 1 2 3 4 5 6 J".split()
+
+HEADER = struct.Struct("<4sBH")
+CPU = struct.Struct("<9IbBBiq")
+COUNT = struct.Struct("<H")
+DEVICE = struct.Struct("<BB")
+
+def lock_ranges(locks):
+  """Returns list of (first, last) of locked ranges"""
+  flags = locks.flags
+  ranges = []
+  first = flags.find(1) if locks.count > 0 else -1
+  while first != -1:
+    end = flags.find(0, first)
+    if end == -1:
+      end = len(flags)
+    ranges.append((first, end - 1))
+    first = flags.find(1, end)
+  return ranges
+
+def make_snapshot(vmachine):
+  """Returns bytes with state of vmachine"""
+  vmachine.sync_devices()
+  size = len(vmachine.cells)
+  parts = [
+    HEADER.pack(MAGIC, VERSION, size),
+    CPU.pack(*([vmachine.regs[REG_INDEX[reg]] for reg in REGISTERS] +
+              [vmachine.cf, vmachine.of, vmachine.halted, vmachine.cur_addr, vmachine.cycles])),
+    struct.pack("<%iI" % size, *vmachine.cells)
+  ]
+  for locks in vmachine.locks:
+    ranges = lock_ranges(locks)
+    parts.append(COUNT.pack(len(ranges)))
+    parts.append(struct.pack("<%iH" % (2 * len(ranges)), *[addr for lock_range in ranges for addr in lock_range]))
+  parts.append(struct.pack("<B", len(vmachine.devices)))
+  for number, device in sorted(vmachine.devices.items()):
+    state = device.get_state()
+    parts.append(DEVICE.pack(number, len(state)))
+    parts.append(struct.pack("<%iq" % len(state), *state))
+  return b"".join(parts)
+
+def restore_snapshot(vmachine, data):
+  """Replaces state of vmachine with state from snapshot (raises ValueError if it's broken), hooks aren't called"""
+  try:
+    magic, version, size = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or size != len(vmachine.cells):
+      raise ValueError("incompatible snapshot")
+    offset = HEADER.size
+    cpu = CPU.unpack_from(data, offset)
+    offset += CPU.size
+    cells = struct.unpack_from("<%iI" % size, data, offset)
+    offset += 4 * size
+    lock_ranges = []
+    for _ in vmachine.locks:
+      count, = COUNT.unpack_from(data, offset)
+      offset += COUNT.size
+      addrs = struct.unpack_from("<%iH" % (2 * count), data, offset)
+      offset += 4 * count
+      lock_ranges.append(list(zip(addrs[0::2], addrs[1::2])))
+    count, = struct.unpack_from("<B", data, offset)
+    offset += 1
+    states = {}
+    for _ in range(count):
+      number, length = DEVICE.unpack_from(data, offset)
+      offset += DEVICE.size
+      states[number] = struct.unpack_from("<%iq" % length, data, offset)
+      offset += 8 * length
+  except struct.error as e:
+    raise ValueError("broken snapshot: %s" % e)
+  if offset != len(data):
+    raise ValueError("broken snapshot: %i extra bytes" % (len(data) - offset))
+  for number in states:
+    if number not in vmachine.devices:
+      raise ValueError("device %i isn't plugged" % number)
+
+  for reg, packed in zip(REGISTERS, cpu):
+    vmachine.regs[REG_INDEX[reg]] = packed & (SIGN_BIT | MAGNITUDE)
+  vmachine.cf, of, halted, vmachine.cur_addr, vmachine.cycles = cpu[len(REGISTERS):]
+  vmachine.of = bool(of)
+  vmachine.halted = bool(halted)
+  vmachine.cells[:] = cells
+  vmachine.instr_cache[:] = [None] * size
+  vmachine.block_cache.clear()
+  for locks, ranges in zip(vmachine.locks, lock_ranges):
+    locks.remove(0, size - 1)
+    for first, last in ranges:
+      locks.add(first, last)
+  for number, state in states.items():
+    vmachine.devices[number].set_state(state)
+  vmachine.set_device_deadlines(dict((number, vmachine.cycles + device.time_left)
+                                     for number, device in vmachine.devices.items() if device.busy))
@@ -0,0 +1,439 @@
+# translation of mix code to python functions by basic blocks
+
+# Block is a straight sequence of instructions, it ends with jump (jump is included in block) or before
+# instruction which isn't translated (hlt, move, i/o, jbus, jred, invalid instructions).
+# Block function keeps registers as packed words in local variables and adds cycles of all executed
+# instructions at exit. If some check fails (address isn't in memory, negative shift, address overflow)
+# block exits before that instruction and returns True, so it will be executed by the interpreter
+# (which raises the same error or handles rare case).
+
+# Blocks are used only when nobody watches every step: no hooks, no busy devices, no locked cells.
+
+import re
+
+from packed_memory import *
+
+MAX_BLOCK_SIZE = 64
+
+REG_VARS = {"A": "ra", "X": "rx", "J": "rj", "1": "r1", "2": "r2", "3": "r3", "4": "r4", "5": "r5", "6": "r6"}
+
+SIGN = SIGN_BIT
+MAG = MAGNITUDE
+AX_MAG = (1 << 60) - 1
+
+def _signed(var):
+  """Python expression - integer value of packed word in var"""
+  return "(-(%s & %d) if %s & %d else %s)" % (var, MAG, var, SIGN, var)
+
+def _cell_field(dst, cell, field):
+  """Lines which put signed int value of field (8*L + R) of packed cell to dst"""
+  shift, mask = FIELDS[field]
+  lines = ["%s = (%s >> %d) & %d" % (dst, cell, shift, mask)]
+  if field < 8:
+    lines.append("if %s & %d: %s = -%s" % (cell, SIGN, dst, dst))
+  return lines
+
+
+class Block:
+  """Translated block of instructions in start..end addresses"""
+  def __init__(self, start, end, size, cycles, func):
+    self.start = start
+    self.end = end
+    self.size = size # number of instructions, 0 if the first one can't be translated
+    self.cycles = cycles # cycles of full execution of block
+    self.func = func # func(vmachine) -> True if the next instruction must be executed by interpreter
+    self.valid = True
+
+
+class _Emitter:
+  """Generates source of block function"""
+  def __init__(self, memory_size):
+    self.memory_size = memory_size
+    self.lines = []
+    self.depth = 0
+    self.used = set() # local variables loaded at entry
+    self.changed = set() # local variables written back at exit
+    self.cycles = 0 # cycles of instructions translated before current one
+    self.addr = None # address of current instruction
+
+  def line(self, text):
+    self.lines.append("  " * (self.depth + 2) + text)
+
+  def read(self, var):
+    self.used.add(var)
+    return var
+
+  def write(self, var):
+    self.used.add(var)
+    self.changed.add(var)
+    return var
+
+  def exit(self, next_addr, cycles, bail = False):
+    self.line("nxt, cyc, bail = %s, %d, %s" % (next_addr, cycles, bail))
+    self.line("break")
+
+  def bail_if(self, condition):
+    """Exits before current instruction if condition is true"""
+    self.line("if %s:" % condition)
+    self.depth += 1
+    self.exit(self.addr, self.cycles, True)
+    self.depth -= 1
+
+  def address(self, instr, check):
+    """Emits full address computation, returns its expression or None if instruction can't be translated
+
+    check - "mix" for memory address, "shift" for non-negative, "index" for address without overflow"""
+    if instr.ind > 6:
+      return None
+    if instr.ind == 0:
+      addr = instr.addr
+      if (check == "mix" and not 0 <= addr < self.memory_size) or (check == "shift" and addr < 0):
+        return None
+      return str(addr)
+    self.line("m = %d + %s" % (instr.addr, _signed(self.read(REG_VARS[str(instr.ind)]))))
+    if check == "mix":
+      self.bail_if("not 0 <= m < %d" % self.memory_size)
+    elif check == "shift":
+      self.bail_if("not 0 <= m < %d" % MAX_BYTE**2)
+    else:
+      self.bail_if("not %d < m < %d" % (-MAX_BYTE**2, MAX_BYTE**2))
+    return "m"
+
+  def source(self):
+    prologue = ["def block(vm):", "  cells = vm.cells"]
+    for var in sorted(self.used):
+      if var in ("cf", "of"):
+        prologue.append("  %s = vm.%s" % (var, var))
+      else:
+        prologue.append("  %s = vm.regs[%d]" % (var, REG_INDEX[var[1].upper()]))
+    prologue.append("  while True:")
+    epilogue = []
+    for var in sorted(self.changed):
+      if var in ("cf", "of"):
+        epilogue.append("  vm.%s = %s" % (var, var))
+      else:
+        epilogue.append("  vm.regs[%d] = %s" % (REG_INDEX[var[1].upper()], var))
+    epilogue += ["  vm.cur_addr = nxt", "  vm.cycles += cyc", "  return bail"]
+    return "\n".join(prologue + self.lines + epilogue) + "\n"
+
+
+#---------------- emitters: emit(e, instr, *args) -> (cycles, ends_block) or None if can't be translated
+
+def _emit_nop(e, instr):
+  return 1, False
+
+def _emit_ld(e, instr, reg, sign):
+  if instr.field_spec is None:
+    return None
+  left, right = instr.field_spec
+  m = e.address(instr, "mix")
+  if m is None:
+    return None
+  dst = e.write(REG_VARS[reg])
+  shift, mask = FIELDS[8*max(1, left) + right]
+  e.line("c = cells[%s]" % m)
+  value = "((c >> %d) & %d)" % (shift, mask)
+  if left == 0:
+    value += (" | (c & %d)" % SIGN) if sign > 0 else (" | ((c & %d) ^ %d)" % (SIGN, SIGN))
+  elif sign < 0:
+    value += " | %d" % SIGN
+  if reg in "123456":
+    # clear_rI
+    value = "(%s) & %d" % (value, SIGN | (MAX_BYTE**2 - 1))
+  e.line("%s = %s" % (dst, value))
+  return 2, False
+
+def _emit_st(e, instr, reg):
+  if instr.field_spec is None:
+    return None
+  left, right = instr.field_spec
+  m = e.address(instr, "mix")
+  if m is None:
+    return None
+  src = "0" if reg == "Z" else e.read(REG_VARS[reg])
+  shift, mask = FIELDS[8*left + right]
+  e.line("c = cells[%s]" % m)
+  e.line("n = (c & %d) | ((%s & %d) << %d)" % ((SIGN | MAG) & ~(mask << shift), src, mask, shift))
+  if left == 0:
+    e.line("n = (n & %d) | (%s & %d)" % (MAG, src, SIGN))
+  e.line("if n != c:")
+  e.depth += 1
+  e.line("cells[%s] = n" % m)
+  e.line("vm.instr_cache[%s] = None" % m)
+  e.line("if vm.code_marks[%s]:" % m)
+  e.depth += 1
+  e.line("vm.block_cache.invalidate(%s)" % m)
+  e.line("if not blk.valid:")
+  e.depth += 1
+  # this block was changed, next instructions must be translated again
+  e.exit(e.addr + 1, e.cycles + 2)
+  e.depth -= 3
+  return 2, False
+
+def _emit_add(e, instr, sign):
+  if instr.field_spec is None:
+    return None
+  left, right = instr.field_spec
+  m = e.address(instr, "mix")
+  if m is None:
+    return None
+  ra = e.write("ra")
+  e.line("c = cells[%s]" % m)
+  for line in _cell_field("v", "c", 8*left + right):
+    e.line(line)
+  e.line("res = %s %s v" % (_signed(ra), "+" if sign > 0 else "-"))
+  e.line("if not %d < res < %d: of = True" % (-MAX_BYTE**5, MAX_BYTE**5))
+  e.write("of")
+  e.line("if res == 0: ra &= %d" % SIGN) # sign is saved
+  e.line("elif res < 0: ra = (-res & %d) | %d" % (MAG, SIGN))
+  e.line("else: ra = res & %d" % MAG)
+  return 2, False
+
+def _emit_mul(e, instr):
+  if instr.field_spec is None:
+    return None
+  left, right = instr.field_spec
+  m = e.address(instr, "mix")
+  if m is None:
+    return None
+  shift, mask = FIELDS[8*max(1, left) + right]
+  e.write("ra")
+  e.write("rx")
+  e.line("c = cells[%s]" % m)
+  e.line("p = (ra & %d) * ((c >> %d) & %d)" % (MAG, shift, mask))
+  e.line("s = (ra ^ c) & %d" % SIGN)
+  e.line("ra = (p >> 30) | s")
+  e.line("rx = (p & %d) | s" % MAG)
+  return 10, False
+
+def _emit_div(e, instr):
+  if instr.field_spec is None:
+    return None
+  left, right = instr.field_spec
+  m = e.address(instr, "mix")
+  if m is None:
+    return None
+  shift, mask = FIELDS[8*max(1, left) + right]
+  e.write("ra")
+  e.write("rx")
+  e.write("of")
+  e.line("c = cells[%s]" % m)
+  e.line("d = (c >> %d) & %d" % (shift, mask))
+  e.line("if d == 0 or ra & %d >= d:" % MAG)
+  e.line("  of = True")
+  e.line("else:")
+  e.line("  q = ((ra & %d) << 30) | (rx & %d)" % (MAG, MAG))
+  e.line("  rx = (q %% d) | (ra & %d)" % SIGN)
+  e.line("  ra = (q // d) | (%s & %d)" % ("(ra ^ c)" if left == 0 else "ra", SIGN))
+  return 12, False
+
+def _emit_lin(e, instr, reg, sign, inc_action):
+  m = e.address(instr, "index")
+  if m is None:
+    return None
+  r = e.write(REG_VARS[reg])
+  e.write("of")
+  e.line("res = %s%s%s" % (_signed(r) if inc_action else "", "+" if sign > 0 else "-", m))
+  e.line("if res == 0:")
+  if inc_action:
+    e.line("  %s &= %d" % (r, SIGN))
+  else:
+    e.line("  %s = %d" % (r, SIGN if sign * instr.sign < 0 else 0))
+  e.line("elif res > 0:")
+  e.line("  if res >= %d: res %%= %d; of = True" % (MAX_BYTE**2, MAX_BYTE**2))
+  e.line("  %s = res" % r)
+  e.line("else:")
+  e.line("  if res <= %d: res = -(-res %% %d); of = True" % (-MAX_BYTE**2, MAX_BYTE**2))
+  e.line("  %s = (-res | %d) if res else 0" % (r, SIGN))
+  return 1, False
+
+def _emit_cmp(e, instr, reg):
+  if instr.field_spec is None:
+    return None
+  left, right = instr.field_spec
+  m = e.address(instr, "mix")
+  if m is None:
+    return None
+  for line in _cell_field("x", e.read(REG_VARS[reg]), 8*left + right):
+    e.line(line)
+  e.line("c = cells[%s]" % m)
+  for line in _cell_field("y", "c", 8*left + right):
+    e.line(line)
+  e.line("%s = (x > y) - (x < y)" % e.write("cf"))
+  return 2, False
+
+def _emit_jump(e, instr, condition, save_j = True, reset_of = False):
+  if instr.ind > 6 or (instr.ind == 0 and not 0 <= instr.addr < e.memory_size):
+    return None
+  e.line("if %s:" % condition)
+  e.depth += 1
+  m = e.address(instr, "mix")
+  if reset_of:
+    e.line("%s = False" % e.write("of"))
+  if save_j:
+    rj = e.write("rj")
+    e.line("%s = (%s & %d) | %d" % (rj, rj, (SIGN | MAG) & ~(MAX_BYTE**2 - 1), (e.addr + 1) & (MAX_BYTE**2 - 1)))
+  e.exit(m, e.cycles + 1)
+  e.depth -= 1
+  return 1, True
+
+def _emit_shift(e, instr, name):
+  m = e.address(instr, "shift")
+  if m is None:
+    return None
+  ra = e.write("ra")
+  if name in ("sla", "sra"):
+    e.line("n = 6 * min(%s, 5)" % m)
+    if name == "sla":
+      e.line("ra = (ra & %d) | (((ra & %d) << n) & %d)" % (SIGN, MAG, MAG))
+    else:
+      e.line("ra = (ra & %d) | ((ra & %d) >> n)" % (SIGN, MAG))
+    return 2, False
+  rx = e.write("rx")
+  e.line("ax = ((ra & %d) << 30) | (rx & %d)" % (MAG, MAG))
+  if name == "slax":
+    e.line("ax = (ax << 6 * min(%s, 10)) & %d" % (m, AX_MAG))
+  elif name == "srax":
+    e.line("ax >>= 6 * min(%s, 10)" % m)
+  else:
+    e.line("n = 6 * (%s %% 10)" % m)
+    if name == "slc":
+      e.line("ax = ((ax << n) | (ax >> (60 - n))) & %d" % AX_MAG)
+    else:
+      e.line("ax = ((ax >> n) | (ax << (60 - n))) & %d" % AX_MAG)
+  e.line("ra = (ra & %d) | (ax >> 30)" % SIGN)
+  e.line("rx = (rx & %d) | (ax & %d)" % (SIGN, MAG))
+  return 2, False
+
+def _emit_num(e, instr):
+  e.write("ra")
+  e.read("rx")
+  e.line("ax = ((ra & %d) << 30) | (rx & %d)" % (MAG, MAG))
+  e.line("n = 0")
+  e.line("for sh in range(54, -1, -6): n = n * 10 + ((ax >> sh) & 63) % 10")
+  e.line("ra = (ra & %d) | (n & %d)" % (SIGN, MAG))
+  return 10, False
+
+def _emit_char(e, instr):
+  e.write("ra")
+  e.write("rx")
+  e.line("d = [ord(ch) - 18 for ch in '%%010d' %% (ra & %d)]" % MAG) # '0' -> 30
+  e.line("ra = (ra & %d) | (d[0] << 24) | (d[1] << 18) | (d[2] << 12) | (d[3] << 6) | d[4]" % SIGN)
+  e.line("rx = (rx & %d) | (d[5] << 24) | (d[6] << 18) | (d[7] << 12) | (d[8] << 6) | d[9]" % SIGN)
+  return 10, False
+
+_CF_JUMPS = {"jl": "cf < 0", "je": "cf == 0", "jg": "cf > 0", "jge": "cf >= 0", "jne": "cf != 0", "jle": "cf <= 0"}
+_REG_JUMPS = {"n": "< 0", "z": "== 0", "p": "> 0", "nn": ">= 0", "nz": "!= 0", "np": "<= 0"}
+
+def _emitter(e, name, instr):
+  """Calls emitter for instruction name, returns the same as emitter"""
+  if name == "nop":
+    return _emit_nop(e, instr)
+  if name in ("add", "sub"):
+    return _emit_add(e, instr, 1 if name == "add" else -1)
+  if name == "mul":
+    return _emit_mul(e, instr)
+  if name == "div":
+    return _emit_div(e, instr)
+  if name == "num":
+    return _emit_num(e, instr)
+  if name == "char":
+    return _emit_char(e, instr)
+  if name in ("sla", "sra", "slax", "srax", "slc", "src"):
+    return _emit_shift(e, instr, name)
+  if name in ("jmp", "jsj"):
+    return _emit_jump(e, instr, "True", save_j = name == "jmp")
+  if name == "jov":
+    return _emit_jump(e, instr, e.read("of"), reset_of = True)
+  if name == "jnov":
+    return _emit_jump(e, instr, "not " + e.read("of"))
+  if name in _CF_JUMPS:
+    e.read("cf")
+    return _emit_jump(e, instr, _CF_JUMPS[name])
+  match = re.match(r"j([a1-6x])(n|z|p|nn|nz|np)$", name)
+  if match:
+    return _emit_jump(e, instr, "%s %s" % (_signed(e.read(REG_VARS[match.group(1).upper()])), _REG_JUMPS[match.group(2)]))
+  match = re.match(r"ld([a1-6x])(n?)$", name)
+  if match:
+    return _emit_ld(e, instr, match.group(1).upper(), -1 if match.group(2) else 1)
+  match = re.match(r"st([a1-6xjz])$", name)
+  if match:
+    return _emit_st(e, instr, match.group(1).upper())
+  match = re.match(r"(ent|enn|inc|dec)([a1-6x])$", name)
+  if match:
+    action = match.group(1)
+    return _emit_lin(e, instr, match.group(2).upper(), 1 if action in ("ent", "inc") else -1, int(action in ("inc", "dec")))
+  match = re.match(r"cmp([a1-6x])$", name)
+  if match:
+    return _emit_cmp(e, instr, match.group(1).upper())
+  return None
+
+
+def translate(vmachine, start):
+  """Translates block which starts from start address"""
+  e = _Emitter(vmachine.MEMORY_SIZE)
+  addr = start
+  size = 0
+  ends_block = False
+  volatile = vmachine.block_cache.volatile
+  while addr < vmachine.MEMORY_SIZE and size < MAX_BLOCK_SIZE and not volatile[addr]:
+    instr = vmachine.get_instr(addr)
+    if instr.proc is None:
+      break
+    e.addr = addr
+    lines, depth, used, changed = len(e.lines), e.depth, set(e.used), set(e.changed)
+    result = _emitter(e, instr.proc.__name__, instr)
+    if result is None:
+      # rollback
+      del e.lines[lines:]
+      e.depth, e.used, e.changed = depth, used, changed
+      break
+    cycles, ends_block = result
+    e.cycles += cycles
+    size += 1
+    addr += 1
+    if ends_block:
+      break
+  # end of block (or jump which isn't done)
+  e.exit(addr, e.cycles)
+  end = max(start, addr - 1)
+
+  namespace = {"pack": pack, "unpack": unpack}
+  exec(compile(e.source(), "<block %i..%i>" % (start, end), "exec"), namespace)
+  block = Block(start, end, size, e.cycles, namespace["block"])
+  namespace["blk"] = block
+  return block
+
+
+class BlockCache:
+  """Translated blocks of vmachine memory"""
+  def __init__(self, vmachine):
+    self.vmachine = vmachine
+    self.blocks = {} # start address -> Block
+    self.marks = [0] * vmachine.MEMORY_SIZE # number of blocks which contain address
+    self.volatile = bytearray(vmachine.MEMORY_SIZE) # changed code, it isn't translated any more
+
+  def get(self, addr):
+    block = self.blocks.get(addr)
+    if block is None:
+      block = self.blocks[addr] = translate(self.vmachine, addr)
+      for i in range(block.start, block.end + 1):
+        self.marks[i] += 1
+    return block
+
+  def invalidate(self, addr):
+    """Drops blocks which contain changed address"""
+    self.volatile[addr] = 1
+    for start, block in list(self.blocks.items()):
+      if block.start <= addr <= block.end:
+        block.valid = False
+        del self.blocks[start]
+        for i in range(block.start, block.end + 1):
+          self.marks[i] -= 1
+
+  def clear(self):
+    for block in self.blocks.values():
+      block.valid = False
+    self.blocks.clear()
+    self.marks[:] = [0] * len(self.marks)
+    self.volatile[:] = bytearray(len(self.volatile))
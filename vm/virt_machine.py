@@ -1,31 +1,47 @@
 from vm_errors import *
 from execution import *
 from word_parser import *
+from heapq import heappush, heappop
 from word import *
+from packed_memory import *
+from translator import BlockCache
+from fusion import fuse
+from memory_locks import MemoryLocks
+from snapshot import make_snapshot, restore_snapshot
 
-TRIGGERS = "cf of cur_addr halted cycles".split()
+TRIGGERS = frozenset("cf of cur_addr halted cycles".split())
 
 class VMachine:
   MEMORY_SIZE = 4000
 
+  # rA, rX, r1..r6, rJ - properties with copies of registers as Word (see also reg() and set_reg())
+
   # constants for locking
   W_LOCKED = 0 # this cells are locked for write but you can read them
   RW_LOCKED = 1 # this cells are locked for read and write
 
+  # execution engines for run()
+  INTERPRETER = 0 # instructions are executed one by one
+  TRANSLATOR = 1 # basic blocks are translated to python functions (when nobody watches every step)
+  FUSION = 2 # interpreter, but common sequences of instructions are executed by one handler (see fusion.py)
+
+  # vm[2000], vm["A"], vm[2000:1:3], vm["X":0:2] - copies of memory cells and registers (or their fields) as Word,
+  # vm["cycles"] etc - triggers; handlers use cells and regs (packed words) directly
+
   def __getitem__(self, x):
     """Can raise exception"""
-    if x in TRIGGERS:
-      return self.__dict__[x]
     if isinstance(x, slice): # slice, vm[2000:2:4] = ...
       item = x.start
       sliced = True
       left = x.stop if x.stop is not None else 0
       right = x.step if x.step is not None else 5
     else: # vm[2000] = ...
+      if x in TRIGGERS:
+        return self.__dict__[x]
       item = x
       sliced = False
-    whole = (self.memory[item] if isinstance(item, int) else self.reg(item))
-    return whole[left:right] if sliced else whole
+    packed = self.cells[item] if isinstance(item, int) else self.regs[REG_INDEX[item]]
+    return Word.from_packed(get_field(packed, 8*left + right) if sliced else packed)
 
   def __setitem__(self, x, value):
     """Can raise exception"""
@@ -37,28 +53,68 @@ class VMachine:
       item = x
       left = 0
       right = 5
-    old_value = self[item]
     if isinstance(item, int):
       # we are working with memory
-      self.memory[item][left:right] = value
-      if self.mem_hook is not None and old_value.word_list != self.memory[item].word_list:
-        self.mem_hook(item, old_value, self.memory[item])
-    else:
-      # we are working with registers or triggers
-      if item in TRIGGERS:
-        assert left == 0 and right == 5
+      self.set_cell(item, set_field(self.cells[item], 8*left + right, pack(value)))
+    elif item in TRIGGERS:
+      assert left == 0 and right == 5
+      if self.cpu_hook is None:
+        self.__dict__[item] = value
+      else:
+        old_value = self.__dict__[item]
         self.__dict__[item] = value
-        changed = old_value != self[item]
-      else: # register
-        self.reg(item)[left:right] = value
-        changed = old_value.word_list != self[item].word_list
-      if self.cpu_hook is not None and changed:
-        self.cpu_hook(item, old_value, self[item])
+        if old_value != value:
+          self.cpu_hook(item, old_value, value)
+    else: # register
+      index = REG_INDEX[item]
+      self.set_register(index, set_field(self.regs[index], 8*left + right, pack(value)))
+
+  def set_cell(self, addr, packed):
+    """Writes packed word to memory, all memory writes go here"""
+    old = self.cells[addr]
+    if old != packed:
+      self.cells[addr] = packed
+      if self.journal is not None:
+        self.journal.cells(addr, [old])
+      self.instr_cache[addr] = None
+      if self.code_marks[addr]:
+        self.block_cache.invalidate(addr)
+      if self.mem_hook is not None:
+        self.mem_hook(addr, unpack(old), unpack(packed))
+
+  def set_cells(self, first, words):
+    """Writes list of packed words to memory from address first, observers get one notification"""
+    end = first + len(words)
+    old = self.cells[first:end]
+    if old == words:
+      return
+    self.cells[first:end] = words
+    if self.journal is not None:
+      self.journal.cells(first, old)
+    changed = [first + i for i in range(len(words)) if old[i] != words[i]]
+    for addr in changed:
+      self.instr_cache[addr] = None
+      if self.code_marks[addr]:
+        self.block_cache.invalidate(addr)
+    if self.mem_range_hook is not None:
+      self.mem_range_hook(first, [unpack(word) for word in old], [unpack(word) for word in words])
+    elif self.mem_hook is not None:
+      for addr in changed:
+        self.mem_hook(addr, unpack(old[addr - first]), unpack(words[addr - first]))
+
+  def set_register(self, index, packed):
+    """Writes packed word to register number index (see REG_NAMES), all register writes go here"""
+    old = self.regs[index]
+    self.regs[index] = packed
+    if self.cpu_hook is not None and old != packed:
+      self.cpu_hook(REG_NAMES[index], unpack(old), unpack(packed))
 
   def reg(self, r):
-    return self.__dict__["r" + r]
+    """Copy of register as Word"""
+    return Word.from_packed(self.regs[REG_INDEX[r]])
   def set_reg(self, r, w):
-    self.__dict__["r" + r] = Word(w)
+    """Sets register without hooks"""
+    self.regs[REG_INDEX[r]] = pack(w)
 
 
   @staticmethod
@@ -67,10 +123,9 @@ class VMachine:
 
   def cmp_memory(self, memory_dict):
     """Need for testing"""
-    positive_zero = [+1, 0, 0, 0, 0, 0]
     if not isinstance(memory_dict, dict) or \
-       any( (i     in memory_dict and self[i].word_list != memory_dict[i].word_list) or
-            (i not in memory_dict and self[i].word_list != positive_zero)
+       any( (i     in memory_dict and self.cells[i] != pack(memory_dict[i])) or
+            (i not in memory_dict and self.cells[i] != 0)
             for i in range(VMachine.MEMORY_SIZE)):
       return False
     else:
@@ -79,27 +134,41 @@ class VMachine:
   def get_cur_word(self):
     return self[self.cur_addr]
 
+  def get_instr(self, addr):
+    """Returns decoded word, decoding is done only once for every address until it's changed"""
+    instr = self.instr_cache[addr]
+    if instr is None:
+      instr = self.instr_cache[addr] = Instruction(unpack(self.cells[addr]))
+    return instr
+
+  def get_cur_instr(self):
+    return self.get_instr(self.cur_addr)
+
   def clear_rI(self, reg):
     """Return True if overflowed"""
-    if reg in "123456" and self[reg:1:3] != Word():
-      self[reg:1:3] = 0
+    index = REG_INDEX[reg]
+    if 1 <= index <= 6 and get_field(self.regs[index], 8*1 + 3) != 0:
+      self.set_register(index, set_field(self.regs[index], 8*1 + 3, 0))
       return True
     else:
       return False
 
   def set_memory(self, memory, reset):
     if isinstance(memory, list):
-      self.memory = [ Word(x) for x in memory]
+      self.memory.fill(memory)
+      self.instr_cache[:] = [None] * self.MEMORY_SIZE
+      self.block_cache.clear()
       return
     if reset:
-      self.memory = [ Word() for _ in range(self.MEMORY_SIZE)]
+      self.memory.clear()
+      self.instr_cache[:] = [None] * self.MEMORY_SIZE
+      self.block_cache.clear()
     for addr, word in memory.items():
       # checking for correct input done in read_memory
       self[addr] = word
 
   def init_stuff(self, start_address):
-    self.rA, self.rX, self.r0, self.r1, self.r2, self.r3, self.r4, self.r5, self.r6, self.rJ =\
-        [Word(0) for _ in range(10)]
+    self.regs = [0] * len(REG_NAMES) # packed words
     self.cf = 0
     self.of = False
     self.cur_addr = start_address
@@ -107,63 +176,311 @@ class VMachine:
 
   def set_device(self, number, device_instance):
     if 0 <= number < MAX_BYTE:
+      if number not in self.devices:
+        self.device_order[number] = len(self.device_order)
       self.devices[number] = device_instance
+      self.device_deadlines.pop(number, None)
+      if device_instance.busy:
+        self.schedule_device(number, self.cycles + device_instance.time_left)
+      else:
+        self.update_device_deadline()
       return True
     else:
       return False
 
+  def reset_devices(self):
+    """Unplugs all devices and forgets their deadlines"""
+    self.devices = {}
+    self.device_order = {}
+    self.set_device_deadlines({})
+
   def is_readable(self, addr):
-    return addr not in self.locked_cells[self.RW_LOCKED]
+    return not self.locks[self.RW_LOCKED].flags[addr]
   def is_writeable(self, addr):
-    return addr not in ( self.locked_cells[self.W_LOCKED] | self.locked_cells[self.RW_LOCKED] )
-  def is_readable_set(self, _set):
-    return len(_set & self.locked_cells[self.RW_LOCKED]) == 0
-  def is_writeable_set(self, _set):
-    return len(_set & ( self.locked_cells[self.W_LOCKED] | self.locked_cells[self.RW_LOCKED] )) == 0
+    return not (self.locks[self.W_LOCKED].flags[addr] or self.locks[self.RW_LOCKED].flags[addr])
+  def is_readable_range(self, first, last):
+    return not self.locks[self.RW_LOCKED].any(first, last)
+  def is_writeable_range(self, first, last):
+    return not (self.locks[self.W_LOCKED].any(first, last) or self.locks[self.RW_LOCKED].any(first, last))
+
+  def locked_cells(self, mode):
+    """Returns set of cells locked in mode"""
+    return self.locks[mode].cells()
+  def set_locked_cells(self, mode, cells):
+    self.locks[mode].set_cells(cells)
 
   def lock_cells(self, mode, add = None, sub = None):
+    """add or sub - (first, last) addresses of locked or unlocked memory"""
     assert( (add is not None) ^ (sub is not None) )
+    locks = self.locks[mode]
+    if self.journal is not None:
+      first, last = add if add is not None else sub
+      self.journal.locks(mode, *locks.get_flags(first, last))
     if self.lock_hook is not None:
-      old = set(self.locked_cells[mode])
+      old = locks.cells()
     if add is not None:
-      # add set to self.locked_cells[mode]
-      self.locked_cells[mode] |= add
+      locks.add(*add)
     else:
-      # subtract set from self.locked_cells[mode]
-      self.locked_cells[mode] -= sub
-    if self.lock_hook is not None and self.locked_cells[mode] != old:
-      self.lock_hook("rw" if mode ==self.RW_LOCKED else "w", old, self.locked_cells[mode])
+      locks.remove(*sub)
+    if self.lock_hook is not None:
+      new = locks.cells()
+      if new != old:
+        self.lock_hook("rw" if mode == self.RW_LOCKED else "w", old, new)
+
+  def set_lock_flags(self, mode, first, flags):
+    """Restores flags returned by MemoryLocks.get_flags() (used by journal)"""
+    locks = self.locks[mode]
+    if self.lock_hook is not None:
+      old = locks.cells()
+    locks.set_flags(first, flags)
+    if self.lock_hook is not None:
+      new = locks.cells()
+      if new != old:
+        self.lock_hook("rw" if mode == self.RW_LOCKED else "w", old, new)
 
   def __init__(self, memory, start_address):
     self.errors = []
     self.set_cpu_hook(None)
     self.set_mem_hook(None)
+    self.set_mem_range_hook(None)
     self.set_lock_hook(None)
+    self.memory = PackedMemory(self.MEMORY_SIZE)
+    self.cells = self.memory.cells
+    self.instr_cache = [None] * self.MEMORY_SIZE
+    self.engine = self.INTERPRETER
+    self.profiler = None
+    self.journal = None
+    self.block_cache = BlockCache(self)
+    self.code_marks = self.block_cache.marks
     self.set_memory(memory, reset = True)
     self.init_stuff(start_address)
-    self.devices = {}
-    self.locked_cells = [set(), set()]
     self.cycles = 0
+    self.devices = {}
+    self.device_order = {} # device number -> its place in devices (busy devices finish in this order)
+    self.device_deadlines = {} # number of busy device -> cycles when it finishes
+    self.device_queue = [] # heap of (deadline, order, number), items with old deadlines are skipped
+    self.device_deadline = float("inf") # the nearest deadline
+    self.locks = [MemoryLocks(self.MEMORY_SIZE), MemoryLocks(self.MEMORY_SIZE)] # W_LOCKED, RW_LOCKED
 
   def step(self):
     if not self.check_mem_addr(self.cur_addr):
       raise InvalidCurAddrError(self.cur_addr)
-    cycles = execute(self)
+    instr = self.get_cur_instr()
+    if self.journal is not None:
+      self.journal.begin(self)
+      if instr.io:
+        self.journal.devices(self)
+    start = self.cycles
+    try:
+      cycles = execute(self) if self.profiler is None else self.profiler.execute(self)
+    except VMError:
+      self.device_error(instr, self.cycles - start)
+      raise
+
+    if instr.io:
+      self.device_started(instr.field, cycles)
+      self.devices[instr.field].flush()
+    if self.cycles >= self.device_deadline:
+      self.refresh_devices(cycles)
+
+  def run(self, max_cycles = None, breakpoints = None):
+    """Executes instructions until halt, breakpoint (checked after every instruction) or max_cycles reached"""
+    try:
+      self._run(max_cycles, breakpoints)
+    finally:
+      self.flush_devices() # buffered output is written when run() returns
+
+  def _run(self, max_cycles, breakpoints):
+    # the same as step() in loop, but without method calls for common case
+    cache = self.instr_cache
+    execute_instr = execute if self.profiler is None else self.profiler.execute
+    journal = self.journal
+    # busy waits are skipped when nobody watches every step
+    fast_forward = self.profiler is None and journal is None and self.cpu_hook is None
+    translate = self.engine == self.TRANSLATOR and not breakpoints and self.profiler is None and journal is None and \
+        self.cpu_hook is None and self.mem_hook is None and self.mem_range_hook is None and self.lock_hook is None
+    fusion = self.engine == self.FUSION and fast_forward
+    blocks = self.block_cache.blocks
+    while not self.halted and (max_cycles is None or self.cycles < max_cycles):
+      cur_addr = self.cur_addr
+      if not 0 <= cur_addr < self.MEMORY_SIZE:
+        raise InvalidCurAddrError(cur_addr)
+      if translate and not (self.locks[0].count or self.locks[1].count):
+        block = blocks.get(cur_addr)
+        if block is None:
+          block = self.block_cache.get(cur_addr)
+        # block is executed only if it can't pass max_cycles or deadline of device inside, the rest is done by interpreter
+        if block.size > 0 and self.cycles + block.cycles < self.device_deadline and \
+           (max_cycles is None or self.cycles + block.cycles < max_cycles):
+          if not block.func(self):
+            continue
+          # block stopped before instruction which must be interpreted
+          cur_addr = self.cur_addr
+      instr = cache[cur_addr]
+      if instr is None:
+        instr = self.get_cur_instr()
+      if fusion:
+        fused = instr.fused
+        if fused is None:
+          fused = instr.fused = fuse(self, cur_addr)
+        # like blocks of translator, sequence is executed only if it can't pass max_cycles or deadline of device
+        if fused and self.cycles + fused.cycles < self.device_deadline and \
+           (max_cycles is None or self.cycles + fused.cycles < max_cycles) and \
+           (breakpoints is None or not any(addr in breakpoints for addr in fused.inner)) and fused.func(self):
+          if breakpoints is not None and self.cur_addr in breakpoints:
+            break
+          continue
+      if journal is not None:
+        journal.begin(self)
+        if instr.io:
+          journal.devices(self)
+      start = self.cycles
+      try:
+        cycles = execute_instr(self)
+      except VMError:
+        self.device_error(instr, self.cycles - start)
+        raise
+
+      if instr.io:
+        self.device_started(instr.field, cycles)
+      if self.cycles >= self.device_deadline:
+        self.refresh_devices(cycles)
+      elif fast_forward and self.cur_addr == cur_addr and instr.wait and \
+           (breakpoints is None or cur_addr not in breakpoints):
+        # waiting for device, which is still busy
+        self.skip_wait(cycles, max_cycles)
 
-    # refresh all plugged devices
+      if breakpoints is not None and self.cur_addr in breakpoints:
+        break
+
+  # Busy devices aren't refreshed after every instruction: cycles when every busy device finishes are kept
+  # in heap and devices are refreshed only when cycles pass the nearest one.
+
+  def schedule_device(self, number, deadline):
+    self.device_deadlines[number] = deadline
+    heappush(self.device_queue, (deadline, self.device_order[number], number))
+    self.update_device_deadline()
+
+  def update_device_deadline(self):
+    queue = self.device_queue
+    while len(queue) > 0 and self.device_deadlines.get(queue[0][2]) != queue[0][0]:
+      heappop(queue) # finished or rescheduled device
+    self.device_deadline = queue[0][0] if len(queue) > 0 else float("inf")
+
+  def set_device_deadlines(self, deadlines):
+    """Replaces all deadlines (used by journal and snapshots)"""
+    self.device_deadlines = {}
+    self.device_queue = []
+    for number, deadline in deadlines.items():
+      self.schedule_device(number, deadline)
+    self.update_device_deadline()
+
+  def reset_cycles(self):
+    """Sets cycles to 0, deadlines of busy devices are moved too"""
+    self.set_device_deadlines(dict((number, deadline - self.cycles) for number, deadline in self.device_deadlines.items()))
+    self.cycles = 0
+
+  def device_started(self, number, cycles):
+    """Called after I/O instruction which took <cycles> and could make device busy"""
+    dev = self.devices.get(number)
+    if dev is not None and dev.busy and number not in self.device_deadlines:
+      # device became busy at the beginning of instruction
+      self.schedule_device(number, self.cycles - cycles + dev.time_left)
+
+  def skip_wait(self, cycles, max_cycles):
+    """Instruction which took <cycles> jumped to itself waiting for busy device: the same iterations
+       are skipped until the nearest deadline of device (or max_cycles), the last one is executed as usual"""
+    left = self.device_deadline - self.cycles
+    if left == float("inf"):
+      return
+    skip = (left - 1) // cycles
+    if max_cycles is not None:
+      skip = min(skip, max(0, -((self.cycles - max_cycles) // cycles)))
+    self.cycles += skip * cycles
+
+  def device_error(self, instr, cycles):
+    """Called when instruction raised error after <cycles>, devices don't get these cycles"""
+    for number in list(self.device_deadlines):
+      self.schedule_device(number, self.device_deadlines[number] + cycles)
+    if instr.io:
+      self.device_started(instr.field, 0)
+
+  def flush_devices(self):
     for dev in self.devices.values():
-      # if device isn't busy returns None
-      unlock = dev.refresh(cycles)
-      if unlock is not None:
-        # else returned (mode, limits) - mode in 'rw', limits = (left, right) - properies of unlocked memory part
-        if unlock[0] == 'w':
-          mode = self.W_LOCKED
-        elif unlock[0] == 'rw':
-          mode = self.RW_LOCKED
-        else:
-          return # ioc busy
-        # unlock memory
-        self.lock_cells(mode, sub = set(range(unlock[1][0], unlock[1][1] + 1)))
+      dev.flush()
+
+  def sync_devices(self):
+    """Sets time_left of busy devices (for saving their state)"""
+    for number, deadline in self.device_deadlines.items():
+      self.devices[number].time_left = deadline - self.cycles
+
+  def refresh_devices(self, cycles):
+    """Finishes busy devices which deadlines are passed by instruction which took <cycles>"""
+    if self.journal is not None:
+      self.journal.devices(self)
+    queue = self.device_queue
+    finished = []
+    while len(queue) > 0 and queue[0][0] <= self.cycles:
+      deadline, order, number = heappop(queue)
+      if self.device_deadlines.get(number) == deadline:
+        finished.append((order, number))
+    finished.sort()
+
+    for i, (order, number) in enumerate(finished):
+      del self.device_deadlines[number]
+      # returns (mode, limits) - mode in 'rw', limits = (left, right) - properies of unlocked memory part
+      unlock = self.devices[number].finish()
+      if unlock[0] == 'w':
+        mode = self.W_LOCKED
+      elif unlock[0] == 'rw':
+        mode = self.RW_LOCKED
+      else:
+        # ioc busy: devices after this one aren't refreshed on this step, so they finish <cycles> later
+        for later in list(self.device_deadlines):
+          if self.device_order[later] > order:
+            self.schedule_device(later, self.device_deadlines[later] + cycles)
+        break
+      # unlock memory
+      self.lock_cells(mode, sub = unlock[1])
+    self.update_device_deadline()
+
+  def snapshot(self):
+    """Returns bytes with the whole state (see snapshot.py)"""
+    return make_snapshot(self)
+
+  def restore(self, data):
+    """Restores state saved by snapshot(), the same devices must be plugged (raises ValueError)"""
+    restore_snapshot(self, data)
+    if self.journal is not None:
+      self.journal.clear()
+
+  def set_journal(self, journal):
+    """Undo journal (see journal.py) or None, instructions are executed by interpreter while it's set"""
+    self.journal = journal
+
+  def step_back(self, steps = 1):
+    """Undoes last steps instructions saved in journal, returns number of undone instructions"""
+    done = 0
+    while done < steps and self.journal is not None and self.journal.undo(self):
+      done += 1
+    return done
+
+  def run_back(self, breakpoints = None):
+    """Undoes instructions until breakpoint or beginning of journal, returns number of undone instructions"""
+    done = 0
+    while self.journal is not None and self.journal.undo(self):
+      done += 1
+      if breakpoints is not None and self.cur_addr in breakpoints:
+        break
+    return done
+
+  def set_profiler(self, profiler):
+    """Profiler (see profiler.py) or None, instructions are executed by interpreter while it's set"""
+    self.profiler = profiler
+
+  def set_engine(self, engine):
+    """INTERPRETER, TRANSLATOR or FUSION"""
+    self.engine = engine
 
   def set_cpu_hook(self, hook):
     self.cpu_hook = hook
@@ -171,5 +488,20 @@ class VMachine:
   def set_mem_hook(self, hook):
     self.mem_hook = hook
 
+  def set_mem_range_hook(self, hook):
+    """hook(first, old words, new words) - for writes of memory ranges (by MOVE), mem_hook is used without it"""
+    self.mem_range_hook = hook
+
   def set_lock_hook(self, hook):
     self.lock_hook = hook
+
+def _reg_property(name):
+  index = REG_INDEX[name]
+  def get(self):
+    return Word.from_packed(self.regs[index])
+  def set(self, word):
+    self.regs[index] = pack(word)
+  return property(get, set)
+
+for _name in REG_NAMES:
+  setattr(VMachine, "r" + _name, _reg_property(_name))
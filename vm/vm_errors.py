@@ -72,6 +72,12 @@ class InvalidCharError(VMError):
 class InvaliCharCodeError(VMError):
   """There is no char corresponding to this number (%s)"""
 
+class InvalidBlockError(VMError):
+  """There is no block %s on device"""
+
+class BrokenBlockError(VMError):
+  """Block %s on device contains invalid mix-words"""
+
 class IOMemRangeError(VMError):
   """Can't read/write %s words from %s to %s"""
 
@@ -38,14 +38,13 @@ class VMTesting:
     """Returns number of cycles"""
     assert( (at is not None) ^ (start is not None) )
     try:
-      self.vm.cycles = 0
+      self.vm.reset_cycles()
       if at is not None:
         self.vm.cur_addr = at
         self.vm.step()
       else:
         self.vm.cur_addr = start
-        while not self.vm.halted:
-          self.vm.step()
+        self.vm.run()
       return self.vm.cycles
     except VMError as e:
       raise error_dict[type(e)]
@@ -102,10 +101,10 @@ class VMTesting:
     if mega.get("CF") is not None: self.vm.cf = mega["CF"]
     if mega.get("OF") is not None: self.vm.of = bool(mega["OF"])
     if mega.get("HLT") is not None: self.vm.halted = bool(mega["HLT"])
-    if mega.get("W_LOCKED")   is not None: self.vm.locked_cells[self.vm.W_LOCKED] =   set(mega["W_LOCKED"])
-    if mega.get("RW_LOCKED")  is not None: self.vm.locked_cells[self.vm.RW_LOCKED] =  set(mega["RW_LOCKED"])
+    if mega.get("W_LOCKED")   is not None: self.vm.set_locked_cells(self.vm.W_LOCKED, mega["W_LOCKED"])
+    if mega.get("RW_LOCKED")  is not None: self.vm.set_locked_cells(self.vm.RW_LOCKED, mega["RW_LOCKED"])
  
-    self.vm.devices = {}
+    self.vm.reset_devices()
     for num, dev_info in devs.items():
       if dev_info[0] == FILE_DEV:
         # add device for working with file
@@ -133,7 +132,7 @@ class VMTesting:
     mega["CF"] = self.vm.cf
     mega["OF"] = int(self.vm.of)
     mega["HLT"] = int(self.vm.halted)
-    mega["W_LOCKED"] =  self.vm.locked_cells[self.vm.W_LOCKED]
-    mega["RW_LOCKED"] = self.vm.locked_cells[self.vm.RW_LOCKED]
+    mega["W_LOCKED"] =  self.vm.locked_cells(self.vm.W_LOCKED)
+    mega["RW_LOCKED"] = self.vm.locked_cells(self.vm.RW_LOCKED)
 
     return mega
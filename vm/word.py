@@ -1,10 +1,25 @@
-from functools import reduce
-
 from vm_errors import *
 
 MAX_BYTE = 64
 
+# Word is kept as packed int (like cells of memory, see packed_memory.py):
+#   bits 0..29 - bytes of word (5th byte is the lowest one)
+#   bit  30    - sign, it's set for negative words (so -0 is kept)
+BYTE_BITS = 6
+SIGN_BIT = 1 << (5 * BYTE_BITS)
+MAGNITUDE = SIGN_BIT - 1  # MAX_BYTE**5 - 1
+
+# FIELDS[8*L + R] = (shift, mask) of bytes max(1, L)..R (L > R gives empty mask),
+# None for L or R out of 0..5
+FIELDS = [None] * MAX_BYTE
+for _l in range(6):
+  for _r in range(6):
+    FIELDS[8*_l + _r] = (BYTE_BITS * (5 - _r), (1 << (BYTE_BITS * max(_r - max(_l, 1) + 1, 0))) - 1)
+
 class Word:
+  """Mix word, word_list ([sign, byte1, ..., byte5]) is made on demand"""
+  __slots__ = ("packed",)
+
   @staticmethod
   def sign(x):
     return 1 if x >= 0 else -1
@@ -19,8 +34,25 @@ class Word:
   def norm_2bytes(addr):
     return Word.sign(addr) * (abs(addr) % MAX_BYTE**2)
 
+  @staticmethod
+  def pack_list(word_list):
+    """[sign, byte1, ..., byte5] -> packed int, all word lists are packed here (see packed_memory.pack)"""
+    packed = 0
+    for byte in word_list[1:6]:
+      if not 0 <= byte < MAX_BYTE:
+        raise InvalidMixWordError(tuple(word_list))
+      packed = (packed << BYTE_BITS) | byte
+    return (packed | SIGN_BIT) if word_list[0] < 0 else packed
+
+  @staticmethod
+  def from_packed(packed):
+    word = Word.__new__(Word)
+    word.packed = packed
+    return word
+
   def __int__(self):
-    return self.word_list[0] * reduce(lambda x,y: (x << 6) | y, self.word_list[1:], 0)
+    magnitude = self.packed & MAGNITUDE
+    return -magnitude if self.packed & SIGN_BIT else magnitude
 
   @staticmethod
   def is_word_list(word_list):
@@ -28,53 +60,91 @@ class Word:
             and word_list[0] in (1, -1)\
             and all([ 0 <= byte < MAX_BYTE for byte in word_list[1:6]])
 
+  @property
+  def word_list(self):
+    packed = self.packed
+    return [-1 if packed & SIGN_BIT else +1,
+            (packed >> 24) & 63, (packed >> 18) & 63, (packed >> 12) & 63, (packed >> 6) & 63, packed & 63]
+
+  @word_list.setter
+  def word_list(self, word_list):
+    self.packed = self.pack_list(word_list)
+
   def __getitem__(self, x):
     if isinstance(x, slice):
       l = max(x.start, 0) if x.start is not None else 0
       r = min(x.stop, 5) if x.stop is not None else 5
       if x.step is not None:
         raise ValueError("unsupported operation")
-      new = Word()
-      if l == 0:
-        new[0] = self[0]
-      for i in range(r, max(l - 1, 0), -1):
-        new[5 - r + i] = self[i]
-      return new
+      # bytes l..r become the lowest bytes of new word, sign is copied only if l = 0
+      shift, mask = FIELDS[8*l + r]
+      result = (self.packed >> shift) & mask
+      return Word.from_packed((result | (self.packed & SIGN_BIT)) if l == 0 else result)
+    elif x == 0:
+      return -1 if self.packed & SIGN_BIT else +1
     else:
-      return self.word_list[x]
+      return (self.packed >> (BYTE_BITS * (5 - range(6)[x]))) & (MAX_BYTE - 1)
 
   def __setitem__(self, x, value):
     if isinstance(x, slice):
       l = max(x.start, 0)
       r = min(x.stop, 5)
-      word = Word(value)
-      if l == 0:
-        self[0] = word[0]
-      for i in range(r, max(l-1, 0), -1):
-        self[i] = word[5 - r + i]
+      # the lowest bytes of value are put to bytes l..r, sign is put only if l = 0
+      value = Word(value).packed
+      shift, mask = FIELDS[8*l + r]
+      result = (self.packed & ~(mask << shift)) | ((value & mask) << shift)
+      self.packed = ((result & MAGNITUDE) | (value & SIGN_BIT)) if l == 0 else result
+    elif x == 0:
+      self.packed = (self.packed | SIGN_BIT) if value < 0 else (self.packed & MAGNITUDE)
     else:
-      self.word_list[x] = value
+      shift = BYTE_BITS * (5 - range(6)[x])
+      self.packed = (self.packed & ~((MAX_BYTE - 1) << shift)) | ((value & (MAX_BYTE - 1)) << shift)
 
   def is_zero(self):
-    return self.word_list[1:] == ([0] * 5)
+    return self.packed & MAGNITUDE == 0
 
 
   def __eq__(self, cmp_word):
+    if isinstance(cmp_word, Word):
+      # +0 == -0
+      return self.packed == cmp_word.packed or (self.packed | cmp_word.packed) & MAGNITUDE == 0
     return self.is_zero() and cmp_word.is_zero() or \
       all(self[i] == cmp_word[i] for i in range(0, 6))
 
   def __str__(self):
-    return reduce(lambda x, y: "%s %02i" % (x, y), self.word_list[1:6], "+" if self[0] == 1 else "-")
+    return "%s %02i %02i %02i %02i %02i" % tuple(["+" if self[0] == 1 else "-"] + self.word_list[1:])
 
   def addr_str(self):
     return "%s %04i %02i %02i %02i" % tuple(["+" if self[0] == 1 else "-", self[1]*MAX_BYTE + self[2]] + self.word_list[3:])
 
   def __init__(self, obj = None):
     if obj is None:
-      self.word_list = [+1, 0, 0, 0, 0, 0]
+      self.packed = 0
     elif isinstance(obj, list) or isinstance(obj, tuple):
-      self.word_list = list(obj)
+      self.packed = self.pack_list(obj)
     elif isinstance(obj, int):
-      self.word_list = self.from_dec(obj)
+      self.packed = ((-obj & MAGNITUDE) | SIGN_BIT) if obj < 0 else (obj & MAGNITUDE)
     elif isinstance(obj, Word):
-      self.word_list = obj.word_list[:]
+      self.packed = obj.packed
+
+
+class SharedWord(Word):
+  """Word which can't be changed, the same object is used for frequent values (see shared_word())"""
+  __slots__ = ()
+
+  def __init__(self, obj = None):
+    object.__setattr__(self, "packed", Word(obj).packed)
+
+  def __setattr__(self, name, value):
+    raise TypeError("shared word can't be changed")
+
+  def __setitem__(self, x, value):
+    raise TypeError("shared word can't be changed")
+
+# +0, -0 (empty memory, cleared registers) and small positive numbers (counters, chars)
+SHARED_WORDS = dict((word.packed, word) for word in [SharedWord([-1, 0, 0, 0, 0, 0])] + [SharedWord(num) for num in range(MAX_BYTE)])
+
+def shared_word(packed):
+  """Word with value of packed int, shared read-only word is returned for frequent values"""
+  word = SHARED_WORDS.get(packed)
+  return word if word is not None else Word.from_packed(packed)
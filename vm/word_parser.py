@@ -1,15 +1,17 @@
 from vm_errors import *
 from word import *
+from packed_memory import packed_int
 
 class WordParser:
   @staticmethod
   def get_full_addr(vmachine, check_overflow = False, check_mix_addr = False):
-    word = vmachine.get_cur_word()
-    addr = int(word[0:2])
-    ind = word[3]
+    instr = vmachine.get_cur_instr()
+    addr = instr.addr
+    ind = instr.ind
     if ind > 6:
       raise InvalidIndError(ind)
-    addr += int(vmachine[str(ind)])
+    if ind != 0:
+      addr += packed_int(vmachine.regs[ind])
     if abs(addr) >= MAX_BYTE**2:
       addr = Word.norm_2bytes(addr)
       if check_overflow:
@@ -20,17 +22,15 @@ class WordParser:
 
   @staticmethod
   def get_field_spec(vmachine):
-    word = vmachine.get_cur_word()
-    l = word[4] // 8
-    r = word[4] % 8
-    if not (0 <= l <= r <= 5):
-      raise InvalidFieldSpecError("%i:%i=%i" % (l, r, word[4]))
-    return (l, r)
+    instr = vmachine.get_cur_instr()
+    if instr.field_spec is None:
+      raise InvalidFieldSpecError("%i:%i=%i" % (instr.field // 8, instr.field % 8, instr.field))
+    return instr.field_spec
 
   @staticmethod
   def get_sign(vmachine):
-    return vmachine.get_cur_word()[0]
+    return vmachine.get_cur_instr().sign
 
   @staticmethod
   def get_field(vmachine):
-    return vmachine.get_cur_word()[4]
+    return vmachine.get_cur_instr().field